@@ -0,0 +1,92 @@
+"""
+Process-wide content-addressed cache for per-message analysis.
+
+Scam campaigns broadcast one template to thousands of targets, so the same
+message text keeps arriving in different sessions. Results are keyed by a
+digest of the text and kept in an LRU bounded by an approximate byte
+budget; a hit returns the stored result without running any regex.
+"""
+
+import hashlib
+import json
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Optional
+
+
+def approximate_size(value: Any) -> int:
+    """Rough in-memory footprint of a JSON-like value, in bytes"""
+    return len(json.dumps(value, default=str))
+
+
+class AnalysisCache:
+    """Thread-safe LRU of analysis results under a byte budget"""
+
+    # Per-entry bookkeeping (key, OrderedDict node, tuple) on top of the value
+    ENTRY_OVERHEAD = 200
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, sizeof: Callable[[Any], int] = approximate_size):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self._lock = Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(text: str, *salt) -> bytes:
+        """Digest of the message text (surrounding whitespace ignored).
+
+        Nothing more aggressive is normalized away: case and inner spacing
+        change what the extractor finds. ``salt`` folds in anything else the
+        result depends on (e.g. a registry version).
+        """
+        digest = hashlib.blake2b(text.strip().encode("utf-8", "surrogatepass"), digest_size=16)
+        for part in salt:
+            digest.update(b"\0" + str(part).encode())
+        return digest.digest()
+
+    def get(self, key: bytes) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: bytes, value: Any) -> None:
+        size = self.sizeof(value) + self.ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._entries[key] = (value, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "maxBytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hitRate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
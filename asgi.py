@@ -0,0 +1,201 @@
+"""
+Asyncio (ASGI) server for the honeypot.
+
+/honeypot is served natively: the turn's analysis runs on the event loop
+(it takes microseconds), then the reply awaits main.async_groq, whose one
+connection pool is shared by every conversation in the process. A slow
+LLM call no longer holds a worker, so hundreds of conversations can wait
+on Groq at once. The callback POST, and every other route (the unchanged
+Flask app), run in worker threads.
+
+Endpoints, the x-api-key header and the JSON bodies are the same as
+`gunicorn main:app`.
+
+Run: gunicorn asgi:app -k uvicorn.workers.UvicornWorker --bind 0.0.0.0:$PORT --workers 2 --timeout 120
+"""
+
+import json
+import sys
+import traceback
+from io import BytesIO
+
+from anyio import to_thread
+
+import main
+from main import API_KEY, logger
+
+JSON_HEADERS = [(b"content-type", b"application/json")]
+
+
+def header(scope, name):
+    """First value of a request header (lowercase bytes name), or None"""
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+async def read_body(receive):
+    body = bytearray()
+    more = True
+    while more:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        body += message.get("body", b"")
+        more = message.get("more_body", False)
+    return bytes(body)
+
+
+def parse_json(scope, body):
+    """Flask's request.get_json(silent=True): None unless a JSON content type parses"""
+    mimetype = (header(scope, b"content-type") or "").split(";")[0].strip().lower()
+    if mimetype != "application/json" and not (mimetype.startswith("application/") and mimetype.endswith("+json")):
+        return None
+    try:
+        return json.loads(body)
+    except ValueError:
+        return None
+
+
+async def send_response(send, status, body=b"", headers=()):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-length", str(len(body)).encode()), *headers],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def send_json(send, status, payload):
+    # Same serializer and layout as jsonify()
+    body = main.app.json.dumps(payload, separators=(",", ":")) + "\n"
+    await send_response(send, status, body.encode(), JSON_HEADERS)
+
+
+async def honeypot(scope, receive, send):
+    """/honeypot, awaiting the LLM instead of blocking a worker on it"""
+
+    if header(scope, b"x-api-key") != API_KEY:
+        return await send_json(send, 401, {"status": "error", "message": "Unauthorized"})
+
+    if scope["method"] == "OPTIONS":
+        return await send_response(send, 204)
+
+    data = parse_json(scope, await read_body(receive))
+
+    if not data:
+        return await send_json(send, 400, {"status": "error", "message": "Invalid JSON"})
+
+    try:
+        turn = main.parse_turn(data)
+        if not turn:
+            return await send_json(send, 400, {"status": "error", "message": "Bad request"})
+
+        sid, text, history = turn
+        session = main.get_session(sid)
+        intel = main.begin_turn(session, text, history)
+
+        # Generate reply (other conversations run while this one waits)
+        reply, llm_intel = await main.agent_reply_async(text, history, session)
+
+        if main.finish_turn(session, reply, llm_intel, *intel):
+            await to_thread.run_sync(main.send_callback, session)
+    except Exception:
+        logger.error(f"Honeypot error: {traceback.format_exc()}")
+        return await send_json(send, 500, {"status": "error", "message": "Internal server error"})
+
+    await send_json(send, 200, {
+        "status": "success",
+        "reply": reply
+    })
+
+
+def wsgi_environ(scope, body):
+    """PEP 3333 environ for an ASGI HTTP request"""
+    server = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode().decode("latin-1"),
+        "PATH_INFO": scope["path"].encode().decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": BytesIO(body),
+        "wsgi.input_terminated": True,  # whole body buffered, length or not
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    if scope.get("client"):
+        environ["REMOTE_ADDR"] = scope["client"][0]
+
+    for name, value in scope["headers"]:
+        name, value = name.decode("latin-1"), value.decode("latin-1")
+        if name == "content-type":
+            key = "CONTENT_TYPE"
+        elif name == "content-length":
+            key = "CONTENT_LENGTH"
+        else:
+            key = "HTTP_" + name.upper().replace("-", "_")
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+async def call_flask(scope, receive, send):
+    """Serve a request with the Flask app in a worker thread, streaming its body"""
+
+    environ = wsgi_environ(scope, await read_body(receive))
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started["status"] = int(status.split(" ", 1)[0])
+        started["headers"] = [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers]
+        return lambda data: None  # Flask never uses write()
+
+    def first_chunk():
+        result = main.app(environ, start_response)
+        chunks = iter(result)
+        return result, chunks, next(chunks, None)
+
+    result, chunks, chunk = await to_thread.run_sync(first_chunk)
+    try:
+        await send({"type": "http.response.start", "status": started["status"], "headers": started["headers"]})
+        # NDJSON from /extract/batch is produced chunk by chunk in the thread
+        while chunk is not None:
+            if chunk:
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            chunk = await to_thread.run_sync(next, chunks, None)
+        await send({"type": "http.response.body", "body": b""})
+    finally:
+        if hasattr(result, "close"):
+            await to_thread.run_sync(result.close)
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            if main.async_groq:
+                await main.async_groq.close()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    """ASGI entry point"""
+
+    if scope["type"] == "lifespan":
+        return await lifespan(receive, send)
+    if scope["type"] != "http":
+        return
+
+    if scope["path"] == "/honeypot" and scope["method"] in ("POST", "OPTIONS"):
+        return await honeypot(scope, receive, send)
+    await call_flask(scope, receive, send)
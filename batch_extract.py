@@ -0,0 +1,70 @@
+"""
+Bulk intelligence extraction for reported scam SMS dumps.
+Runs Extractor + Detector across a process pool - no sessions, no LLM.
+
+Usage:
+    python batch_extract.py messages.txt > results.ndjson
+    cat dump.jsonl | python batch_extract.py - --jsonl --workers 8
+
+Input is one message per line (or JSON lines with a "text" field when
+--jsonl is given). Output is NDJSON, one result per input line, in order,
+with "index" the 0-based line number; a JSON line without a string
+"text" gets an {"index": n, "error": ...} record (also reported on
+stderr) in place of its result.
+"""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+# main refuses to import without an API key; this CLI never serves HTTP
+os.environ.setdefault("API_KEY", "batch-cli")
+
+from main import BATCH_CHUNK_SIZE, BATCH_WORKERS, iter_batch
+
+
+def read_texts(stream, jsonl, errors=sys.stderr):
+    """One text per input line; a bad JSON line yields a ValueError instead"""
+    for lineno, line in enumerate(stream, 1):
+        line = line.rstrip("\n")
+        if not jsonl:
+            yield line
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            error = ValueError(f"invalid JSON ({e})" if line.strip() else "empty line")
+        else:
+            text = record.get("text") if isinstance(record, dict) else None
+            if isinstance(text, str):
+                yield text
+                continue
+            error = ValueError("no string \"text\" field")
+        errors.write(f"line {lineno}: {error}\n")
+        yield error
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk scam intelligence extraction")
+    parser.add_argument("input", help="input file, or - for stdin")
+    parser.add_argument("--jsonl", action="store_true", help='input lines are JSON objects with a "text" field')
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS, help="worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=BATCH_CHUNK_SIZE, help="texts per worker task")
+    args = parser.parse_args(argv)
+
+    stream = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    pool = ProcessPoolExecutor(max_workers=args.workers) if args.workers > 1 else None
+
+    try:
+        texts = read_texts(stream, args.jsonl)
+        for result in iter_batch(texts, pool, args.chunk_size, 2 * args.workers):
+            sys.stdout.write(json.dumps(result) + "\n")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        if stream is not sys.stdin:
+            stream.close()
+
+if __name__ == "__main__":
+    main()
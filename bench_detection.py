@@ -0,0 +1,139 @@
+"""
+Detection throughput benchmark (no server)
+Run: python bench_detection.py
+"""
+import os
+import sys
+import time
+sys.path.insert(0, ".")
+os.environ.setdefault("API_KEY", "local-bench-key")
+
+from classifier import train
+from engines import ShadowRunner, run_engine
+from main import ENGINES, Detector, Document, Extractor, MultiSignalDetector, ScamTypeClassifier, Session
+from test_detect_batch import random_messages
+from test_multisignal_detector import legacy_score
+from test_scam_classifier import corpus
+from test_fused_extractor import CORPUS
+
+
+def bench_batch_scoring(count=100000):
+    """Scalar Detector.detect loop vs vectorized Detector.detect_batch"""
+    texts = (CORPUS + random_messages(5000))[:count]
+    texts = (texts * (count // len(texts) + 1))[:count]
+    intels = [Extractor.extract(t) for t in texts]
+
+    start = time.perf_counter()
+    for text, intel in zip(texts, intels):
+        Detector.detect(text, intel)
+    scalar = count / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    Detector.detect_batch(texts, intels)
+    batch = count / (time.perf_counter() - start)
+
+    print(f"detect       : {scalar:12,.0f} msg/s")
+    print(f"detect_batch : {batch:12,.0f} msg/s  ({batch / scalar:.1f}x)")
+
+
+def bench_multisignal(count=20000, repeat=5):
+    """main_backup's ScamDetector vs the port vs the simple Detector, per message"""
+    texts = (CORPUS + random_messages(5000))[:count]
+    texts = (texts * (count // len(texts) + 1))[:count]
+    histories = [[{"text": t} for t in texts[max(0, i - 2):i]] for i in range(count)]
+    intels = [Extractor.extract(t) for t in texts]
+
+    def per_message(run):
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            best = min(best, time.perf_counter() - start)
+        return best / count * 1e6
+
+    legacy = per_message(lambda: [legacy_score(t, h) for t, h in zip(texts, histories)])
+    ported = per_message(lambda: [MultiSignalDetector.detect(t, i, h) for t, i, h in zip(texts, intels, histories)])
+    simple = per_message(lambda: [Detector.detect(t, i) for t, i in zip(texts, intels)])
+
+    print(f"ScamDetector (main_backup) : {legacy:8.1f} us/msg")
+    print(f"MultiSignalDetector        : {ported:8.1f} us/msg  ({legacy / ported:.1f}x)")
+    print(f"Detector (simple)          : {simple:8.1f} us/msg")
+
+
+def bench_classifier(count=20000):
+    """Hashed n-gram model: training time and per-message inference"""
+    texts, labels = corpus(count)
+
+    start = time.perf_counter()
+    model = train(texts, labels, buckets=1 << 18, epochs=100)
+    trained = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for text in texts:
+        model.predict_proba(text)
+    single = (time.perf_counter() - start) / count * 1e6
+
+    start = time.perf_counter()
+    model.predict_proba_batch(texts)
+    batch = (time.perf_counter() - start) / count * 1e6
+
+    print(f"train ({count:,} msgs, 100 epochs) : {trained:8.2f} s")
+    print(f"predict_proba                : {single:8.1f} us/msg")
+    print(f"predict_proba_batch          : {batch:8.1f} us/msg")
+
+
+def bench_scam_type(count=20000):
+    """Per-message cost of the scam-type update on /honeypot"""
+    texts = (CORPUS + random_messages(5000))[:count]
+    texts = (texts * (count // len(texts) + 1))[:count]
+    docs = [Document(t) for t in texts]
+    for doc in docs:
+        doc.tokens  # shared with MultiSignalDetector / the classifier when enabled
+
+    session = Session(id="bench")
+    start = time.perf_counter()
+    for doc in docs:
+        ScamTypeClassifier.update(session, doc)
+    shared = (time.perf_counter() - start) / count * 1e6
+
+    start = time.perf_counter()
+    for text in texts:
+        ScamTypeClassifier.update(session, text)
+    alone = (time.perf_counter() - start) / count * 1e6
+
+    print(f"scam type (shared tokens) : {shared:6.1f} us/msg")
+    print(f"scam type (from text)     : {alone:6.1f} us/msg")
+
+
+def bench_engines(count=5000):
+    """Per-stage cost of each engine, and what shadow mode adds to a request"""
+    texts = (CORPUS + random_messages(5000))[:count]
+    texts = (texts * (count // len(texts) + 1))[:count]
+    for name, engine in ENGINES.items():
+        totals = {"extract": 0.0, "detect": 0.0}
+        for text in texts:
+            _, _, timings = run_engine(engine, Document(text), [])
+            for stage, seconds in timings.items():
+                totals[stage] += seconds
+        print(f"engine {name:<7} extract {totals['extract'] / count * 1e6:6.1f} us/msg, "
+              f"detect {totals['detect'] / count * 1e6:6.1f} us/msg")
+
+    runner = ShadowRunner(ENGINES["main"], ENGINES["backup"], sample_rate=0.05, max_pending=count)
+    start = time.perf_counter()
+    for text in texts:
+        runner.observe(Document(text), [], {}, True)
+    enqueue = (time.perf_counter() - start) / count * 1e6
+    runner.drain(60)
+    print(f"shadow observe (5% sample): {enqueue:6.1f} us/msg on the request thread, "
+          f"{runner.report()['compared']} compared")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("DETECTION BENCHMARK")
+    print("=" * 60)
+    bench_batch_scoring()
+    bench_multisignal()
+    bench_classifier()
+    bench_scam_type()
+    bench_engines()
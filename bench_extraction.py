@@ -0,0 +1,267 @@
+"""
+Extraction throughput benchmark (no server)
+Run: python bench_extraction.py
+"""
+import os
+import random
+import string
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+sys.path.insert(0, ".")
+os.environ.setdefault("API_KEY", "local-bench-key")
+
+from keywords import KeywordMatcher
+import main
+from classifier import train
+from main import Detector, Document, Extractor, MultiSignalDetector, analyze_message, iter_batch
+from templates import MinHashIndex
+from test_bounded_extract import HOSTILE
+from test_fused_extractor import CORPUS, legacy_extract
+from test_scam_classifier import corpus
+
+
+def messages_per_second(fn, texts, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text in texts:
+            fn(text)
+    return rounds * len(texts) / (time.perf_counter() - start)
+
+
+def bench_fused(rounds=2000):
+    """Old seven-regex extractor vs single-pass Extractor.extract"""
+    # Same mix the handler sees: single messages plus a joined history
+    texts = CORPUS + [" ".join(CORPUS)]
+    old = messages_per_second(legacy_extract, texts, rounds)
+    new = messages_per_second(Extractor.extract, texts, rounds)
+    print(f"multi-regex : {old:10,.0f} msg/s")
+    print(f"single-pass : {new:10,.0f} msg/s  ({new / old:.2f}x)")
+
+
+def bench_keywords(rounds=500, phrases=500):
+    """Per-keyword substring checks vs the shared automaton as lists grow"""
+    rng = random.Random(0)
+    words = sorted(Extractor.KEYWORDS)
+    while len(words) < phrases:
+        words.append(" ".join(
+            "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 9)))
+            for _ in range(rng.randint(1, 3))
+        ))
+    texts = [t.lower() for t in CORPUS + [" ".join(CORPUS)]]
+    for size in (len(Extractor.KEYWORDS), phrases):
+        subset = words[:size]
+        matcher = KeywordMatcher({"k": subset})
+        old = messages_per_second(lambda t: [k for k in subset if k in t], texts, rounds)
+        new = messages_per_second(matcher.matches, texts, rounds)
+        print(f"{size:4d} keywords  substring: {old:10,.0f} msg/s   automaton: {new:10,.0f} msg/s")
+
+
+def bench_batch(total=40000):
+    """iter_batch throughput as worker processes are added"""
+    texts = (CORPUS * (total // len(CORPUS) + 1))[:total]
+    counts = sorted({1, 2, os.cpu_count() or 1})
+    for workers in counts:
+        pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        start = time.perf_counter()
+        for _ in iter_batch(texts, pool, max_in_flight=2 * workers):
+            pass
+        rate = total / (time.perf_counter() - start)
+        if pool is not None:
+            pool.shutdown()
+        print(f"batch, {workers:2d} worker(s): {rate:10,.0f} msg/s")
+
+
+def bench_streaming(megabytes=8, chunk_size=64 * 1024):
+    """Whole-string extract() vs chunked iter_extract() on a large body"""
+    unit = "\n".join(CORPUS) + "\n"
+    size = megabytes * 1024 * 1024
+
+    def chunks():
+        # Generated lazily, like a request body read from the socket
+        produced = 0
+        piece = unit * (chunk_size // len(unit) + 1)
+        while produced < size:
+            yield piece[:chunk_size]
+            produced += chunk_size
+
+    def whole():
+        Extractor.extract("".join(chunks()))
+
+    def streamed():
+        for _ in Extractor.iter_extract(chunks()):
+            pass
+
+    for name, fn in (("extract (whole)", whole), ("iter_extract", streamed)):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        # Second run under tracemalloc, which would skew the timing
+        tracemalloc.start()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{megabytes} MB {name:16s}: {megabytes / elapsed:6.1f} MB/s, peak {peak / 2**20:7.1f} MiB")
+
+
+def bench_worst_case(sizes=(16000, 64000, 256000), fuzz_rounds=20):
+    """Worst-case scan time per input char: crafted + fuzzed hostile text"""
+    rng = random.Random(1)
+    alphabet = "id:is @.-+/9876543210 \t\nhttpwwwa"
+
+    def fuzz(n):
+        # Worst of several random strings over the scanner's meta-characters
+        return max(
+            ("".join(rng.choice(alphabet) for _ in range(n)) for _ in range(fuzz_rounds)),
+            key=lambda t: _timed(Extractor.extract, t),
+        )
+
+    cases = dict(HOSTILE, fuzzed=fuzz)
+    print("us/char at " + " / ".join(f"{n // 1000}k" for n in sizes) + " chars (flat = linear)")
+    for name, make in cases.items():
+        per_char = [_timed(Extractor.extract, make(n)) / n * 1e6 for n in sizes]
+        print(f"  {name:16s} " + "  ".join(f"{x:6.3f}" for x in per_char))
+
+
+def bench_template_cache(messages=50000, templates=50):
+    """Template-heavy traffic: uncached extract + assess vs analyze_message"""
+    rng = random.Random(9)
+    pool = [f"{rng.choice(CORPUS)} ref {i}" for i in range(templates)]
+    texts = [rng.choice(pool) for _ in range(messages)]
+
+    def uncached(text):
+        intel = Extractor.extract_bounded(text)
+        Detector.assess(text, intel)
+
+    main.analysis_cache.clear()
+    base = messages_per_second(uncached, texts, 1)
+    cached = messages_per_second(analyze_message, texts, 1)
+    stats = main.analysis_cache.stats()
+    print(f"uncached        : {base:12,.0f} msg/s")
+    print(f"analysis cache  : {cached:12,.0f} msg/s  ({cached / base:.1f}x, "
+          f"hit rate {stats['hitRate']:.2%}, {stats['bytes']:,} bytes)")
+
+
+def _view_bytes(doc):
+    """Bytes held by the views a Document has built"""
+    total = 0
+    for name, value in vars(doc).items():
+        if name == "text":
+            continue
+        total += sys.getsizeof(value)
+        if isinstance(value, list):
+            total += sum(sys.getsizeof(v) for v in value if isinstance(v, str))
+        elif isinstance(value, dict):
+            total += sum(sys.getsizeof(v) for v in value.values())
+    return total
+
+
+def bench_document(rounds=200):
+    """One request's analysis stages on plain text vs one shared Document"""
+    main.scam_classifier = train(*corpus(2000), buckets=1 << 16, epochs=20)
+    texts = CORPUS
+    created = []
+    real_of = Document.of.__func__
+
+    def tracked_of(cls, text):
+        doc = real_of(cls, text)
+        created.append(doc)
+        return doc
+
+    def stages(message):
+        intel = Extractor.extract_bounded(message)
+        Detector.assess(message, intel)
+        MultiSignalDetector.assess(message)
+
+    def per_text(text):
+        stages(text)
+
+    def shared(text):
+        stages(Document(text))
+
+    def views(fn):
+        created.clear()
+        Document.of = classmethod(tracked_of)
+        try:
+            for text in texts:
+                fn(text)
+        finally:
+            Document.of = classmethod(real_of)
+        unique = {id(d): d for d in created}.values()
+        return len(unique) / len(texts), sum(map(_view_bytes, unique)) / len(texts)
+
+    def peak(fn):
+        tracemalloc.start()
+        total = 0
+        for text in texts:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            fn(text)
+            total += tracemalloc.get_traced_memory()[1] - before
+        tracemalloc.stop()
+        return total / len(texts)
+
+    try:
+        for name, fn in (("text per stage", per_text), ("shared Document", shared)):
+            rate = messages_per_second(fn, texts, rounds)
+            docs, view_bytes = views(fn)
+            print(f"{name:16}: {1e6 / rate:7.1f} us/request  {docs:.0f} documents, "
+                  f"{view_bytes:6,.0f} B of views, {peak(fn):6,.0f} B peak")
+    finally:
+        main.scam_classifier = None
+
+
+def bench_template_index(messages=50000, campaigns=500):
+    """MinHash index insert / query on a full ring vs one extractor pass"""
+    rng = random.Random(4)
+    vocab = ["".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(2, 9))) for _ in range(3000)]
+    bases = [" ".join(rng.choice(vocab) for _ in range(rng.randint(10, 30))) for _ in range(campaigns)]
+    texts = [f"Dear {rng.choice(['Ravi', 'Priya', 'Amit'])}, {rng.choice(bases)} pay Rs {rng.randint(10, 9999)}"
+             for _ in range(messages)]
+    docs = [Document(t) for t in texts]
+    for doc in docs:
+        doc.tokens
+
+    index = MinHashIndex(capacity=messages)
+    start = time.perf_counter()
+    for doc in docs[:5000]:
+        index.signature(doc.tokens)
+    signature = (time.perf_counter() - start) / 5000 * 1e6
+
+    start = time.perf_counter()
+    for i, doc in enumerate(docs):
+        index.add(f"s{i}", doc.tokens)
+    insert = (time.perf_counter() - start) / messages * 1e6
+
+    start = time.perf_counter()
+    for doc in docs[:5000]:
+        index.query(doc.tokens)
+    query = (time.perf_counter() - start) / 5000 * 1e6
+
+    extract = 1e6 / messages_per_second(Extractor.extract, texts[:5000], 1)
+    print(f"signature       : {signature:8.1f} us/msg")
+    print(f"index insert    : {insert:8.1f} us/msg incl. linking query "
+          f"(full ring of {messages:,}, {index.signatures.nbytes / 2**20:.1f} MiB)")
+    print(f"index query     : {query:8.1f} us/msg")
+    print(f"Extractor.extract: {extract:7.1f} us/msg")
+
+
+def _timed(fn, arg):
+    start = time.perf_counter()
+    fn(arg)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("EXTRACTION BENCHMARK")
+    print("=" * 60)
+    bench_fused()
+    bench_keywords()
+    bench_batch()
+    bench_streaming()
+    bench_worst_case()
+    bench_template_cache()
+    bench_document()
+    bench_template_index()
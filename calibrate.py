@@ -0,0 +1,276 @@
+"""
+Threshold calibration for the scam detectors.
+
+Scores a labeled corpus once, caches the raw scores, sweeps every distinct
+score as a threshold (vectorized: one sort + cumulative sums), prints ROC
+and precision-recall tables, and writes the chosen threshold into the
+detector config file main.py loads at startup.
+
+/honeypot thresholds a session's RiskState.level, not a lone message's
+score, so messages are scored the same way: each conversation is replayed
+in order, with the earlier messages as history, and every message gets
+the session's risk level after it.
+
+Usage:
+    python calibrate.py corpus.jsonl --detector simple
+    python calibrate.py corpus.jsonl --detector multisignal --min-precision 0.95
+    python calibrate.py corpus.jsonl --metric youden --dry-run
+
+The corpus uses classifier.py's format: one {"text": ..., "label": ...}
+object per line, plus an optional "conversation" id. Lines sharing an id
+form one conversation, in file order; a line without one is a
+conversation of its own. Scores are cached next to the corpus (--cache) and reused
+as long as the corpus bytes, detector and classifier model are unchanged,
+so re-sweeping with another metric does not rescore anything.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# main refuses to import without an API key; this CLI never serves HTTP
+os.environ.setdefault("API_KEY", "calibrate-cli")
+
+from classifier import parse_label
+from main import (BATCH_CHUNK_SIZE, BATCH_WORKERS, CLASSIFIER_MODEL, DETECTOR_CONFIG,
+                  DETECTORS, RISK_DECAY, Extractor, RiskState)
+
+
+def read_conversations(lines):
+    """(conversations as lists of texts, labels in conversation order)"""
+    conversations = {}
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            text, label = str(record["text"]), parse_label(record["label"])
+            key = record.get("conversation")
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            raise SystemExit(f"line {number}: {e}")
+        key = ("line", number) if key is None else ("id", str(key))
+        conversations.setdefault(key, []).append((text, label))
+    turns = list(conversations.values())
+    return [[t for t, _ in c] for c in turns], [l for c in turns for _, l in c]
+
+
+def replay(detector, conversation, intels, points=None):
+    """Session risk level after each message, as begin_turn computes it"""
+    risk = RiskState()
+    history = []
+    levels = []
+    for i, (text, intel) in enumerate(zip(conversation, intels)):
+        if points is None:
+            risk.update(*detector.assess(text, intel, history))
+        else:
+            risk.update(points[i], {})
+        levels.append(risk.level)
+        history.append({"sender": "scammer", "text": text})
+    return levels
+
+
+def score_chunk(detector_name, conversations):
+    """Per-message session risk levels for a list of conversations (runs inside pool workers)"""
+    detector = DETECTORS[detector_name]
+    texts = [t for c in conversations for t in c]
+    intels = [Extractor.extract(t) for t in texts]
+    # Detector's points do not depend on history: score every message in one batch
+    points = detector.score_batch(texts, intels).tolist() if hasattr(detector, "score_batch") else None
+
+    levels, start = [], 0
+    for conversation in conversations:
+        end = start + len(conversation)
+        levels += replay(detector, conversation, intels[start:end], None if points is None else points[start:end])
+        start = end
+    return np.array(levels, dtype=np.float64)
+
+
+def score_corpus(detector_name, conversations, workers=1, chunk_size=BATCH_CHUNK_SIZE):
+    # Chunks hold whole conversations, about chunk_size messages each
+    chunks, chunk, size = [], [], 0
+    for conversation in conversations:
+        chunk.append(conversation)
+        size += len(conversation)
+        if size >= chunk_size:
+            chunks.append(chunk)
+            chunk, size = [], 0
+    if chunk:
+        chunks.append(chunk)
+
+    if workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(score_chunk, [detector_name] * len(chunks), chunks))
+    else:
+        parts = [score_chunk(detector_name, chunk) for chunk in chunks]
+    return np.concatenate(parts) if parts else np.zeros(0)
+
+
+def cache_key(corpus_bytes, detector_name):
+    digest = hashlib.blake2b(corpus_bytes, digest_size=16)
+    digest.update(f"\0{detector_name}\0{CLASSIFIER_MODEL}\0{RISK_DECAY}".encode())
+    return digest.hexdigest()
+
+
+def load_scores(corpus_path, detector_name, cache_path, workers=1):
+    """(risk levels, labels), from the cache when it matches this corpus + detector"""
+    with open(corpus_path, "rb") as f:
+        data = f.read()
+    key = cache_key(data, detector_name)
+
+    if cache_path and os.path.exists(cache_path):
+        cached = np.load(cache_path)
+        if str(cached["key"]) == key:
+            print(f"using cached scores from {cache_path}", file=sys.stderr)
+            return cached["scores"], cached["labels"]
+
+    conversations, labels = read_conversations(data.decode("utf-8").splitlines())
+    start = time.perf_counter()
+    scores = score_corpus(detector_name, conversations, workers)
+    print(f"scored {len(labels):,} messages in {len(conversations):,} conversations in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+    labels = np.array(labels, dtype=np.int8)
+    if cache_path:
+        with open(cache_path, "wb") as f:
+            np.savez(f, key=key, scores=scores, labels=labels)
+    return scores, labels
+
+
+def sweep(scores, labels):
+    """Confusion counts and rates at every distinct score used as threshold.
+
+    A message is flagged when score >= threshold. Returns a dict of arrays
+    ordered by descending threshold.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    labels = np.asarray(labels, dtype=bool)
+    positives = int(labels.sum())
+    negatives = len(labels) - positives
+
+    order = np.argsort(-scores, kind="stable")
+    sorted_scores = scores[order]
+    tp_cum = np.cumsum(labels[order])
+    fp_cum = np.arange(1, len(scores) + 1) - tp_cum
+
+    # Last position of each run of equal scores: everything up to it is flagged
+    last = np.flatnonzero(np.r_[sorted_scores[1:] != sorted_scores[:-1], True])
+    tp = tp_cum[last]
+    fp = fp_cum[last]
+    flagged = tp + fp
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tpr = tp / positives if positives else np.zeros(len(tp))
+        fpr = fp / negatives if negatives else np.zeros(len(fp))
+        precision = np.where(flagged > 0, tp / flagged, 1.0)
+        f1 = np.where(precision + tpr > 0, 2 * precision * tpr / (precision + tpr), 0.0)
+
+    return {
+        "threshold": sorted_scores[last],
+        "tp": tp, "fp": fp,
+        "fn": positives - tp, "tn": negatives - fp,
+        "tpr": tpr, "fpr": fpr,
+        "precision": precision, "recall": tpr, "f1": f1,
+    }
+
+
+def auc(x, y):
+    """Trapezoid area under a curve given by points sorted along x"""
+    return float(np.sum(np.diff(x) * (y[1:] + y[:-1]) / 2))
+
+
+def choose(table, metric="f1", min_precision=None, max_score=np.inf):
+    """Index of the best operating point in a sweep table, among the
+    thresholds load_detector_config accepts: 0 < threshold <= max_score"""
+    threshold = table["threshold"]
+    ok = np.flatnonzero((threshold > 0) & (threshold <= max_score))
+    if min_precision is not None:
+        ok = ok[table["precision"][ok] >= min_precision]
+        if not len(ok):
+            raise SystemExit(f"No threshold reaches precision {min_precision}")
+        return int(ok[np.argmax(table["recall"][ok])])
+    if not len(ok):
+        raise SystemExit(f"No threshold in (0, {max_score}] to choose from")
+    if metric == "youden":
+        return int(ok[np.argmax(table["tpr"][ok] - table["fpr"][ok])])
+    return int(ok[np.argmax(table["f1"][ok])])
+
+
+def write_threshold(path, detector_name, threshold, stats):
+    """Update one detector's entry in the config file, keeping the others"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+    except FileNotFoundError:
+        config = {}
+    config[detector_name] = {"threshold": threshold, **stats}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2)
+        f.write("\n")
+
+
+def print_table(table, rows=20):
+    step = max(1, len(table["threshold"]) // rows)
+    print(f"{'threshold':>10} {'tpr':>7} {'fpr':>7} {'precision':>10} {'f1':>7}")
+    for i in range(0, len(table["threshold"]), step):
+        print(f"{table['threshold'][i]:>10g} {table['tpr'][i]:>7.3f} {table['fpr'][i]:>7.3f} "
+              f"{table['precision'][i]:>10.3f} {table['f1'][i]:>7.3f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Calibrate a scam detector threshold")
+    parser.add_argument("corpus", help="labeled JSONL corpus")
+    parser.add_argument("--detector", choices=sorted(DETECTORS), default="simple")
+    parser.add_argument("--metric", choices=["f1", "youden"], default="f1", help="operating point to pick")
+    parser.add_argument("--min-precision", type=float, help="pick the highest recall at this precision instead")
+    parser.add_argument("--cache", help="score cache file (default: <corpus>.<detector>.scores.npz)")
+    parser.add_argument("--config", default=DETECTOR_CONFIG, help="detector config file to update")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS, help="worker processes for scoring")
+    parser.add_argument("--tables", help="write the full ROC / PR sweep as CSV here")
+    parser.add_argument("--dry-run", action="store_true", help="report only, do not write the config")
+    args = parser.parse_args(argv)
+
+    cache = args.cache or f"{args.corpus}.{args.detector}.scores.npz"
+    scores, labels = load_scores(args.corpus, args.detector, cache, args.workers)
+    if not labels.any() or labels.all():
+        raise SystemExit("Corpus needs both scam and benign messages")
+
+    start = time.perf_counter()
+    table = sweep(scores, labels)
+    best = choose(table, args.metric, args.min_precision, DETECTORS[args.detector].MAX_SCORE)
+    elapsed = time.perf_counter() - start
+
+    roc_auc = auc(np.r_[0.0, table["fpr"]], np.r_[0.0, table["tpr"]])
+    pr_auc = auc(np.r_[0.0, table["recall"]], np.r_[1.0, table["precision"]])
+
+    print_table(table)
+    if args.tables:
+        np.savetxt(args.tables, np.column_stack([table[k] for k in table]), delimiter=",",
+                   header=",".join(table), comments="", fmt="%.6g")
+
+    threshold = table["threshold"][best].item()
+    if float(threshold).is_integer():
+        threshold = int(threshold)
+    stats = {
+        "precision": round(float(table["precision"][best]), 4),
+        "recall": round(float(table["recall"][best]), 4),
+        "fpr": round(float(table["fpr"][best]), 4),
+        "rocAuc": round(roc_auc, 4),
+        "prAuc": round(pr_auc, 4),
+        "messages": int(len(labels)),
+    }
+    print(f"\nswept {len(table['threshold']):,} thresholds in {elapsed * 1000:.1f}ms")
+    print(f"ROC AUC {roc_auc:.4f}  PR AUC {pr_auc:.4f}")
+    print(f"chosen threshold for {args.detector}: {threshold} "
+          f"(precision {stats['precision']}, recall {stats['recall']}, fpr {stats['fpr']})")
+
+    if not args.dry_run:
+        write_threshold(args.config, args.detector, threshold, stats)
+        print(f"wrote {args.config}")
+
+
+if __name__ == "__main__":
+    main()
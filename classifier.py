@@ -0,0 +1,189 @@
+"""
+Hashed n-gram logistic regression scam classifier (NumPy only).
+
+Word unigrams and bigrams are hashed with CRC32 (stable across processes,
+unlike hash()) into a fixed number of buckets. The model is one flat
+float32 array, the bias followed by one weight per bucket, saved as .npy
+and memory-mapped read-only on load, so every worker process shares the
+same page-cache pages instead of holding its own copy.
+
+Train:  python classifier.py corpus.jsonl -o scam_model.npy
+        (one {"text": "...", "label": 1} object per line; 1/"scam" for
+        scams, 0/"benign" for everything else)
+"""
+
+import argparse
+import json
+import logging
+import re
+import sys
+import time
+import zlib
+from typing import Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("AEGIS")
+
+TOKEN = re.compile(r"\w+")
+DEFAULT_BUCKETS = 1 << 18
+
+SCAM_LABELS = {"1", "true", "scam", "spam", "fraud"}
+BENIGN_LABELS = {"0", "false", "benign", "ham", "legit"}
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN.findall(text.lower())
+
+
+def features(tokens: Sequence[str], buckets: int) -> np.ndarray:
+    """Distinct hashed unigram + bigram buckets of one tokenized message"""
+    grams = list(tokens) + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    hashed = {zlib.crc32(g.encode()) % buckets for g in grams}
+    return np.fromiter(hashed, dtype=np.int64, count=len(hashed))
+
+
+def feature_matrix(token_lists: Sequence[Sequence[str]], buckets: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Sparse binary design matrix as (row of each entry, bucket of each entry)"""
+    cols = [features(tokens, buckets) for tokens in token_lists]
+    rows = np.repeat(np.arange(len(cols), dtype=np.int64), [len(c) for c in cols])
+    cols = np.concatenate(cols) if cols else np.zeros(0, dtype=np.int64)
+    return rows, cols
+
+
+def _sigmoid(z: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -30.0, 30.0)))
+
+
+class ScamClassifier:
+    """Logistic regression over hashed n-grams, backed by one flat array"""
+
+    def __init__(self, weights: np.ndarray):
+        if weights.ndim != 1 or weights.dtype != np.float32 or len(weights) < 2:
+            raise ValueError("Model must be a flat float32 array: bias + bucket weights")
+        self.weights = weights
+        self.bias = float(weights[0])
+        self.buckets = len(weights) - 1
+
+    @classmethod
+    def load(cls, path: str) -> "ScamClassifier":
+        """Memory-map a saved model (read-only, shared between processes)"""
+        model = cls(np.load(path, mmap_mode="r"))
+        logger.info(f"Loaded scam classifier from {path} ({model.buckets} buckets)")
+        return model
+
+    def save(self, path: str) -> None:
+        np.save(path, np.ascontiguousarray(self.weights, dtype=np.float32))
+
+    def _logits(self, rows: np.ndarray, cols: np.ndarray, n: int) -> np.ndarray:
+        # bincount sums each row's weights in entry order, so a message
+        # scores identically alone or inside a batch
+        return self.bias + np.bincount(rows, weights=self.weights[1:][cols], minlength=n)
+
+    def predict_proba_batch(self, texts: Sequence[str]) -> np.ndarray:
+        """Scam probability for each message"""
+        return self.predict_proba_tokens([tokenize(t) for t in texts])
+
+    def predict_proba_tokens(self, token_lists: Sequence[Sequence[str]]) -> np.ndarray:
+        """predict_proba_batch() for messages already split by tokenize()"""
+        rows, cols = feature_matrix(token_lists, self.buckets)
+        return _sigmoid(self._logits(rows, cols, len(token_lists)))
+
+    def predict_proba(self, text: str) -> float:
+        return float(self.predict_proba_batch([text])[0])
+
+
+def train(
+    texts: Sequence[str],
+    labels: Sequence[int],
+    buckets: int = DEFAULT_BUCKETS,
+    epochs: int = 200,
+    lr: float = 0.5,
+    l2: float = 1e-6,
+) -> ScamClassifier:
+    """Fit by full-batch AdaGrad on the L2-regularized log loss"""
+    n = len(texts)
+    if n == 0:
+        raise ValueError("Empty training corpus")
+
+    y = np.asarray(labels, dtype=np.float64)
+    rows, cols = feature_matrix([tokenize(t) for t in texts], buckets)
+    w = np.zeros(buckets, dtype=np.float64)
+    b = 0.0
+    g2_w = np.full(buckets, 1e-8)
+    g2_b = 1e-8
+
+    for _ in range(epochs):
+        p = _sigmoid(b + np.bincount(rows, weights=w[cols], minlength=n))
+        err = p - y
+        grad_w = np.bincount(cols, weights=err[rows], minlength=buckets) / n + l2 * w
+        grad_b = err.mean()
+        g2_w += grad_w * grad_w
+        g2_b += grad_b * grad_b
+        w -= lr * grad_w / np.sqrt(g2_w)
+        b -= lr * grad_b / np.sqrt(g2_b)
+
+    return ScamClassifier(np.concatenate(([b], w)).astype(np.float32))
+
+
+def parse_label(value) -> int:
+    label = str(value).strip().lower()
+    if label in SCAM_LABELS:
+        return 1
+    if label in BENIGN_LABELS:
+        return 0
+    raise ValueError(f"Unknown label {value!r}")
+
+
+def read_corpus(lines: Iterable[str]) -> Tuple[List[str], List[int]]:
+    texts, labels = [], []
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            texts.append(str(record["text"]))
+            labels.append(parse_label(record["label"]))
+        except (ValueError, KeyError, TypeError) as e:
+            raise SystemExit(f"line {number}: {e}")
+    return texts, labels
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("corpus", help="labeled JSONL corpus ('-' for stdin)")
+    parser.add_argument("-o", "--output", default="scam_model.npy", help="model file to write")
+    parser.add_argument("--buckets", type=int, default=DEFAULT_BUCKETS)
+    parser.add_argument("--epochs", type=int, default=200)
+    parser.add_argument("--lr", type=float, default=0.5)
+    parser.add_argument("--l2", type=float, default=1e-6)
+    parser.add_argument("--holdout", type=float, default=0.2, help="fraction held out for evaluation")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.corpus == "-":
+        texts, labels = read_corpus(sys.stdin)
+    else:
+        with open(args.corpus, encoding="utf-8") as f:
+            texts, labels = read_corpus(f)
+
+    order = np.random.default_rng(args.seed).permutation(len(texts))
+    split = int(len(texts) * (1 - args.holdout)) if len(texts) > 1 else len(texts)
+    train_idx, test_idx = order[:split], order[split:]
+
+    start = time.perf_counter()
+    model = train([texts[i] for i in train_idx], [labels[i] for i in train_idx],
+                  buckets=args.buckets, epochs=args.epochs, lr=args.lr, l2=args.l2)
+    print(f"trained on {len(train_idx)} messages in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+    if len(test_idx):
+        predicted = model.predict_proba_batch([texts[i] for i in test_idx]) >= 0.5
+        actual = np.array([labels[i] for i in test_idx], dtype=bool)
+        print(f"held-out accuracy: {(predicted == actual).mean():.3f} on {len(test_idx)} messages", file=sys.stderr)
+
+    model.save(args.output)
+    print(f"wrote {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
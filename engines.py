@@ -0,0 +1,200 @@
+"""
+Pluggable analysis engines and shadow-mode comparison.
+
+An engine turns one scammer message into intelligence (``extract``) and a
+scam score (``assess``). The engine serving /honeypot is the primary; a
+shadow engine can be run on a sample of live traffic, off the request
+thread, to measure its per-stage latency and how often it agrees with the
+primary before switching over.
+"""
+
+import logging
+import random
+import re
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger("AEGIS")
+
+COMPARED_FIELDS = ("bankAccounts", "upiIds", "phishingLinks", "phoneNumbers", "suspiciousKeywords")
+
+
+class BackupIntelligenceExtractor:
+    """main_backup's IntelligenceExtractor, with its patterns precompiled.
+
+    Behaviour is kept as-is (so shadow results measure the real
+    alternative) except that the UPI handle group is non-capturing: with
+    it capturing, re.findall returned only the handle ("ybl"), never the
+    UPI ID.
+    """
+
+    PATTERNS = {
+        "bank_account": re.compile(r'\b(?:A\/c|Account|Acct|A/C)?[\s:-]*\d{11,17}\b'),
+        "upi_id": re.compile(r'\b[a-zA-Z0-9.\-_]{2,256}@(?:okaxis|oksbi|okhdfc|okicici|paytm|upi|ybl|ibl|axl|apl)\b'),
+        "phone_india": re.compile(r'\b(?:\+91[\s-]?|91[\s-]?|0)?[6-9]\d{2}[\s-]?\d{3}[\s-]?\d{4}\b'),
+        "url": re.compile(r'\b(?:https?:\/\/|www\.)[^\s<>"]+|(?:bit\.ly|tinyurl\.com|t\.co|goo\.gl|rb\.gy)\/[^\s<>"]+'),
+        "email": re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b'),
+    }
+
+    TLDS = ('.com', '.in', '.org', '.net', '.co')
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords = list(keywords)
+
+    def extract(self, text: str) -> dict:
+        intel = {f: [] for f in COMPARED_FIELDS}
+        intel["emails"] = []
+
+        intel["phoneNumbers"] = self.PATTERNS["phone_india"].findall(text)
+        intel["bankAccounts"] = [
+            num for num in self.PATTERNS["bank_account"].findall(text)
+            if len(num.replace('+', '').replace('-', '').replace(' ', '')) >= 12
+        ]
+        intel["emails"] = self.PATTERNS["email"].findall(text)
+
+        for u in self.PATTERNS["upi_id"].findall(text):
+            local, _, domain = u.partition("@")
+            if len(local) <= 2:
+                continue
+            if '.' not in domain or not domain.endswith(self.TLDS):
+                intel["upiIds"].append(u)
+            elif u not in intel["emails"]:
+                intel["emails"].append(u)
+
+        intel["phishingLinks"] = self.PATTERNS["url"].findall(text)
+
+        text_lower = text.lower()
+        intel["suspiciousKeywords"] = [kw for kw in self.keywords if kw in text_lower]
+
+        return {k: list(set(v)) for k, v in intel.items()}
+
+
+class LatencyStats:
+    """Rolling latency samples per (engine, stage)"""
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self._samples: Dict[Tuple[str, str], deque] = {}
+
+    def add(self, engine: str, stage: str, seconds: float) -> None:
+        key = (engine, stage)
+        if key not in self._samples:
+            self._samples[key] = deque(maxlen=self.window)
+        self._samples[key].append(seconds)
+
+    def report(self) -> dict:
+        report: Dict[str, dict] = {}
+        for (engine, stage), samples in self._samples.items():
+            ordered = sorted(samples)
+            n = len(ordered)
+            report.setdefault(engine, {})[stage] = {
+                "samples": n,
+                "meanMs": round(1000 * sum(ordered) / n, 3),
+                "p50Ms": round(1000 * ordered[n // 2], 3),
+                "p95Ms": round(1000 * ordered[min(n - 1, int(n * 0.95))], 3),
+            }
+        return report
+
+
+def run_engine(engine, doc, history) -> Tuple[dict, Tuple[int, dict], Dict[str, float]]:
+    """(intel, (points, hits), stage timings in seconds) for one message"""
+    start = time.perf_counter()
+    intel = engine.extract(doc)
+    extracted = time.perf_counter()
+    assessment = engine.assess(doc, intel, history)
+    done = time.perf_counter()
+    return intel, assessment, {"extract": extracted - start, "detect": done - extracted}
+
+
+class ShadowRunner:
+    """Runs a shadow engine on sampled traffic in a background thread.
+
+    ``observe`` is called on the request thread with the primary engine's
+    results and timings; it only rolls the sampling dice and enqueues, so
+    the request never waits on the shadow engine. When the shadow falls
+    behind by ``max_pending`` messages, new samples are dropped.
+    """
+
+    def __init__(self, primary, shadow, sample_rate: float = 0.05, max_pending: int = 100,
+                 normalize: Optional[Callable[[dict], dict]] = None):
+        self.primary = primary
+        self.shadow = shadow
+        # Maps both engines' intel to one normal form before fields are compared
+        self.normalize = normalize or (lambda intel: intel)
+        self.sample_rate = sample_rate
+        self.max_pending = max_pending
+        self.latency = LatencyStats()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shadow")
+        self._lock = Lock()
+        self._pending = 0
+        self.compared = 0
+        self.dropped = 0
+        self.failed = 0
+        self.detection_agreed = 0
+        self.field_agreed = dict.fromkeys(COMPARED_FIELDS, 0)
+
+    def record_primary(self, timings: Dict[str, float]) -> None:
+        with self._lock:
+            for stage, seconds in timings.items():
+                self.latency.add(self.primary.name, stage, seconds)
+
+    def observe(self, doc, history, intel, is_scam) -> bool:
+        """Maybe queue one message for shadow comparison; True if queued"""
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return False
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.dropped += 1
+                return False
+            self._pending += 1
+        self._executor.submit(self._compare, doc, list(history), intel, is_scam)
+        return True
+
+    def _compare(self, doc, history, intel, is_scam) -> None:
+        try:
+            shadow_intel, (points, _), timings = run_engine(self.shadow, doc, history)
+            shadow_scam = points >= self.shadow.threshold
+            ours, theirs = self.normalize(intel), self.normalize(shadow_intel)
+        except Exception as e:
+            logger.error(f"Shadow engine {self.shadow.name} failed: {e}")
+            with self._lock:
+                self._pending -= 1
+                self.failed += 1
+            return
+
+        with self._lock:
+            self._pending -= 1
+            self.compared += 1
+            self.detection_agreed += shadow_scam == is_scam
+            for field_name in COMPARED_FIELDS:
+                self.field_agreed[field_name] += set(theirs.get(field_name, [])) == set(ours.get(field_name, []))
+            for stage, seconds in timings.items():
+                self.latency.add(self.shadow.name, stage, seconds)
+
+    def drain(self, timeout: float = 5.0) -> None:
+        """Wait until queued comparisons finish (tests / shutdown)"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._lock:
+                if not self._pending:
+                    return
+            time.sleep(0.005)
+
+    def report(self) -> dict:
+        with self._lock:
+            n = self.compared
+            return {
+                "primary": self.primary.name,
+                "shadow": self.shadow.name,
+                "sampleRate": self.sample_rate,
+                "compared": n,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "pending": self._pending,
+                "detectionAgreement": round(self.detection_agreed / n, 4) if n else None,
+                "fieldAgreement": {f: round(c / n, 4) if n else None for f, c in self.field_agreed.items()},
+                "latency": self.latency.report(),
+            }
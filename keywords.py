@@ -0,0 +1,130 @@
+"""
+Keyword matching shared by the extractor and the detectors.
+
+All keyword lists are compiled once into a single automaton: a trie of the
+keywords rendered as one regex (the trie factoring keeps each position's
+work bounded by the trie depth, not the number of keywords). The lowercased
+text is swept left to right once; each hit reports the longest keyword at
+that position plus the keywords that are prefixes of it, so overlapping
+matches ("blocked" / "locked", "pin" / "pin code") are all found.
+"""
+
+import re
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+
+
+def _trie_pattern(node: dict) -> str:
+    """Render a trie node as a regex that prefers the longest keyword"""
+    branches = [re.escape(ch) + _trie_pattern(child) for ch, child in sorted(node.items()) if ch]
+    if not branches:
+        return ""
+    body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    # A keyword ends here: the longer continuation is optional
+    return f"(?:{body})?" if "" in node else body
+
+
+class KeywordMatcher:
+    """Multi-category keyword matcher built once, scanned in one pass"""
+
+    def __init__(self, categories: Dict[str, Iterable[str]], word_boundary: bool = False):
+        self.word_boundary = word_boundary
+        self.categories: Dict[str, List[str]] = {}
+        self._owners: Dict[str, List[str]] = {}
+
+        for name, words in categories.items():
+            self.categories[name] = sorted({w.lower() for w in words if w})
+            for word in self.categories[name]:
+                self._owners.setdefault(word, []).append(name)
+
+        self.max_length = max(map(len, self._owners), default=0)
+
+        trie: dict = {}
+        for word in self._owners:
+            node = trie
+            for ch in word:
+                node = node.setdefault(ch, {})
+            node[""] = True
+
+        # Keywords that end inside a longer keyword's path ("pin" in "pin code")
+        self._prefixes: Dict[str, List[str]] = {
+            word: [word[:i] for i in range(1, len(word)) if word[:i] in self._owners]
+            for word in self._owners
+        }
+
+        self._pattern = None
+        if self._owners:
+            lead = r"(?<!\w)" if word_boundary else ""
+            self._pattern = re.compile(lead + _trie_pattern(trie))
+
+    def _ends_on_boundary(self, text_lower: str, end: int) -> bool:
+        return end >= len(text_lower) or not (text_lower[end].isalnum() or text_lower[end] == "_")
+
+    def finditer(self, text_lower: str) -> Iterator[Tuple[int, str]]:
+        """(start, keyword) for every keyword occurrence in lowercased text"""
+        if self._pattern is None:
+            return
+
+        search = self._pattern.search
+        match = search(text_lower)
+        while match:
+            start = match.start()
+            for word in (match.group(), *self._prefixes[match.group()]):
+                if not self.word_boundary or self._ends_on_boundary(text_lower, start + len(word)):
+                    yield start, word
+            match = search(text_lower, start + 1)
+
+    def matches(self, text_lower: str) -> Set[str]:
+        """Distinct keywords present in already-lowercased text"""
+        return {word for _, word in self.finditer(text_lower)}
+
+    def scan(self, text_lower: str) -> Dict[str, List[str]]:
+        """Matched keywords per category"""
+        hits: Dict[str, List[str]] = {name: [] for name in self.categories}
+        for word in self.matches(text_lower):
+            for name in self._owners[word]:
+                hits[name].append(word)
+        return hits
+
+    def counts(self, text_lower: str) -> Dict[str, int]:
+        """Number of distinct keywords hit per category"""
+        return {name: len(words) for name, words in self.scan(text_lower).items()}
+
+
+class TokenPhraseMatcher:
+    """Phrase matcher over pre-split word tokens
+
+    Phrases are indexed by their first token, so a scan costs one dict
+    lookup per token; a phrase matches only on whole tokens ("pin" does not
+    hit "spinning", "bank account" hits "bank-account").
+    """
+
+    def __init__(self, categories: Dict[str, Iterable[str]]):
+        self.categories: Dict[str, List[str]] = {}
+        self._owners: Dict[Tuple[str, ...], List[str]] = {}
+        self._index: Dict[str, List[Tuple[str, ...]]] = {}
+
+        for name, phrases in categories.items():
+            self.categories[name] = sorted({p.lower() for p in phrases if p.split()})
+            for phrase in self.categories[name]:
+                key = tuple(phrase.split())
+                if key not in self._owners:
+                    self._index.setdefault(key[0], []).append(key)
+                self._owners.setdefault(key, []).append(name)
+
+    def matches(self, tokens: List[str]) -> Set[Tuple[str, ...]]:
+        """Distinct phrases (as token tuples) present in the token list"""
+        found = set()
+        index = self._index
+        for i, token in enumerate(tokens):
+            for key in index.get(token, ()):
+                if len(key) == 1 or tuple(tokens[i:i + len(key)]) == key:
+                    found.add(key)
+        return found
+
+    def counts(self, tokens: List[str]) -> Dict[str, int]:
+        """Number of distinct phrases hit per category"""
+        counts = dict.fromkeys(self.categories, 0)
+        for key in self.matches(tokens):
+            for name in self._owners[key]:
+                counts[name] += 1
+        return counts
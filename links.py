@@ -0,0 +1,242 @@
+"""
+Phishing link canonicalization.
+
+The same link shows up with trailing punctuation, a "www." prefix, mixed
+case hosts or tracking parameters; canonicalizing before storing keeps
+those from counting as separate phishingLinks. Results are memoized in a
+bounded LRU keyed by the raw string, since scammers reuse the same few
+links across many sessions.
+
+Shortener links can optionally be expanded through a resolver hook. That
+is a network round trip per hop, so it never happens while a message is
+extracted: canonicalize() is pure, and expand_all() resolves a session's
+shortener links on a thread pool under one overall deadline when the
+final result is reported, keeping the shortener URL the scammer sent
+next to its target. Successful expansions are cached; a failed one is
+only remembered for ``failure_ttl`` seconds, so a shortener that timed
+out once is tried again later.
+"""
+
+import logging
+import posixpath
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Sequence
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+
+logger = logging.getLogger("AEGIS")
+
+SHORTENERS = frozenset({
+    "bit.ly", "tinyurl.com", "t.co", "goo.gl", "rb.gy", "is.gd",
+    "cutt.ly", "shorturl.at", "tiny.cc", "ow.ly", "s.id", "t.ly",
+})
+
+# Regex alternation of the shortener hosts, for links typed without a
+# scheme or "www." ("bit.ly/xyz")
+SHORTENER_PATTERN = "|".join(re.escape(h) for h in sorted(SHORTENERS, key=len, reverse=True))
+
+# Query parameters that only carry tracking information
+TRACKING_PARAMS = frozenset({
+    "fbclid", "gclid", "dclid", "msclkid", "igshid", "mc_cid", "mc_eid",
+    "ref", "ref_src", "si", "_ga",
+})
+TRACKING_PREFIXES = ("utm_",)
+
+# Second-level suffixes under which registrations happen (e.g. x.co.in)
+MULTI_LABEL_SUFFIXES = frozenset({
+    "co.in", "net.in", "org.in", "firm.in", "gen.in", "ind.in", "gov.in",
+    "nic.in", "ac.in", "edu.in", "res.in", "co.uk", "org.uk", "com.au",
+    "co.za", "com.br", "com.sg", "com.my", "co.jp", "com.cn", "com.pk",
+})
+
+TRAILING_PUNCTUATION = ".,;:!?'\"*"
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+@dataclass(frozen=True)
+class Link:
+    url: str                # canonical form, stored in phishingLinks
+    host: str
+    registered_domain: str
+    expanded_from: Optional[str] = None  # canonical shortener URL, if resolved
+
+
+def registered_domain(host: str) -> str:
+    """Domain a link was registered under ("a.b.sbi-kyc.co.in" -> "sbi-kyc.co.in")"""
+    labels = host.split(".")
+    if len(labels) <= 2 or host.replace(".", "").isdigit():
+        return host
+    if ".".join(labels[-2:]) in MULTI_LABEL_SUFFIXES:
+        return ".".join(labels[-3:])
+    return ".".join(labels[-2:])
+
+
+def strip_punctuation(raw: str) -> str:
+    """Drop sentence punctuation and unbalanced closing brackets"""
+    url = raw.strip()
+    while url:
+        if url[-1] in TRAILING_PUNCTUATION:
+            url = url[:-1]
+        elif url[-1] in ")]}" and url.count(url[-1]) > url.count({")": "(", "]": "[", "}": "{"}[url[-1]]):
+            url = url[:-1]
+        else:
+            break
+    return url
+
+
+def http_resolver(url: str, timeout: float = 3.0) -> Optional[str]:
+    """Follow a shortener's redirects; returns the final URL or None"""
+    try:
+        response = requests.head(url, allow_redirects=True, timeout=timeout)
+    except requests.RequestException as e:
+        logger.warning(f"Could not expand {url}: {e}")
+        return None
+    return response.url if response.url and response.url != url else None
+
+
+class LinkCanonicalizer:
+    """Canonicalize raw link matches, memoized in a bounded LRU"""
+
+    def __init__(
+        self,
+        resolver: Optional[Callable[[str], Optional[str]]] = None,
+        shorteners=SHORTENERS,
+        maxsize: int = 4096,
+        max_redirects: int = 3,
+        failure_ttl: float = 300.0,
+        max_threads: int = 4,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.resolver = resolver
+        self.shorteners = frozenset(shorteners)
+        self.maxsize = maxsize
+        self.max_redirects = max_redirects
+        self.failure_ttl = failure_ttl
+        self.max_threads = max_threads
+        self.clock = clock
+        self.canonicalize: Callable[[str], Link] = lru_cache(maxsize=maxsize)(self._parse)
+        self._expanded: "OrderedDict[str, Link]" = OrderedDict()  # shortener URL -> target, LRU
+        self._failed: Dict[str, float] = {}  # shortener URL -> when to try it again
+        self._lock = threading.Lock()
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    def _parse(self, raw: str) -> Link:
+        url = strip_punctuation(raw)
+        try:
+            return self._split(url)
+        except ValueError:
+            # Scammer text like "http://[abc" is no parseable URL; keep it as typed
+            return Link(url=url, host="", registered_domain="")
+
+    def _split(self, url: str) -> Link:
+        if "://" not in url:
+            url = "http://" + url
+        parts = urlsplit(url)
+
+        scheme = parts.scheme.lower()
+        host = (parts.hostname or "").rstrip(".")
+        if host.startswith("www."):
+            host = host[4:]
+        try:
+            port = parts.port
+        except ValueError:
+            port = None
+        netloc = host if port in (None, DEFAULT_PORTS.get(scheme)) else f"{host}:{port}"
+
+        path = parts.path or "/"
+        trailing = path.endswith("/")
+        path = posixpath.normpath(path)
+        if path.startswith("//"):
+            path = "/" + path.lstrip("/")
+        if trailing and path != "/":
+            path += "/"
+
+        query = sorted(
+            (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+            if k.lower() not in TRACKING_PARAMS and not k.lower().startswith(TRACKING_PREFIXES)
+        )
+        canonical = f"{scheme}://{netloc}{path}"
+        if query:
+            canonical += "?" + urlencode(query)
+        return Link(url=canonical, host=host, registered_domain=registered_domain(host))
+
+    def expand(self, url: str) -> Optional[Link]:
+        """Target of a canonical shortener link (``expanded_from`` set), or
+        None if it is no shortener link or cannot be resolved now"""
+        if self.resolver is None or self.canonicalize(url).host not in self.shorteners:
+            return None
+        with self._lock:
+            if url in self._expanded:
+                self._expanded.move_to_end(url)
+                return self._expanded[url]
+            if self._failed.get(url, 0.0) > self.clock():
+                return None
+
+        link = origin = self.canonicalize(url)
+        for _ in range(self.max_redirects):
+            if link.host not in self.shorteners:
+                break
+            target = self.resolver(link.url)
+            if not target:
+                break
+            link = self._parse(target)
+
+        with self._lock:
+            if link.url == origin.url:
+                self._failed[url] = self.clock() + self.failure_ttl
+                if len(self._failed) > self.maxsize:
+                    del self._failed[next(iter(self._failed))]
+                return None
+            self._failed.pop(url, None)
+            link = Link(link.url, link.host, link.registered_domain, expanded_from=url)
+            self._expanded[url] = link
+            if len(self._expanded) > self.maxsize:
+                self._expanded.popitem(last=False)
+            return link
+
+    def expand_all(self, urls: Sequence[str], timeout: float) -> List[str]:
+        """``urls`` with each shortener link's target added after it.
+
+        Shortener links are resolved in parallel and the call returns after
+        ``timeout`` seconds at most; a link still resolving then is kept
+        unexpanded (its result is cached for the next call).
+        """
+        shortened = [url for url in urls if self.resolver is not None
+                     and self.canonicalize(url).host in self.shorteners]
+        if not shortened:
+            return list(urls)
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_threads, thread_name_prefix="links")
+        pending = {url: self._pool.submit(self.expand, url) for url in dict.fromkeys(shortened)}
+        wait(pending.values(), timeout=timeout)
+
+        result = {}
+        for url in urls:
+            result[url] = None
+            future = pending.get(url)
+            if future is None or not future.done() or future.exception() is not None:
+                continue
+            link = future.result()
+            if link is not None:
+                result[link.url] = None
+        return list(result)
+
+    def stats(self) -> dict:
+        info = self.canonicalize.cache_info()
+        lookups = info.hits + info.misses
+        return {
+            "hits": info.hits,
+            "misses": info.misses,
+            "size": info.currsize,
+            "hitRate": round(info.hits / lookups, 4) if lookups else 0.0,
+            "expanded": len(self._expanded),
+            "expandFailed": len(self._failed),
+        }
@@ -0,0 +1,436 @@
+"""
+Latency budget, circuit breaker and scheduler for LLM calls.
+
+Every /honeypot reply waits on one chat completion, whose latency is the
+LLM provider's, not ours. LLMBudget bounds that wait: a call that has not
+answered within ``budget`` seconds raises TimeoutError, so the handler can
+answer with a canned reply instead and the request's latency stays below
+the budget plus our own (sub-millisecond) work, whatever the LLM does.
+
+Optionally the call is hedged: if the first request has not answered
+after ``hedge`` seconds (fixed, or the rolling p95 of recent calls), an
+identical second request is sent and whichever answers first wins. The
+tail of a single request is rarely the tail of two.
+
+A completion that misses the budget is either cancelled or kept running
+and handed to ``on_late`` when it lands (for its extracted intelligence).
+Sync calls run on a thread pool, since a blocking HTTP call cannot be
+interrupted; they are always left to finish, bounded by the client's own
+timeout, and ``keep_late`` only decides whether on_late sees the result.
+
+CircuitBreaker stops calling the LLM at all while it is failing: once
+enough of the recent calls failed (errors and budget timeouts alike) it
+opens, and callers go straight to their fallback with no network wait.
+After a cooldown it lets a probe call through (half-open); the probe's
+outcome closes it again or restarts the cooldown.
+
+LLMScheduler is the admission control in front of both: a bounded number
+of calls in flight, and a priority queue with a wait deadline for the
+rest, so under a burst the most valuable conversations go first and the
+others fall back quickly instead of everyone slowing down together.
+"""
+
+import asyncio
+import heapq
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from threading import Event, Lock
+from typing import Callable, Optional, Union
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class LatencyWindow:
+    """Rolling window of recent call latencies (seconds)"""
+
+    def __init__(self, size: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=size)
+
+    def add(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """q-quantile of the window, None until min_samples calls were seen"""
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+class LLMBudget:
+    """Deadline, hedging and late-result policy around one LLM call"""
+
+    def __init__(
+        self,
+        budget: float = 2.5,
+        hedge: Union[None, float, str] = None,
+        keep_late: bool = True,
+        max_threads: int = 32,
+        window: Optional[LatencyWindow] = None,
+    ):
+        if isinstance(hedge, str) and hedge != "p95":
+            raise ValueError(f"hedge must be seconds or 'p95', got {hedge!r}")
+        self.budget = budget
+        self.hedge = hedge
+        self.keep_late = keep_late
+        self.latency = window or LatencyWindow()
+        self._pool = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix="llm")
+        self._kept = set()  # late asyncio tasks (the loop only holds weak refs)
+        self._lock = Lock()
+        self.counts = {"calls": 0, "timeouts": 0, "hedged": 0, "hedgeWins": 0, "late": 0, "errors": 0}
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.counts[key] += 1
+
+    def hedge_after(self, budget: Optional[float] = None) -> Optional[float]:
+        """Seconds to wait before hedging, None if this call is not hedged"""
+        budget = self.budget if budget is None else budget
+        delay = self.latency.quantile(0.95) if self.hedge == "p95" else self.hedge
+        if delay is None or (budget and delay >= budget):
+            return None
+        return delay
+
+    def _timed(self, fn: Callable):
+        start = time.monotonic()
+        result = fn()
+        self.latency.add(time.monotonic() - start)
+        return result
+
+    async def _timed_async(self, make_call: Callable):
+        start = time.monotonic()
+        result = await make_call()
+        self.latency.add(time.monotonic() - start)
+        return result
+
+    def _late(self, on_late: Optional[Callable], result) -> None:
+        self._count("late")
+        if on_late:
+            on_late(result)
+
+    def call(self, fn: Callable, on_late: Optional[Callable] = None, budget: Optional[float] = None):
+        """fn() within the budget (blocking); raises TimeoutError past it.
+
+        ``budget`` overrides self.budget for this call, e.g. with what is
+        left of it after waiting for a rate-limit slot.
+        """
+        self._count("calls")
+        if not self.budget:
+            return self._timed(fn)
+
+        budget = self.budget if budget is None else max(0.0, budget)
+        deadline = time.monotonic() + budget
+        futures = [self._pool.submit(self._timed, fn)]
+        delay = self.hedge_after(budget)
+        if delay is not None and not wait(futures, timeout=delay).done:
+            self._count("hedged")
+            futures.append(self._pool.submit(self._timed, fn))
+
+        pending, error = set(futures), None
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    if future is not futures[0]:
+                        self._count("hedgeWins")
+                    return future.result()
+                if error is None or future is futures[0]:
+                    error = future.exception()  # all failed: report the primary's error
+        else:
+            self._count("errors")
+            raise error
+
+        self._count("timeouts")
+        for future in futures[1:]:
+            future.cancel()  # a queued hedge never starts
+        if self.keep_late:
+            futures[0].add_done_callback(
+                lambda f: f.cancelled() or f.exception() or self._late(on_late, f.result())
+            )
+        raise TimeoutError(f"LLM call over {budget:.2f}s budget")
+
+    async def call_async(self, make_call: Callable, on_late: Optional[Callable] = None,
+                         budget: Optional[float] = None):
+        """await make_call() within the budget; raises TimeoutError past it"""
+        self._count("calls")
+        if not self.budget:
+            return await self._timed_async(make_call)
+
+        budget = self.budget if budget is None else max(0.0, budget)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + budget
+        tasks = [asyncio.ensure_future(self._timed_async(make_call))]
+        delay = self.hedge_after(budget)
+        if delay is not None:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                self._count("hedged")
+                tasks.append(asyncio.ensure_future(self._timed_async(make_call)))
+
+        pending, error = set(tasks), None
+        while pending:
+            done, pending = await asyncio.wait(pending, timeout=max(0.0, deadline - loop.time()),
+                                               return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                break
+            for task in done:
+                if task.exception() is None:
+                    if task is not tasks[0]:
+                        self._count("hedgeWins")
+                    for other in pending:
+                        other.cancel()
+                    return task.result()
+                if error is None or task is tasks[0]:
+                    error = task.exception()  # all failed: report the primary's error
+        else:
+            self._count("errors")
+            raise error
+
+        self._count("timeouts")
+        for task in tasks[1:]:
+            task.cancel()
+        first = tasks[0]
+        if self.keep_late and not first.done():
+            self._kept.add(first)
+
+            def landed(task):
+                self._kept.discard(task)
+                if not task.cancelled() and task.exception() is None:
+                    self._late(on_late, task.result())
+
+            first.add_done_callback(landed)
+        else:
+            first.cancel()
+        raise TimeoutError(f"LLM call over {budget:.2f}s budget")
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self.counts)
+        p95 = self.latency.quantile(0.95)
+        return {
+            "budgetMs": round(self.budget * 1000),
+            "p95Ms": round(p95 * 1000, 1) if p95 is not None else None,
+            **counts,
+        }
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker over a window of recent call outcomes"""
+
+    def __init__(
+        self,
+        window: int = 20,
+        min_calls: int = 10,
+        failure_rate: float = 0.5,
+        cooldown: float = 30.0,
+        half_open_calls: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.min_calls = min(min_calls, window)
+        self.failure_rate = failure_rate
+        self.cooldown = cooldown
+        self.half_open_calls = half_open_calls
+        self.clock = clock
+        self.state = CLOSED
+        self._outcomes = deque(maxlen=window)  # True = failed
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = Lock()
+        self.rejected = 0
+        self.transitions = deque(maxlen=20)
+
+    def _move(self, state: str, reason: str) -> None:
+        self.transitions.append({"from": self.state, "to": state, "reason": reason, "at": round(time.time(), 3)})
+        self.state = state
+        if state == OPEN:
+            self._opened_at = self.clock()
+        self._outcomes.clear()
+        self._probes = 0
+
+    def allow(self) -> bool:
+        """Whether a call may go out now (False: use the fallback)"""
+        with self._lock:
+            if self.state == OPEN and self.clock() - self._opened_at >= self.cooldown:
+                self._move(HALF_OPEN, f"cooldown {self.cooldown:g}s over")
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and self._probes < self.half_open_calls:
+                self._probes += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._move(CLOSED, "probe succeeded")
+            elif self.state == CLOSED:
+                self._outcomes.append(False)
+
+    def record_failure(self, reason: str = "error") -> None:
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._move(OPEN, f"probe failed ({reason})")
+            elif self.state == CLOSED:
+                self._outcomes.append(True)
+                calls = len(self._outcomes)
+                rate = sum(self._outcomes) / calls
+                if calls >= self.min_calls and rate >= self.failure_rate:
+                    self._move(OPEN, f"{rate:.0%} of last {calls} calls failed (last: {reason})")
+
+    def record_skipped(self) -> None:
+        """An allowed call never went out (throttled locally): free its probe"""
+        with self._lock:
+            if self.state == HALF_OPEN and self._probes:
+                self._probes -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            calls = len(self._outcomes)
+            remaining = self.cooldown - (self.clock() - self._opened_at) if self.state == OPEN else 0.0
+            return {
+                "state": self.state,
+                "windowCalls": calls,
+                "failureRate": round(sum(self._outcomes) / calls, 3) if calls else 0.0,
+                "cooldownRemainingS": round(max(0.0, remaining), 1),
+                "rejected": self.rejected,
+                "transitions": list(self.transitions),
+            }
+
+
+class _Waiter:
+    __slots__ = ("key", "wake", "granted", "cancelled", "since")
+
+    def __init__(self, key, wake, since):
+        self.key = key
+        self.wake = wake
+        self.granted = False
+        self.cancelled = False
+        self.since = since
+
+    def __lt__(self, other):
+        return self.key < other.key
+
+
+class LLMScheduler:
+    """Admission control for LLM calls: bounded in-flight, priority queue.
+
+    At most ``max_in_flight`` calls run at once; later callers queue, and
+    a freed slot goes to the highest-priority waiter (FIFO among equals).
+    A caller that is not admitted within ``queue_timeout`` seconds, or
+    finds ``max_queue`` callers already waiting, is turned away and
+    answers with a fallback instead. Threads and asyncio tasks share the
+    same slots and queue.
+    """
+
+    def __init__(self, max_in_flight: int = 8, queue_timeout: float = 1.0, max_queue: int = 256,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_in_flight = max_in_flight
+        self.queue_timeout = queue_timeout
+        self.max_queue = max_queue
+        self.clock = clock
+        self.in_flight = 0
+        self._queue = []
+        self._waiting = 0
+        self._seq = 0
+        self._lock = Lock()
+        self.waits = LatencyWindow(size=1000, min_samples=1)
+        self.counts = {"admitted": 0, "queued": 0, "timedOut": 0, "rejectedFull": 0, "cancelled": 0}
+        self.peak_queue = 0
+
+    def _try_enter(self, priority: float, wake: Callable):
+        """Under the lock: a slot now (None), a queued waiter, or False if full"""
+        if self.in_flight < self.max_in_flight and not self._waiting:
+            self.in_flight += 1
+            self.counts["admitted"] += 1
+            self.waits.add(0.0)
+            return None
+        if self._waiting >= self.max_queue:
+            self.counts["rejectedFull"] += 1
+            return False
+        self._seq += 1
+        waiter = _Waiter((-priority, self._seq), wake, self.clock())
+        heapq.heappush(self._queue, waiter)
+        self._waiting += 1
+        self.counts["queued"] += 1
+        self.peak_queue = max(self.peak_queue, self._waiting)
+        return waiter
+
+    def _settle(self, waiter: _Waiter, outcome: str = "timedOut") -> bool:
+        """Under the lock, once the wait is over: True if the slot was granted"""
+        if waiter.granted:
+            return True
+        waiter.cancelled = True
+        self._waiting -= 1
+        self.counts[outcome] += 1
+        return False
+
+    def acquire(self, priority: float = 0.0) -> bool:
+        """Wait (blocking) for a slot; False if the queue deadline passed first"""
+        event = Event()
+        with self._lock:
+            waiter = self._try_enter(priority, event.set)
+        if waiter is None or waiter is False:
+            return waiter is None
+        event.wait(self.queue_timeout)
+        with self._lock:
+            return self._settle(waiter)
+
+    async def acquire_async(self, priority: float = 0.0) -> bool:
+        """acquire() for asyncio tasks"""
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+
+        def wake():
+            loop.call_soon_threadsafe(lambda: granted.done() or granted.set_result(True))
+
+        with self._lock:
+            waiter = self._try_enter(priority, wake)
+        if waiter is None or waiter is False:
+            return waiter is None
+        try:
+            await asyncio.wait_for(asyncio.shield(granted), self.queue_timeout)
+        except asyncio.TimeoutError:
+            pass
+        except BaseException:
+            # Cancelled while queued: leave the queue, or hand back a slot
+            # that was granted but will never be used
+            with self._lock:
+                admitted = self._settle(waiter, "cancelled")
+            if admitted:
+                self.release()
+            raise
+        with self._lock:
+            return self._settle(waiter)
+
+    def release(self) -> None:
+        """Free a slot, handing it straight to the best waiter if any"""
+        with self._lock:
+            while self._queue:
+                waiter = heapq.heappop(self._queue)
+                if waiter.cancelled:
+                    continue
+                waiter.granted = True
+                self._waiting -= 1
+                self.counts["admitted"] += 1
+                self.waits.add(self.clock() - waiter.since)
+                waiter.wake()
+                return
+            self.in_flight -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            p50, p95 = self.waits.quantile(0.5), self.waits.quantile(0.95)
+            return {
+                "inFlight": self.in_flight,
+                "maxInFlight": self.max_in_flight,
+                "queueDepth": self._waiting,
+                "peakQueueDepth": self.peak_queue,
+                "waitP50Ms": round(p50 * 1000, 1) if p50 is not None else None,
+                "waitP95Ms": round(p95 * 1000, 1) if p95 is not None else None,
+                **self.counts,
+            }
@@ -4,20 +4,37 @@
 
 import os
 import re
+import hashlib
 import json
+import math
 import logging
 import traceback
 import random
+import time
+import tempfile
+import itertools
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field, asdict
 from typing import Dict, List
 from threading import Lock
-from functools import wraps
+from functools import cached_property, wraps
 
-from flask import Flask, request, jsonify, make_response
-from groq import Groq
+from flask import Flask, Response, request, jsonify, make_response
+from groq import AsyncGroq, Groq, RateLimitError
+import numpy as np
 import requests
 from dotenv import load_dotenv
 
+from analysis_cache import AnalysisCache
+from classifier import TOKEN as WORD_TOKEN, ScamClassifier
+from engines import BackupIntelligenceExtractor, ShadowRunner, run_engine
+from keywords import KeywordMatcher, TokenPhraseMatcher
+from llm import CircuitBreaker, LLMBudget, LLMScheduler
+from links import SHORTENER_PATTERN, LinkCanonicalizer, http_resolver
+from ratelimit import SharedRateLimiter, Throttled, retry_after_seconds
+from templates import MinHashIndex
+
 load_dotenv()
 
 API_KEY = os.getenv("API_KEY")
@@ -29,7 +46,123 @@ if not API_KEY:
 
 CALLBACK_URL = "https://hackathon.guvi.in/api/updateHoneyPotFinalResult"
 
-groq = Groq(api_key=GROQ_API_KEY) if GROQ_API_KEY else None
+# Bulk /extract/batch settings
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", os.cpu_count() or 1))
+BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", 500))
+BATCH_MAX_TEXTS = int(os.getenv("BATCH_MAX_TEXTS", 100000))
+
+# Expand shortener links (bit.ly, tinyurl, ...) with an HTTP lookup when
+# the final result is reported, all of a session's within LINK_EXPAND_MS
+RESOLVE_SHORT_LINKS = os.getenv("RESOLVE_SHORT_LINKS", "").lower() in ("1", "true", "yes")
+LINK_EXPAND_MS = float(os.getenv("LINK_EXPAND_MS", 3000))
+
+# Scam detector used by /honeypot: "simple" (Detector) or "multisignal"
+DETECTOR = os.getenv("DETECTOR", "simple").lower()
+
+# Analysis engine serving /honeypot: "main" (Extractor + DETECTOR) or
+# "backup" (main_backup's IntelligenceExtractor + ScamDetector)
+ENGINE = os.getenv("ENGINE", "main").lower()
+# Engine run in shadow on sampled traffic for /engines/report (off when empty)
+SHADOW_ENGINE = os.getenv("SHADOW_ENGINE", "").lower()
+# Fraction of /honeypot messages also analyzed by the shadow engine
+SHADOW_SAMPLE_RATE = float(os.getenv("SHADOW_SAMPLE_RATE", 0.05))
+# Shadow comparisons allowed to queue up before new samples are dropped
+SHADOW_MAX_PENDING = int(os.getenv("SHADOW_MAX_PENDING", 100))
+
+# Calibrated detector thresholds written by calibrate.py
+DETECTOR_CONFIG = os.getenv(
+    "DETECTOR_CONFIG",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "detector_config.json")
+)
+
+# Hashed n-gram model written by classifier.py, blended into Detector scores
+CLASSIFIER_MODEL = os.getenv("CLASSIFIER_MODEL", "")
+# Points Detector adds for a classifier probability of 1.0 (scaled linearly)
+CLASSIFIER_POINTS = int(os.getenv("CLASSIFIER_POINTS", 40))
+
+# Byte budget of the process-wide per-message analysis cache
+ANALYSIS_CACHE_BYTES = int(os.getenv("ANALYSIS_CACHE_BYTES", 32 * 1024 * 1024))
+
+# Scammer messages kept in the near-duplicate template index (ring buffer)
+TEMPLATE_INDEX_CAPACITY = int(os.getenv("TEMPLATE_INDEX_CAPACITY", 50000))
+# Estimated Jaccard similarity above which two messages share a template
+TEMPLATE_SIMILARITY = float(os.getenv("TEMPLATE_SIMILARITY", 0.5))
+
+# Time /honeypot waits for the LLM before sending a fallback reply (0: no limit)
+LLM_BUDGET_MS = int(os.getenv("LLM_BUDGET_MS", 2500))
+# Hedge a slow LLM call with a second request after this many ms, or "p95"
+# for the rolling p95 of recent calls (unset: no hedging)
+LLM_HEDGE_MS = os.getenv("LLM_HEDGE_MS", "").strip().lower()
+# Keep an over-budget completion running for its extracted intelligence
+LLM_KEEP_LATE = os.getenv("LLM_KEEP_LATE", "true").lower() in ("1", "true", "yes")
+# Hard client-side timeout of one LLM HTTP call, in seconds
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", 20))
+# Groq SDK retries; its own 429 retries would bypass the shared limiter
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 0))
+
+# Rate limit shared by all workers on the host (file-locked token bucket);
+# the concurrency limit adapts (AIMD) to 429s, Retry-After and latency
+LLM_RATE_PER_MIN = float(os.getenv("LLM_RATE_PER_MIN", 30))
+LLM_RATE_BURST = float(os.getenv("LLM_RATE_BURST", 5))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 16))
+LLM_LATENCY_TARGET_MS = int(os.getenv("LLM_LATENCY_TARGET_MS", 2000))
+LLM_RATE_FILE = os.getenv("LLM_RATE_FILE", os.path.join(tempfile.gettempdir(), "aegis-llm-ratelimit.bin"))
+
+# LLM calls running at once per process; more wait in a priority queue for
+# up to LLM_QUEUE_TIMEOUT_MS (LLM_QUEUE_MAX waiting at most), then fall back
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", 8))
+LLM_QUEUE_TIMEOUT_MS = int(os.getenv("LLM_QUEUE_TIMEOUT_MS", 1000))
+LLM_QUEUE_MAX = int(os.getenv("LLM_QUEUE_MAX", 256))
+
+# LLM circuit breaker: open when this share of the last LLM_BREAKER_WINDOW
+# calls failed (at least LLM_BREAKER_MIN_CALLS), probe again after the cooldown
+LLM_BREAKER_WINDOW = int(os.getenv("LLM_BREAKER_WINDOW", 20))
+LLM_BREAKER_MIN_CALLS = int(os.getenv("LLM_BREAKER_MIN_CALLS", 10))
+LLM_BREAKER_FAILURE_RATE = float(os.getenv("LLM_BREAKER_FAILURE_RATE", 0.5))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", 30))
+
+# Weight kept from earlier messages in the running session risk on each new one
+RISK_DECAY = float(os.getenv("RISK_DECAY", 0.5))
+
+# UPI handle registry (one handle per line), re-read when it changes
+UPI_HANDLES_FILE = os.getenv(
+    "UPI_HANDLES_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "upi_handles.txt")
+)
+
+groq = Groq(api_key=GROQ_API_KEY, timeout=LLM_TIMEOUT, max_retries=LLM_MAX_RETRIES) if GROQ_API_KEY else None
+# Used by the asyncio server (asgi.py); one connection pool per process
+async_groq = (AsyncGroq(api_key=GROQ_API_KEY, timeout=LLM_TIMEOUT, max_retries=LLM_MAX_RETRIES)
+              if GROQ_API_KEY else None)
+
+llm_budget = LLMBudget(
+    budget=LLM_BUDGET_MS / 1000,
+    hedge=(None if not LLM_HEDGE_MS else
+           "p95" if LLM_HEDGE_MS == "p95" else float(LLM_HEDGE_MS) / 1000),
+    keep_late=LLM_KEEP_LATE,
+)
+# Sessions near the end of the engagement, or just yielding intel, go first
+llm_scheduler = LLMScheduler(
+    max_in_flight=LLM_MAX_IN_FLIGHT,
+    queue_timeout=LLM_QUEUE_TIMEOUT_MS / 1000,
+    max_queue=LLM_QUEUE_MAX,
+)
+# Every worker process maps the same state file
+llm_limiter = SharedRateLimiter(
+    LLM_RATE_FILE,
+    rate=LLM_RATE_PER_MIN / 60,
+    burst=LLM_RATE_BURST,
+    max_concurrency=LLM_MAX_CONCURRENCY,
+    latency_target=LLM_LATENCY_TARGET_MS / 1000,
+    lease=LLM_TIMEOUT + 5,
+)
+# While open, replies come from FALLBACK_POOL without touching the network
+llm_breaker = CircuitBreaker(
+    window=LLM_BREAKER_WINDOW,
+    min_calls=LLM_BREAKER_MIN_CALLS,
+    failure_rate=LLM_BREAKER_FAILURE_RATE,
+    cooldown=LLM_BREAKER_COOLDOWN,
+)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("AEGIS")
@@ -53,6 +186,39 @@ class Intelligence:
     employeeIds: List[str] = field(default_factory=list)
 
 
+@dataclass
+class RiskState:
+    """Running per-session scam risk, updated in O(1) per message.
+
+    Detection thresholds ``level``, not ``score``: the decayed sum grows
+    toward 1 / (1 - decay) times a repeated message's points, while
+    thresholds are calibrated for one message's score. ``level`` divides
+    by the decayed weight, so it stays in single-message units and a run
+    of low-risk messages cannot add up past the threshold.
+    """
+    counts: Dict[str, int] = field(default_factory=dict)  # keyword hits per category, whole session
+    score: float = 0.0  # exponentially decayed sum of message scores, in Detector points
+    weight: float = 0.0  # the same decayed sum over 1 per message
+    last_points: int = 0
+    escalation: int = 0  # this message's points minus the previous message's
+    messages: int = 0
+
+    def update(self, points, hits, decay=None):
+        decay = RISK_DECAY if decay is None else decay
+        for name, n in hits.items():
+            self.counts[name] = self.counts.get(name, 0) + n
+        self.escalation = points - self.last_points if self.messages else 0
+        self.last_points = points
+        self.score = decay * self.score + points
+        self.weight = decay * self.weight + 1
+        self.messages += 1
+
+    @property
+    def level(self):
+        """Decay-weighted mean message score, in Detector points"""
+        return self.score / self.weight if self.weight else 0.0
+
+
 @dataclass
 class Session:
     id: str
@@ -60,8 +226,18 @@ class Session:
     scammer_messages: int = 0  # Only scammer messages
     scam_detected: bool = False
     scam_type: str = "unknown"
+    scam_type_scores: Dict[str, int] = field(default_factory=dict)  # phrase hits per scam type, whole session
+    similar_sessions: Dict[str, float] = field(default_factory=dict)  # same-campaign session id -> similarity
+    risk: RiskState = field(default_factory=RiskState)
     intelligence: Intelligence = field(default_factory=Intelligence)
     full_conversation: str = ""  # Store entire conversation for final extraction
+    scanned_upto: int = 0  # Offset into full_conversation already extracted
+    transcript_intel: Intelligence = field(default_factory=Intelligence)  # transcript findings, merged by final_extraction
+    history_cache: Dict[str, dict] = field(default_factory=dict)  # content hash -> extracted intel
+    history_hits: int = 0
+    history_misses: int = 0
+    new_intel: int = 0  # intelligence items first seen in the current turn
+    late_llm_intel: List[dict] = field(default_factory=list)  # from completions that missed the budget
     callback_sent: bool = False  # Prevent duplicate callbacks
 
 
@@ -78,37 +254,313 @@ def require_api_key(f):
     return wrapper
 
 
+# =====================================================
+# DIGIT-RUN CLASSIFIER
+# =====================================================
+
+# Leading digit of a valid Indian mobile number
+MOBILE_PREFIXES = frozenset("6789")
+
+# (first digit, length) of card numbers: Visa, Mastercard, RuPay, Amex, Diners
+CARD_SHAPES = frozenset({
+    ("4", 13), ("4", 16), ("4", 19), ("5", 16), ("2", 16),
+    ("6", 16), ("3", 15), ("3", 14),
+})
+
+# Space / hyphen groupings that are read as one number ("98765 43210",
+# "+91 98765-43210", "1234 5678 9012 3456"). Any other grouping is
+# classified group by group, so "call 9876543210 2 times" stays a phone.
+KNOWN_GROUPINGS = frozenset({
+    (5, 5), (3, 3, 4), (4, 3, 3),                   # mobile
+    (2, 10), (2, 5, 5), (2, 3, 3, 4), (2, 4, 3, 3),  # 91 + mobile
+    (4, 4, 4),                                      # Aadhaar
+    (4, 4, 4, 4), (4, 6, 5), (4, 4, 4, 4, 3),       # cards
+})
+
+# Words just before a digit run that make a bare checksum-valid number a
+# card / Aadhaar. Without them (or a card / Aadhaar grouping) a run is an
+# account number: about 1 in 10 accounts passes Luhn or Verhoeff by chance.
+CHECKSUM_CONTEXT = re.compile(r"\b(?:card|cvv|aadh?aa?r|uid|uidai)\b", re.I)
+CHECKSUM_CONTEXT_CHARS = 40
+
+LUHN_DOUBLED = (0, 2, 4, 6, 8, 1, 3, 5, 7, 9)
+
+VERHOEFF_D = (
+    (0, 1, 2, 3, 4, 5, 6, 7, 8, 9), (1, 2, 3, 4, 0, 6, 7, 8, 9, 5),
+    (2, 3, 4, 0, 1, 7, 8, 9, 5, 6), (3, 4, 0, 1, 2, 8, 9, 5, 6, 7),
+    (4, 0, 1, 2, 3, 9, 5, 6, 7, 8), (5, 9, 8, 7, 6, 0, 4, 3, 2, 1),
+    (6, 5, 9, 8, 7, 1, 0, 4, 3, 2), (7, 6, 5, 9, 8, 2, 1, 0, 4, 3),
+    (8, 7, 6, 5, 9, 3, 2, 1, 0, 4), (9, 8, 7, 6, 5, 4, 3, 2, 1, 0),
+)
+VERHOEFF_P = (
+    (0, 1, 2, 3, 4, 5, 6, 7, 8, 9), (1, 5, 7, 6, 2, 8, 3, 0, 9, 4),
+    (5, 8, 0, 3, 7, 9, 6, 1, 4, 2), (8, 9, 1, 6, 0, 4, 3, 5, 2, 7),
+    (9, 4, 5, 3, 1, 2, 6, 8, 7, 0), (4, 2, 8, 6, 5, 7, 3, 9, 0, 1),
+    (2, 7, 9, 3, 8, 0, 6, 4, 1, 5), (7, 0, 4, 6, 9, 1, 3, 2, 5, 8),
+)
+
+
+def luhn_valid(digits):
+    """Luhn checksum (payment cards)"""
+    total = 0
+    for i, ch in enumerate(reversed(digits)):
+        d = ord(ch) - 48
+        total += LUHN_DOUBLED[d] if i % 2 else d
+    return total % 10 == 0
+
+
+def verhoeff_valid(digits):
+    """Verhoeff checksum (Aadhaar)"""
+    c = 0
+    for i, ch in enumerate(reversed(digits)):
+        c = VERHOEFF_D[c][VERHOEFF_P[i % 8][ord(ch) - 48]]
+    return c == 0
+
+
+def classify_digits(digits, checksums=True):
+    """Classify one digit string: phone, aadhaar, card, bank, otp or None.
+
+    Returns (class, value); phones come back as the bare 10-digit number.
+    With ``checksums`` off, a Verhoeff / Luhn-valid run is not taken for
+    an Aadhaar / card number and classifies by length like any other.
+    """
+    n = len(digits)
+    if n == 10 and digits[0] in MOBILE_PREFIXES:
+        return "phone", digits
+    if n == 11 and digits[0] == "0" and digits[1] in MOBILE_PREFIXES:
+        return "phone", digits[1:]
+    if n == 12 and digits.startswith("91") and digits[2] in MOBILE_PREFIXES:
+        return "phone", digits[2:]
+    if checksums and n == 12 and digits[0] not in "01" and verhoeff_valid(digits):
+        return "aadhaar", digits
+    if checksums and (digits[0], n) in CARD_SHAPES and luhn_valid(digits):
+        return "card", digits
+    if 10 <= n <= 18:
+        return "bank", digits
+    if 4 <= n <= 8:
+        return "otp", digits
+    return None, digits
+
+
+def classify_run(run, context=False):
+    """Split a scanned digit run into numbers and classify each once.
+
+    A run in one of KNOWN_GROUPINGS ("1234 5678 9012") is one number whose
+    checksum decides; other numbers are only cards / Aadhaar with
+    ``context``, i.e. CHECKSUM_CONTEXT just before the run.
+    """
+    groups = run.lstrip("+").replace("-", " ").split(" ")
+    if len(groups) > 1 and tuple(map(len, groups)) in KNOWN_GROUPINGS:
+        return [classify_digits("".join(groups))]
+    return [classify_digits(g, checksums=context) for g in groups]
+
+
+# =====================================================
+# UPI HANDLE REGISTRY
+# =====================================================
+
+# Used when the registry file is missing or unreadable
+DEFAULT_UPI_HANDLES = frozenset({
+    "upi", "ybl", "okaxis", "oksbi", "paytm", "ibl", "axl",
+    "okicici", "okhdfcbank", "phonepe", "googlepay", "airtel",
+})
+
+
+class HandleRegistry:
+    """UPI PSP handles loaded from a file into a frozenset.
+
+    Membership is a set lookup, so the scanner's cost does not grow with
+    the registry. The file is re-read when its mtime changes (checked at
+    most every ``check_interval`` seconds), so edits apply without a
+    restart in every worker.
+    """
+
+    def __init__(self, path, check_interval=30.0):
+        self.path = path
+        self.check_interval = check_interval
+        self.handles = DEFAULT_UPI_HANDLES
+        self.version = 0  # bumped on every successful load
+        self._mtime = None
+        self._checked_at = float("-inf")
+        self.reload()
+
+    def reload(self):
+        """Re-read the registry file now"""
+        self._checked_at = time.monotonic()
+        try:
+            mtime = os.path.getmtime(self.path)
+            with open(self.path, encoding="utf-8") as f:
+                handles = frozenset(
+                    line.strip().lower() for line in f
+                    if line.strip() and not line.lstrip().startswith("#")
+                )
+        except OSError as e:
+            logger.warning(f"UPI handle registry unavailable ({e}), using defaults")
+            return self.handles
+        self.handles, self._mtime = handles, mtime
+        self.version += 1
+        logger.info(f"Loaded {len(handles)} UPI handles from {self.path}")
+        return handles
+
+    def __contains__(self, handle):
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval:
+            self._checked_at = now
+            try:
+                if os.path.getmtime(self.path) != self._mtime:
+                    self.reload()
+            except OSError:
+                pass
+        return handle.lower() in self.handles
+
+
+upi_registry = HandleRegistry(UPI_HANDLES_FILE)
+
+# phishingLinks are stored canonicalized (LRU-cached by raw match)
+link_canonicalizer = LinkCanonicalizer(resolver=http_resolver if RESOLVE_SHORT_LINKS else None)
+
+
+# =====================================================
+# EXTRACTION BUDGET
+# =====================================================
+
+@dataclass
+class ExtractionBudget:
+    """Hard per-call limits for extracting from attacker-controlled text"""
+    max_chars: int = 20000       # only this much of the text is scanned
+    max_items: int = 50          # values kept per intelligence field
+    max_seconds: float = 0.05    # wall-clock budget for one scan
+
+
+EXTRACTION_BUDGET = ExtractionBudget(
+    max_chars=int(os.getenv("EXTRACT_MAX_CHARS", 20000)),
+    max_items=int(os.getenv("EXTRACT_MAX_ITEMS", 50)),
+    max_seconds=float(os.getenv("EXTRACT_MAX_MS", 50)) / 1000,
+)
+
+
+def budget_end(text, start, max_chars):
+    """End of the part of text[start:] that a max_chars budget covers,
+    cut at whitespace so the last token is not read half"""
+    end = len(text)
+    if end - start > max_chars:
+        end = start + max_chars
+        cut = text.rfind(" ", start, end)
+        if cut > start:
+            end = cut
+    return end
+
+
+# =====================================================
+# DOCUMENT (per-message derived views)
+# =====================================================
+
+class Document:
+    """One message plus the views every stage reads, each computed once.
+
+    Extractor, Detector, MultiSignalDetector and the classifier accept a
+    Document wherever they take text, so one request lowercases,
+    tokenizes, keyword-scans and digit-scans a message a single time
+    instead of once per stage. Views are built lazily: a stage that is
+    skipped (e.g. on an analysis cache hit) costs nothing. The word views
+    (lower, tokens, keyword hits) read only ``bounded``, the prefix that
+    extract_bounded scans, so EXTRACTION_BUDGET bounds every stage.
+    """
+
+    def __init__(self, text):
+        self.text = text
+
+    @classmethod
+    def of(cls, text):
+        return text if isinstance(text, Document) else cls(text)
+
+    @cached_property
+    def bounded(self):
+        """The text up to EXTRACTION_BUDGET.max_chars"""
+        return self.text[:budget_end(self.text, 0, EXTRACTION_BUDGET.max_chars)]
+
+    @cached_property
+    def lower(self):
+        return self.bounded.lower()
+
+    @cached_property
+    def tokens(self):
+        """Lowercase word tokens (main_backup's normalization, classifier input)"""
+        return WORD_TOKEN.findall(self.lower)
+
+    @cached_property
+    def keyword_hits(self):
+        """KEYWORD_MATCHER hits for every category, from one sweep"""
+        return KEYWORD_MATCHER.scan(self.lower)
+
+    @cached_property
+    def keyword_counts(self):
+        return {name: len(words) for name, words in self.keyword_hits.items()}
+
+    @cached_property
+    def analysis(self):
+        """analyze_message(self): (intel, points, hits), once per message
+        even when the extraction was truncated and so not content-cached"""
+        return analyze_message(self)
+
+    @cached_property
+    def _scan(self):
+        return Extractor.SCAN.finditer(self.text), []
+
+    def scan_matches(self):
+        """Extractor.SCAN matches over the whole text.
+
+        Lazy: the scanner only runs as far as a reader iterates, so a
+        budgeted extraction that stops early does not scan the rest.
+        Matches found are kept for the next reader, which resumes the
+        scan where the last one stopped.
+        """
+        scanner, found = self._scan
+        i = 0
+        while True:
+            if i == len(found):
+                match = next(scanner, None)
+                if match is None:
+                    return
+                found.append(match)
+            yield found[i]
+            i += 1
+
+
 # =====================================================
 # IMPROVED EXTRACTOR
 # =====================================================
 
 class Extractor:
-    
-    # ✅ FIXED: Better bank account pattern (10-18 digits)
-    BANK = re.compile(r'\b\d{10,18}\b')
-    
-    # ✅ FIXED: Employee ID pattern (supports "ID is 45678" format)
-    EMPLOYEE = re.compile(
-        r'(?:employee\s*(?:id|ID|Id)|ID|id)\s*(?:is|:)?\s*([A-Z0-9]{4,10})\b',
-        re.I
-    )
-    
-    # ✅ FIXED: Phone patterns (normalize to +91XXXXXXXXXX format)
-    PHONE_PATTERNS = [
-        re.compile(r'\+91[-\s]?(\d{10})'),           # +91-9876543210
-        re.compile(r'\b91[-\s]?(\d{10})'),            # 91-9876543210
-        re.compile(r'\b([6-9]\d{9})\b'),              # 9876543210
-    ]
-    
-    # ✅ UPI pattern
-    UPI = re.compile(
-        r'\b([\w.-]{3,}@(?:upi|ybl|okaxis|oksbi|paytm|ibl|axl|okicici|okhdfcbank|phonepe|googlepay|airtel))\b',
+
+    # ✅ Single-pass scanner: one alternation with a named group per field.
+    # finditer walks the text once and each token is claimed by the first
+    # branch that matches it, so the order below resolves overlaps:
+    #   url      - digits / handles inside a link belong to the link;
+    #              shortener links also without a scheme ("bit.ly/xyz")
+    #   upi      - any local@handle not followed by a domain suffix;
+    #              the handle is checked against upi_registry afterwards,
+    #              and "9876543210@ybl" is a UPI ID, not a phone
+    #   empnum   - a numeric employee ID is consumed: it is not also a phone
+    #   employee - other IDs are a lookahead, the token stays scannable;
+    #              never the local part of a UPI ID ("id 9876543210@ybl")
+    #   digits   - every other digit run (spaces / hyphens allowed between
+    #              groups), classified exactly once by classify_run()
+    #
+    # Every repetition is bounded and no two unbounded quantifiers compete
+    # for the same characters, so a scan is linear in the input even on
+    # hostile text (a UPI local part can only start where a [\w.-] run
+    # starts; the gaps around "id" / "is" are at most 3 chars).
+    SCAN = re.compile(
+        r'(?P<url>https?://[^\s<>"\']{1,2048}|www\.[^\s<>"\']{1,2048}'
+        r'|(?<![\w.@/-])(?:' + SHORTENER_PATTERN + r')/[^\s<>"\']{1,2048})'
+        r'|(?<![\w.-])(?P<upi>[\w.-]{3,64}@[a-z][a-z0-9]{0,31})\b(?!\.[a-z])'
+        r'|\b(?:employee\s{0,3}id|id)\s{0,3}(?:is|:)?\s{0,3}'
+        r'(?:(?P<empnum>\d{4,10})(?![\w@])|(?=(?P<employee>[A-Z0-9]{4,10})\b(?!@)))'
+        r'|(?P<digits>(?:\+|\b)\d{1,24}(?:[ \-]\d{1,24}){0,7})\b',
         re.I
     )
-    
-    # ✅ URL pattern
-    URL = re.compile(r'https?://[^\s<>"\']+|www\.[^\s<>"\']+')
-    
+
     # ✅ Suspicious keywords
     KEYWORDS = {
         "otp", "urgent", "verify", "blocked", "suspended",
@@ -116,47 +568,166 @@ class Extractor:
         "security", "alert", "locked", "immediately", "confirm"
     }
 
+    # Scanner group / digit class -> intelligence field. Cards, Aadhaar and
+    # OTP-length numbers are recognized so they are not misreported, but
+    # they are not callback intelligence.
+    FIELDS = {
+        "url": "phishingLinks",
+        "upi": "upiIds",
+        "employee": "employeeIds",
+        "empnum": "employeeIds",
+        "phone": "phoneNumbers",
+        "bank": "bankAccounts",
+    }
+
+    # iter_extract: tokens within this many chars of a chunk's end wait for
+    # the next chunk, and longer tokens are not guaranteed across a seam
+    CHUNK_OVERLAP = 256
+
     @classmethod
-    def extract(cls, text):
-        """Extract intelligence from text with improved patterns"""
-        
-        # Extract bank accounts
-        bank_accounts = list(set(cls.BANK.findall(text)))
-        
-        # Extract employee IDs
-        employee_ids = []
-        for match in cls.EMPLOYEE.finditer(text):
-            emp_id = match.group(1).upper()
-            if emp_id and emp_id not in employee_ids:
-                employee_ids.append(emp_id)
-        
-        # Extract and normalize phone numbers
-        phones = set()
-        for pattern in cls.PHONE_PATTERNS:
-            for match in pattern.finditer(text):
-                # Get just the 10-digit number
-                digits = ''.join(filter(str.isdigit, match.group(0)))[-10:]
-                if len(digits) == 10 and digits[0] in '6789':
-                    phones.add(f"+91{digits}")
-        
-        # Extract UPI IDs
-        upis = {match[0].lower() for match in cls.UPI.findall(text)}
+    def _digit_tokens(cls, run, context=False):
+        for digit_class, digits in classify_run(run, context):
+            if digit_class == "phone":
+                # normalize to +91XXXXXXXXXX
+                yield "phoneNumbers", f"+91{digits}"
+            elif digit_class in cls.FIELDS:
+                yield cls.FIELDS[digit_class], digits
+
+    @classmethod
+    def _tokens(cls, match):
+        """(field, normalized value) pairs for one scanner match"""
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == "digits":
+            start = match.start()
+            context = CHECKSUM_CONTEXT.search(match.string, max(0, start - CHECKSUM_CONTEXT_CHARS), start)
+            yield from cls._digit_tokens(value, context is not None)
+        elif kind == "url":
+            yield "phishingLinks", link_canonicalizer.canonicalize(value).url
+        elif kind == "upi":
+            local, handle = value.rsplit("@", 1)
+            if handle in upi_registry:
+                yield "upiIds", value.lower()
+            elif local.isdigit():
+                # "9876543210@unknownpsp": still report the number
+                yield from cls._digit_tokens(local)
+        else:
+            yield cls.FIELDS[kind], value.upper() if kind == "employee" else value
+
+    @classmethod
+    def extract(cls, text, start=0):
+        """Extract intelligence from text[start:] in a single scan.
+
+        Scanning from ``start`` keeps the preceding characters visible to
+        word-boundary checks, so a token cut at ``start`` is not reported.
+        """
+        return cls._extract(text, start)[0]
+
+    @classmethod
+    def extract_bounded(cls, text, start=0, budget=None):
+        """extract() under a hard ExtractionBudget, for attacker-controlled text.
+
+        Returns the same fields plus ``truncated``: True when a limit was hit
+        and the result only covers part of the input.
+        """
+        intel, truncated = cls._extract(text, start, budget or EXTRACTION_BUDGET)
+        intel["truncated"] = truncated
+        return intel
+
+    @classmethod
+    def _extract(cls, text, start=0, budget=None):
+        doc = Document.of(text)
+        text = doc.text
         
-        # Extract URLs
-        urls = list(set(cls.URL.findall(text)))
+        # dicts as ordered sets: employee IDs keep first-seen order
+        found = {f: {} for f in ("bankAccounts", "employeeIds", "phoneNumbers", "upiIds", "phishingLinks")}
+        end = len(text)
+        truncated = False
+        max_items = None
+
+        if budget is not None:
+            max_items = budget.max_items
+            deadline = time.perf_counter() + budget.max_seconds
+            end = budget_end(text, start, budget.max_chars)
+            truncated = end < len(text)
+
+        # A whole-text scan is shared with other stages through the Document
+        whole = start == 0 and end == len(text)
+        matches = doc.scan_matches() if whole else cls.SCAN.finditer(text, start, end)
         
+        for i, match in enumerate(matches):
+            if budget is not None and i % 32 == 31 and time.perf_counter() > deadline:
+                truncated = True
+                break
+            for field_name, value in cls._tokens(match):
+                bucket = found[field_name]
+                if max_items is not None and len(bucket) >= max_items and value not in bucket:
+                    truncated = True
+                    continue
+                bucket[value] = None
+
+        intel = {k: list(v) for k, v in found.items()}
+
         # Extract keywords
-        text_lower = text.lower()
-        keywords = [k for k in cls.KEYWORDS if k in text_lower]
-        
-        return {
-            "bankAccounts": bank_accounts,
-            "employeeIds": employee_ids,
-            "phoneNumbers": list(phones),
-            "upiIds": list(upis),
-            "phishingLinks": urls,
-            "suspiciousKeywords": keywords
-        }
+        if budget is not None and time.perf_counter() > deadline:
+            truncated = True
+            intel["suspiciousKeywords"] = []
+        elif start == 0 and end == len(doc.bounded):
+            intel["suspiciousKeywords"] = list(doc.keyword_hits["suspicious"])
+        else:
+            intel["suspiciousKeywords"] = KEYWORD_MATCHER.scan(text[start:end].lower())["suspicious"]
+
+        return intel, truncated
+
+    @classmethod
+    def iter_extract(cls, chunks, overlap=CHUNK_OVERLAP):
+        """Extract intelligence from text arriving in chunks.
+
+        Yields, after each chunk, a dict with only the items not yielded
+        before. A token ending within ``overlap`` chars of the chunk's end
+        is held back until the next chunk, so values split across chunks
+        are still found whole. Only the held-back tail is carried over,
+        so memory stays bounded by the chunk size.
+        """
+
+        seen = {f: set() for f in ("bankAccounts", "employeeIds", "phoneNumbers", "upiIds", "phishingLinks", "suspiciousKeywords")}
+        # Chars kept before the resume point: regex boundary context, and
+        # enough for a keyword that straddles it
+        context = max(1, KEYWORD_MATCHER.max_length - 1)
+        max_pending = 4 * overlap
+        carry, pending = "", ""
+
+        def scan(buf, begin, final):
+            fresh = {f: [] for f in seen}
+            limit = len(buf) if final else len(buf) - overlap
+            resume = None
+            last_end = begin
+            for match in cls.SCAN.finditer(buf, begin):
+                token_end = max(match.end(), match.end(match.lastgroup))
+                if token_end > limit and match.start() >= len(buf) - max_pending:
+                    resume = match.start()
+                    break
+                for field_name, value in cls._tokens(match):
+                    if value not in seen[field_name]:
+                        seen[field_name].add(value)
+                        fresh[field_name].append(value)
+                last_end = match.end()
+            if resume is None:
+                resume = max(last_end, limit, begin)
+            for word in KEYWORD_MATCHER.scan(buf[:resume].lower())["suspicious"]:
+                if word not in seen["suspiciousKeywords"]:
+                    seen["suspiciousKeywords"].add(word)
+                    fresh["suspiciousKeywords"].append(word)
+            return fresh, resume
+
+        for chunk in chunks:
+            buf = carry + pending + chunk
+            fresh, resume = scan(buf, len(carry), final=False)
+            carry, pending = buf[max(0, resume - context):resume], buf[resume:]
+            yield fresh
+
+        fresh, _ = scan(carry + pending, len(carry), final=True)
+        yield fresh
 
 
 # =====================================================
@@ -169,28 +740,442 @@ class Detector:
     MED = {"urgent", "blocked", "verify", "suspended", "locked"}
     CTX = {"bank", "account", "payment", "upi", "transfer"}
 
+    # Weights in hundredths, so the scalar and batch paths add up exactly
+    HIGH_POINTS = 30
+    MED_POINTS = 15
+    CTX_POINTS = 10
+    INTEL_POINTS = {"upiIds": 25, "bankAccounts": 25, "phoneNumbers": 15, "employeeIds": 15}
+    THRESHOLD = 35
+    MAX_SCORE = math.inf
+
+    @classmethod
+    def score(cls, text, intel):
+        """Scam score in hundredths for one message"""
+        return cls.assess(text, intel)[0]
+
+    @classmethod
+    def assess(cls, text, intel, history=None):
+        """(score, keyword hits per category) for one message"""
+        
+        doc = Document.of(text)
+        hits = doc.keyword_counts
+        
+        score = (
+            cls.HIGH_POINTS * hits["high"] +
+            cls.MED_POINTS * hits["med"] +
+            cls.CTX_POINTS * hits["ctx"]
+        )
+        
+        for field_name, points in cls.INTEL_POINTS.items():
+            if intel[field_name]:
+                score += points
+        
+        if scam_classifier is not None:
+            score += int(cls.model_points([doc])[0])
+        
+        return score, hits
+
     @classmethod
     def detect(cls, text, intel):
         """Detect if message is a scam"""
+        return cls.score(text, intel) >= cls.THRESHOLD
+
+    @classmethod
+    def score_batch(cls, texts, intels):
+        """score() for many messages at once, as an int64 array.
+
+        Builds a sparse (message x keyword) incidence matrix in COO form and
+        scores it as one product with the keyword weights, plus the intel
+        bonuses. Each keyword column is found with a vectorized substring
+        search over a block of messages, so the per-message Python work is
+        just lowercasing.
+        """
+        
+        n = len(texts)
+        words, weights = DETECTOR_VOCAB
+        rows, cols = [], []
+        
+        for block_start in range(0, n, SCORE_BLOCK_ROWS):
+            block = [Document.of(t).lower for t in texts[block_start:block_start + SCORE_BLOCK_ROWS]]
+            width = max(map(len, block), default=0)
+            if len(block) * width * 4 <= SCORE_BLOCK_BYTES:
+                # Fixed-width unicode array: one C loop per keyword
+                arr = np.array(block, dtype=f"<U{max(width, 1)}")
+                for col, word in enumerate(words):
+                    hit = np.flatnonzero(np.strings.find(arr, word) >= 0)
+                    rows.append(hit + block_start)
+                    cols.append(np.full(len(hit), col))
+            else:
+                # A huge message would blow up the fixed-width array
+                for i, text in enumerate(block):
+                    found = KEYWORD_MATCHER.matches(text)
+                    for col, word in enumerate(words):
+                        if word in found:
+                            rows.append(np.array([block_start + i]))
+                            cols.append(np.array([col]))
+        
+        rows = np.concatenate(rows).astype(np.int64) if rows else np.zeros(0, dtype=np.int64)
+        cols = np.concatenate(cols).astype(np.int64) if cols else np.zeros(0, dtype=np.int64)
+        scores = np.bincount(rows, weights=weights[cols], minlength=n).astype(np.int64)
+        
+        present = np.array(
+            [[bool(intel[f]) for f in cls.INTEL_POINTS] for intel in intels],
+            dtype=np.int64
+        ).reshape(n, len(cls.INTEL_POINTS))
+        return (scores + present @ np.array(list(cls.INTEL_POINTS.values()), dtype=np.int64)
+                + cls.model_points(texts))
+
+    @classmethod
+    def model_points(cls, texts):
+        """Classifier contribution per message (int64 array), 0 without a model"""
+        if scam_classifier is None:
+            return np.zeros(len(texts), dtype=np.int64)
+        proba = scam_classifier.predict_proba_tokens([Document.of(t).tokens for t in texts])
+        return np.rint(CLASSIFIER_POINTS * proba).astype(np.int64)
+
+    @classmethod
+    def detect_batch(cls, texts, intels):
+        """detect() for many messages at once, as a bool array"""
+        return cls.score_batch(texts, intels) >= cls.THRESHOLD
+
+
+# One automaton for every keyword family, built once at import
+KEYWORD_MATCHER = KeywordMatcher({
+    "suspicious": Extractor.KEYWORDS,
+    "high": Detector.HIGH,
+    "med": Detector.MED,
+    "ctx": Detector.CTX,
+})
+
+
+# =====================================================
+# MULTI-SIGNAL SCAM DETECTOR (ported from main_backup)
+# =====================================================
+
+class MultiSignalDetector:
+    """main_backup's ScamDetector: urgency, threat, sensitive requests,
+    authority impersonation, financial context, links and combo bonuses,
+    scored 0-100.
+
+    Normalization is one precompiled tokenizing regex, and all five
+    phrase lists are matched on whole tokens by a single phrase index.
+    """
+
+    URGENT_KEYWORDS = [
+        "urgent", "immediately", "asap", "hurry", "quick",
+        "today", "limited time", "last chance", "final warning"
+    ]
+
+    THREAT_KEYWORDS = [
+        "blocked", "suspended", "deactivated", "frozen",
+        "terminated", "cancelled", "restricted", "legal action"
+    ]
+
+    FINANCIAL_KEYWORDS = [
+        "bank account", "upi", "payment", "refund", "cashback",
+        "prize", "lottery", "reward", "transaction"
+    ]
+
+    SENSITIVE_REQUESTS = [
+        "account number", "upi id", "cvv", "otp", "one time password",
+        "pin", "password", "card number", "ifsc", "kyc",
+        "verify", "confirm", "update"
+    ]
+
+    AUTHORITY_IMPERSONATION = [
+        "bank", "rbi", "income tax", "government",
+        "police", "cyber cell", "customer care",
+        "support team", "official", "department"
+    ]
+
+    # Checked before tokenizing: normalization strips "://" and "."
+    # (matched against lowercased text, cheaper than re.IGNORECASE)
+    URL_PATTERN = re.compile(r'https?://|www\.|bit\.ly|tinyurl\.com|t\.co|goo\.gl')
+
+    # main_backup's normalization (punctuation to spaces, split) is
+    # Document.tokens; this splits the previous turns' matched phrases
+    TOKEN = re.compile(r'\w+')
+
+    # Urgency phrases on whole tokens, for the previous turns' text
+    URGENT_PATTERN = re.compile(
+        r'(?<!\w)(?:' +
+        "|".join(r'\W+'.join(map(re.escape, k.split())) for k in URGENT_KEYWORDS) +
+        r')(?!\w)'
+    )
+
+    THRESHOLD = 55  # tuned for precision + recall balance
+    MAX_SCORE = 100
+
+    @classmethod
+    def assess(cls, text, intel=None, history=None):
+        """(score 0-100, phrase hits per signal) for one message"""
         
-        t = text.lower()
+        doc = Document.of(text)
+        hits = SIGNAL_MATCHER.counts(doc.tokens)
+        urgency, threat = hits["urgent"], hits["threat"]
+        sensitive, authority = hits["sensitive"], hits["authority"]
         
         score = (
-            0.3 * sum(w in t for w in cls.HIGH) +
-            0.15 * sum(w in t for w in cls.MED) +
-            0.1 * sum(w in t for w in cls.CTX)
+            min(urgency * 8, 20) +
+            min(threat * 8, 20) +
+            min(sensitive * 10, 30) +
+            min(authority * 8, 20) +
+            min(hits["financial"] * 5, 15)
         )
         
-        if intel["upiIds"]:
-            score += 0.25
-        if intel["bankAccounts"]:
-            score += 0.25
-        if intel["phoneNumbers"]:
-            score += 0.15
-        if intel["employeeIds"]:
-            score += 0.15
-            
-        return score >= 0.35
+        # URL presence (hard signal)
+        if cls.URL_PATTERN.search(doc.lower):
+            score += 15
+        
+        # First-contact pressure bonus
+        if not history and score >= 30:
+            score += 10
+        
+        # Escalation bonus (cross-turn pressure); needs urgency to beat
+        if history and urgency:
+            previous = " ".join(h.get("text", "") for h in history[-2:]).lower()
+            found = cls.URGENT_PATTERN.findall(previous)
+            if urgency > len({" ".join(cls.TOKEN.findall(k)) for k in found}):
+                score += 10
+        
+        # High-risk combo bonus
+        if urgency and sensitive:
+            score += 10
+        if authority and sensitive:
+            score += 10
+        
+        return min(score, cls.MAX_SCORE), hits
+
+    @classmethod
+    def score(cls, text, intel=None, history=None):
+        """Scam probability score (0-100)"""
+        return cls.assess(text, intel, history)[0]
+
+    @classmethod
+    def detect(cls, text, intel=None, history=None):
+        return cls.score(text, intel, history) >= cls.THRESHOLD
+
+
+# Whole-token phrase matching for every MultiSignalDetector list
+SIGNAL_MATCHER = TokenPhraseMatcher({
+    "urgent": MultiSignalDetector.URGENT_KEYWORDS,
+    "threat": MultiSignalDetector.THREAT_KEYWORDS,
+    "financial": MultiSignalDetector.FINANCIAL_KEYWORDS,
+    "sensitive": MultiSignalDetector.SENSITIVE_REQUESTS,
+    "authority": MultiSignalDetector.AUTHORITY_IMPERSONATION,
+})
+
+# =====================================================
+# SCAM TYPE
+# =====================================================
+
+class ScamTypeClassifier:
+    """Which scam a session is running, from phrase families per type.
+
+    Each scammer message adds its distinct phrase hits to per-type totals
+    on the session (one token pass, O(message length)); the session's type
+    is the type with the most hits so far. Ties go to the type listed
+    first, most specific first.
+    """
+
+    TYPES = {
+        "otp_theft": [
+            "otp", "one time password", "verification code", "share the code",
+            "cvv", "pin", "code sent", "6 digit code",
+        ],
+        "lottery_prize": [
+            # "won" only in phrases: tokens split "won't" into "won", "t"
+            "lottery", "prize", "winner", "have won", "has won", "won the", "won a",
+            "won rs", "congratulations", "lucky draw",
+            "jackpot", "kbc", "claim your", "reward",
+        ],
+        "refund": [
+            "refund", "cashback", "reversal", "excess payment", "money back",
+            "return the amount", "wrongly credited", "credited by mistake",
+        ],
+        "job": [
+            "job", "work from home", "part time", "salary", "hiring", "daily income",
+            "registration fee", "earn", "task", "vacancy",
+        ],
+        "authority_impersonation": [
+            "police", "rbi", "cyber cell", "income tax", "cbi", "customs", "arrest",
+            "warrant", "legal action", "court", "narcotics", "digital arrest",
+            "government", "department",
+        ],
+        "kyc_bank_block": [
+            "kyc", "blocked", "suspended", "deactivated", "frozen", "restricted",
+            "bank account", "account will be", "update your", "pan card", "aadhaar link",
+        ],
+    }
+
+    LABELS = {
+        "otp_theft": "OTP theft",
+        "lottery_prize": "Lottery / prize",
+        "refund": "Refund",
+        "job": "Job offer",
+        "authority_impersonation": "Police / RBI impersonation",
+        "kyc_bank_block": "KYC / bank account block",
+        "unknown": "Unknown",
+    }
+
+    @classmethod
+    def update(cls, session, text):
+        """Fold one scammer message into the session's scam type"""
+        hits = SCAM_TYPE_MATCHER.counts(Document.of(text).tokens)
+        scores = session.scam_type_scores
+        for name, n in hits.items():
+            if n:
+                scores[name] = scores.get(name, 0) + n
+        if scores:
+            session.scam_type = max(cls.TYPES, key=lambda name: scores.get(name, 0))
+        return session.scam_type
+
+    @classmethod
+    def label(cls, scam_type):
+        return cls.LABELS.get(scam_type, scam_type)
+
+
+# Every scam type's phrases in one whole-token index, built once
+SCAM_TYPE_MATCHER = TokenPhraseMatcher(ScamTypeClassifier.TYPES)
+
+DETECTORS = {"simple": Detector, "multisignal": MultiSignalDetector}
+
+if DETECTOR not in DETECTORS:
+    raise RuntimeError(f"Unknown DETECTOR {DETECTOR!r}, expected one of {sorted(DETECTORS)}")
+
+
+def load_detector_config(path=DETECTOR_CONFIG):
+    """Apply the thresholds calibrate.py chose; built-in defaults otherwise"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+    except FileNotFoundError:
+        return
+    except (OSError, ValueError) as e:
+        logger.error(f"Ignoring detector config {path}: {e}")
+        return
+    
+    if not isinstance(config, dict):
+        logger.error(f"Ignoring detector config {path}: expected a JSON object")
+        return
+    
+    for name, settings in config.items():
+        if name not in DETECTORS or not isinstance(settings, dict) or "threshold" not in settings:
+            continue
+        detector, threshold = DETECTORS[name], settings["threshold"]
+        valid = (isinstance(threshold, (int, float)) and not isinstance(threshold, bool)
+                 and math.isfinite(threshold) and 0 < threshold <= detector.MAX_SCORE)
+        if not valid:
+            logger.error(f"Ignoring {name} threshold {threshold!r} in {path}: "
+                         f"expected a number in (0, {detector.MAX_SCORE}]")
+            continue
+        detector.THRESHOLD = threshold
+        logger.info(f"{name} detector threshold {threshold} (from {path})")
+
+
+load_detector_config()
+
+
+# Detector.score_batch works through the batch in blocks of this many
+# rows, as long as the block's fixed-width array stays under the byte cap
+SCORE_BLOCK_ROWS = 8192
+SCORE_BLOCK_BYTES = 64 * 1024 * 1024
+
+
+def _detector_vocab():
+    """Detector keywords (one column each) and each column's weight in points"""
+    points = {}
+    for words, weight in ((Detector.HIGH, Detector.HIGH_POINTS),
+                          (Detector.MED, Detector.MED_POINTS),
+                          (Detector.CTX, Detector.CTX_POINTS)):
+        for word in words:
+            points[word] = points.get(word, 0) + weight
+    words = sorted(points)
+    return words, np.array([points[w] for w in words], dtype=np.float64)
+
+
+DETECTOR_VOCAB = _detector_vocab()
+
+# Optional statistical model, memory-mapped so workers share its pages
+scam_classifier = ScamClassifier.load(CLASSIFIER_MODEL) if CLASSIFIER_MODEL else None
+
+
+# =====================================================
+# ANALYSIS ENGINES
+# =====================================================
+
+class MainEngine:
+    """Extractor + the DETECTOR-selected detector (content-cached)"""
+    
+    name = "main"
+    
+    def extract(self, doc):
+        return Document.of(doc).analysis[0]
+    
+    def assess(self, doc, intel, history=None):
+        detector = DETECTORS[DETECTOR]
+        if detector is Detector:
+            return Document.of(doc).analysis[1:]
+        # History-dependent scores cannot come from the content cache
+        return detector.assess(doc, intel, history)
+    
+    @property
+    def threshold(self):
+        return DETECTORS[DETECTOR].THRESHOLD
+
+
+class BackupEngine:
+    """main_backup's pipeline: IntelligenceExtractor + ScamDetector"""
+    
+    name = "backup"
+    
+    def __init__(self):
+        self.extractor = BackupIntelligenceExtractor(
+            MultiSignalDetector.URGENT_KEYWORDS +
+            MultiSignalDetector.THREAT_KEYWORDS +
+            MultiSignalDetector.SENSITIVE_REQUESTS
+        )
+    
+    def extract(self, doc):
+        return self.extractor.extract(Document.of(doc).text)
+    
+    def assess(self, doc, intel, history=None):
+        return MultiSignalDetector.assess(doc, intel, history)
+    
+    @property
+    def threshold(self):
+        return MultiSignalDetector.THRESHOLD
+
+
+ENGINES = {"main": MainEngine(), "backup": BackupEngine()}
+
+for _name in (ENGINE, SHADOW_ENGINE):
+    if _name and _name not in ENGINES:
+        raise RuntimeError(f"Unknown engine {_name!r}, expected one of {sorted(ENGINES)}")
+
+def normalize_intel(intel):
+    """Intelligence in Extractor's normal forms, so engines can be compared:
+    phones as +91XXXXXXXXXX, accounts as bare digits, canonical links"""
+    
+    def phone(value):
+        digits = re.sub(r"\D", "", value)
+        digit_class, digits = classify_digits(digits) if digits else (None, digits)
+        return f"+91{digits}" if digit_class == "phone" else digits
+    
+    normal = dict(intel)
+    normal["phoneNumbers"] = [phone(v) for v in intel.get("phoneNumbers", [])]
+    normal["bankAccounts"] = [re.sub(r"\D", "", v) for v in intel.get("bankAccounts", [])]
+    normal["phishingLinks"] = [link_canonicalizer.canonicalize(v).url for v in intel.get("phishingLinks", [])]
+    normal["suspiciousKeywords"] = [v.lower() for v in intel.get("suspiciousKeywords", [])]
+    return normal
+
+
+# Compares SHADOW_ENGINE against ENGINE in a background thread
+shadow_runner = (
+    ShadowRunner(ENGINES[ENGINE], ENGINES[SHADOW_ENGINE], SHADOW_SAMPLE_RATE, SHADOW_MAX_PENDING,
+                 normalize=normalize_intel)
+    if SHADOW_ENGINE else None
+)
 
 
 # =====================================================
@@ -245,23 +1230,28 @@ FALLBACK_POOL = [
 USED_FALLBACKS = {}  # Track used fallbacks per session
 
 
-def agent_reply(msg, history, session):
-    """Generate agent reply with variety and intelligence extraction"""
+LLM_MODEL = "llama-3.3-70b-versatile"
+
+
+def fallback_reply(session):
+    """Canned reply, not repeated within a session until the pool runs out"""
     
-    if not groq:
-        # Use varied fallbacks
-        if session.id not in USED_FALLBACKS:
-            USED_FALLBACKS[session.id] = []
-        
-        available = [f for f in FALLBACK_POOL if f not in USED_FALLBACKS[session.id]]
-        if not available:
-            USED_FALLBACKS[session.id] = []
-            available = FALLBACK_POOL
-        
-        reply = random.choice(available)
-        USED_FALLBACKS[session.id].append(reply)
-        return reply, {}
+    if session.id not in USED_FALLBACKS:
+        USED_FALLBACKS[session.id] = []
+    
+    available = [f for f in FALLBACK_POOL if f not in USED_FALLBACKS[session.id]]
+    if not available:
+        USED_FALLBACKS[session.id] = []
+        available = FALLBACK_POOL
+    
+    reply = random.choice(available)
+    USED_FALLBACKS[session.id].append(reply)
+    return reply
+
 
+def build_messages(msg, history):
+    """Chat messages for the LLM: persona prompt, recent history, new message"""
+    
     messages = [{"role": "system", "content": SYSTEM_PROMPT}]
     
     # Include last 6 messages for context
@@ -270,30 +1260,225 @@ def agent_reply(msg, history, session):
         messages.append({"role": role, "content": h["text"]})
     
     messages.append({"role": "user", "content": msg})
+    return messages
+
+
+def completion_kwargs(msg, history):
+    return dict(
+        model=LLM_MODEL,
+        temperature=0.8,  # Higher temp for more variety
+        max_tokens=150,  # Reduced token usage
+        response_format={"type": "json_object"},
+        messages=build_messages(msg, history)
+    )
+
+
+def parse_completion(completion):
+    """(reply, intel) from the LLM's JSON answer"""
+    
+    result = json.loads(completion.choices[0].message.content)
+    
+    reply = result.get("reply", "")
+    intel = result.get("intelligence", {})
+    
+    # Fallback if reply is empty
+    if not reply or len(reply.strip()) < 5:
+        reply = random.choice(FALLBACK_POOL)
+    
+    return reply, intel
+
+
+def keep_late_intel(session, completion):
+    """Queue what an over-budget completion extracted for the session's next merge"""
+    try:
+        intel = parse_completion(completion)[1]
+    except Exception as e:
+        logger.error(f"Late completion for {session.id} unusable: {e}")
+        return
+    if intel:
+        session.late_llm_intel.append(intel)
+
+
+def take_late_intel(session):
+    """Late LLM intelligence received since the last call (and forget it)"""
+    items = []
+    while session.late_llm_intel:
+        items.append(session.late_llm_intel.pop())
+    return items
+
+
+def rate_limit_outcome(error):
+    """(throttled, Retry-After seconds) of a failed completion call"""
+    if isinstance(error, RateLimitError) or getattr(error, "status_code", None) == 429:
+        response = getattr(error, "response", None)
+        return True, retry_after_seconds(response.headers if response is not None else {})
+    return False, None
+
+
+def llm_wait():
+    """How long a call may wait for a shared rate-limit slot.
+
+    The slot is taken before the budget clock starts and the wait comes
+    out of the budget, so it is capped at half of it: the call itself
+    always gets the other half.
+    """
+    return llm_budget.budget / 2 or LLM_TIMEOUT
+
+
+def remaining_budget(started):
+    """What is left of the reply budget after the rate-limit wait"""
+    return llm_budget.budget - (time.monotonic() - started)
+
+
+def limited(slot, call):
+    """Budgeted attempts at call(): the first runs in the slot acquired
+    up front; a hedge only goes out if a slot is free right away"""
+    slots = [slot]
+    
+    def attempt():
+        own = slots.pop() if slots else llm_limiter.try_acquire()
+        if own is None:
+            raise Throttled("no LLM call slot for the hedge")
+        return llm_limiter.run(own, call, rate_limit_outcome)
+    return attempt
+
+
+def limited_async(slot, make_call):
+    """limited() for a coroutine factory"""
+    slots = [slot]
+    
+    async def attempt():
+        own = slots.pop() if slots else llm_limiter.try_acquire()
+        if own is None:
+            raise Throttled("no LLM call slot for the hedge")
+        return await llm_limiter.run_async(own, make_call, rate_limit_outcome)
+    return attempt
+
+
+def throttled_reply(session):
+    """No rate-limit slot in time: a local skip, not an LLM failure"""
+    llm_breaker.record_skipped()
+    logger.warning(f"Session {session.id}: LLM rate limit, fallback reply")
+    return fallback_reply(session), {}
+
 
+def llm_priority(session):
+    """Scheduling priority of a session's LLM call (higher goes first).
+
+    How close the session is to should_end()'s message / intel limits
+    (0-1), plus 1 when the current turn turned up new intelligence.
+    """
+    intel_count = sum(len(v) for v in asdict(session.intelligence).values())
+    progress = min(1.0, max(session.scammer_messages / 12, intel_count / 5))
+    return progress + (1.0 if session.new_intel else 0.0)
+
+
+def agent_reply(msg, history, session):
+    """Generate agent reply with variety and intelligence extraction"""
+    
+    if not groq:
+        # Use varied fallbacks
+        return fallback_reply(session), {}
+    
+    if not llm_scheduler.acquire(llm_priority(session)):
+        logger.warning(f"Session {session.id}: no LLM slot within {LLM_QUEUE_TIMEOUT_MS}ms, fallback reply")
+        return fallback_reply(session), {}
     try:
-        completion = groq.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            temperature=0.8,  # Higher temp for more variety
-            max_tokens=150,  # Reduced token usage
-            response_format={"type": "json_object"},
-            messages=messages
+        return llm_reply(msg, history, session)
+    finally:
+        llm_scheduler.release()
+
+
+def llm_reply(msg, history, session):
+    """One budgeted, breaker-guarded completion (caller holds a scheduler slot)"""
+    
+    if not llm_breaker.allow():
+        # The LLM is failing: no network wait
+        return fallback_reply(session), {}
+
+    kwargs = completion_kwargs(msg, history)
+    
+    # Wait for the shared rate limit before the budget clock starts, so a
+    # local wait is never mistaken for a slow LLM
+    started = time.monotonic()
+    slot = llm_limiter.acquire(llm_wait())
+    if slot is None:
+        return throttled_reply(session)
+    
+    try:
+        completion = llm_budget.call(
+            limited(slot, lambda: groq.chat.completions.create(**kwargs)),
+            on_late=lambda late: keep_late_intel(session, late),
+            budget=remaining_budget(started)
         )
-        
-        result = json.loads(completion.choices[0].message.content)
-        
-        reply = result.get("reply", "")
-        intel = result.get("intelligence", {})
-        
-        # Fallback if reply is empty
-        if not reply or len(reply.strip()) < 5:
-            reply = random.choice(FALLBACK_POOL)
-        
-        return reply, intel
+        reply = parse_completion(completion)
+        llm_breaker.record_success()
+        return reply
+    
+    except Throttled:
+        return throttled_reply(session)
+    
+    except TimeoutError:
+        llm_breaker.record_failure("timeout")
+        logger.warning(f"Session {session.id}: LLM over {LLM_BUDGET_MS}ms budget, fallback reply")
+        return fallback_reply(session), {}
         
     except Exception as e:
+        llm_breaker.record_failure(type(e).__name__)
         logger.error(f"Agent error: {e}")
-        return random.choice(FALLBACK_POOL), {}
+        return fallback_reply(session), {}
+
+
+async def agent_reply_async(msg, history, session):
+    """agent_reply() awaiting the async client, for the asyncio server"""
+    
+    if not async_groq:
+        return fallback_reply(session), {}
+    
+    if not await llm_scheduler.acquire_async(llm_priority(session)):
+        logger.warning(f"Session {session.id}: no LLM slot within {LLM_QUEUE_TIMEOUT_MS}ms, fallback reply")
+        return fallback_reply(session), {}
+    try:
+        return await llm_reply_async(msg, history, session)
+    finally:
+        llm_scheduler.release()
+
+
+async def llm_reply_async(msg, history, session):
+    """llm_reply() awaiting the async client"""
+    
+    if not llm_breaker.allow():
+        return fallback_reply(session), {}
+    
+    kwargs = completion_kwargs(msg, history)
+    
+    started = time.monotonic()
+    slot = await llm_limiter.acquire_async(llm_wait())
+    if slot is None:
+        return throttled_reply(session)
+    
+    try:
+        completion = await llm_budget.call_async(
+            limited_async(slot, lambda: async_groq.chat.completions.create(**kwargs)),
+            on_late=lambda late: keep_late_intel(session, late),
+            budget=remaining_budget(started)
+        )
+        reply = parse_completion(completion)
+        llm_breaker.record_success()
+        return reply
+    
+    except Throttled:
+        return throttled_reply(session)
+    
+    except TimeoutError:
+        llm_breaker.record_failure("timeout")
+        logger.warning(f"Session {session.id}: LLM over {LLM_BUDGET_MS}ms budget, fallback reply")
+        return fallback_reply(session), {}
+    
+    except Exception as e:
+        llm_breaker.record_failure(type(e).__name__)
+        logger.error(f"Agent error: {e}")
+        return fallback_reply(session), {}
 
 
 # =====================================================
@@ -319,6 +1504,77 @@ def merge(existing, *sources):
     )
 
 
+def count_new(existing, *sources):
+    """Intelligence items in sources that existing does not hold yet"""
+    
+    new = 0
+    for k, known in asdict(existing).items():
+        found = set()
+        for s in sources:
+            found.update(s.get(k, []))
+        new += len(found - set(known))
+    return new
+
+
+# Extraction + simple-Detector results of recently seen message texts,
+# shared by every session in this process
+analysis_cache = AnalysisCache(max_bytes=ANALYSIS_CACHE_BYTES)
+
+
+def analyze_message(text):
+    """(intel, points, hits) for one message (str or Document), cached by content.
+
+    intel is Extractor.extract_bounded(text); points and hits are
+    Detector.assess(text, intel). Cached results are shared, so callers
+    must not mutate them. Truncated extractions are not cached.
+    """
+    
+    # Extraction depends on the UPI handles, so a reload starts fresh keys
+    doc = Document.of(text)
+    key = analysis_cache.key(doc.text, upi_registry.version)
+    result = analysis_cache.get(key)
+    if result is None:
+        intel = Extractor.extract_bounded(doc)
+        points, hits = Detector.assess(doc, intel)
+        result = (intel, points, hits)
+        if not intel["truncated"]:
+            analysis_cache.put(key, result)
+    return result
+
+
+# Near-duplicate scammer messages across sessions (campaign templates)
+template_index = MinHashIndex(capacity=TEMPLATE_INDEX_CAPACITY)
+
+
+def link_similar_sessions(session, doc):
+    """Index a scammer message and record sessions running the same template"""
+    for other, similarity in template_index.add(session.id, doc.tokens, TEMPLATE_SIMILARITY):
+        if similarity > session.similar_sessions.get(other, 0.0):
+            session.similar_sessions[other] = similarity
+    return session.similar_sessions
+
+
+def extract_history(session, history):
+    """Extract intelligence from conversationHistory, one message at a time.
+
+    Results are memoized per session by a hash of the message text, so a
+    turn only runs the extractor on messages it has not seen before.
+    """
+    
+    results = []
+    for h in history:
+        text = h.get("text", "")
+        key = hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+        intel = session.history_cache.get(key)
+        if intel is None:
+            session.history_misses += 1
+            intel = session.history_cache[key] = analyze_message(text)[0]
+        else:
+            session.history_hits += 1
+        results.append(intel)
+    return results
+
+
 # =====================================================
 # SESSION CONTROL
 # =====================================================
@@ -328,14 +1584,18 @@ def should_end(session):
     
     intel_count = sum(len(v) for v in asdict(session.intelligence).values())
     
+    # A scammer whose pressure is still rising is about to give more away
+    escalating = session.risk.escalation > 0
+    
     # End conditions:
     # 1. At least 10 total messages exchanged AND gathered some intelligence
     # 2. OR gathered significant intelligence (5+ items)
+    # (both wait while the scammer is still escalating)
     
-    if session.scammer_messages >= 7 and intel_count >= 3:
+    if session.scammer_messages >= 7 and intel_count >= 3 and not escalating:
         return True
     
-    if intel_count >= 5:
+    if intel_count >= 5 and not escalating:
         return True
     
     # Max conversation length
@@ -357,14 +1617,37 @@ def get_session(sid):
 # FINAL EXTRACTION & CALLBACK
 # =====================================================
 
+# Re-scan this many characters before the last offset so a token
+# straddling two scans is still seen whole
+TRANSCRIPT_OVERLAP = 64
+
+
+def scan_transcript(session):
+    """Extract intelligence from the not-yet-scanned tail of the transcript.
+
+    The transcript holds the honeypot's own replies too, so its findings
+    are kept apart in session.transcript_intel until final_extraction;
+    merged every turn, they would inflate should_end's intel count.
+    """
+    
+    start = max(0, session.scanned_upto - TRANSCRIPT_OVERLAP)
+    tail_intel = Extractor.extract_bounded(session.full_conversation, start)
+    session.scanned_upto = len(session.full_conversation)
+    
+    session.transcript_intel = merge(session.transcript_intel, tail_intel)
+
+
 def final_extraction(session):
     """Perform final extraction on entire conversation before callback"""
     
-    # Re-extract from full conversation text
-    final_intel = Extractor.extract(session.full_conversation)
-    
-    # Merge with existing intelligence
-    session.intelligence = merge(session.intelligence, final_intel)
+    # Every turn already scanned its part of the transcript, so only
+    # whatever was appended since the last scan is left to extract
+    scan_transcript(session)
+    session.intelligence = merge(session.intelligence, asdict(session.transcript_intel),
+                                 *take_late_intel(session))
+    # Shortener targets are reported next to the links the scammer sent
+    session.intelligence.phishingLinks = link_canonicalizer.expand_all(
+        session.intelligence.phishingLinks, LINK_EXPAND_MS / 1000)
     
     logger.info(f"Final extraction complete: {asdict(session.intelligence)}")
 
@@ -384,7 +1667,10 @@ def send_callback(session):
         "scamDetected": True,
         "totalMessagesExchanged": session.total_messages,
         "extractedIntelligence": asdict(session.intelligence),
-        "agentNotes": f"Scam engagement completed. {session.scammer_messages} scammer messages analyzed."
+        "agentNotes": (
+            f"Scam engagement completed. {session.scammer_messages} scammer messages analyzed. "
+            f"Scam type: {ScamTypeClassifier.label(session.scam_type)}."
+        )
     }
     
     logger.info(f"CALLBACK PAYLOAD:\n{json.dumps(payload, indent=2)}")
@@ -402,35 +1688,100 @@ def send_callback(session):
 
 
 # =====================================================
-# ROUTES
+# BATCH ANALYSIS (stateless, no sessions / LLM)
 # =====================================================
 
-@app.route("/health")
-def health():
-    return jsonify({"status": "healthy"})
+_batch_pool = None
 
 
-@app.route("/honeypot", methods=["POST", "OPTIONS"])
-@require_api_key
-def honeypot():
-    """Main honeypot endpoint"""
+def get_batch_pool():
+    """Process pool shared by batch requests, created on first use"""
+    global _batch_pool
+    with lock:
+        if _batch_pool is None:
+            _batch_pool = ProcessPoolExecutor(max_workers=BATCH_WORKERS)
+        return _batch_pool
+
+
+def analyze_chunk(texts):
+    """Extract + detect a list of texts (runs inside pool workers).
+
+    Texts come from clients and scam dumps, so each one is extracted under
+    EXTRACTION_BUDGET like a /honeypot message; ``truncated`` marks results
+    that only cover part of their text.
+    """
+    intels = [Extractor.extract_bounded(text) for text in texts]
+    truncated = [intel.pop("truncated") for intel in intels]
+    detected = Detector.detect_batch(texts, intels) if texts else []
+    return [
+        {"scamDetected": bool(is_scam), "extractedIntelligence": intel, "truncated": cut}
+        for is_scam, intel, cut in zip(detected, intels, truncated)
+    ]
+
+
+def iter_batch(texts, pool=None, chunk_size=BATCH_CHUNK_SIZE, max_in_flight=2 * BATCH_WORKERS):
+    """Yield one result per text, in input order.
+
+    ``texts`` may be any iterable (e.g. lines of a file). Chunks are fanned
+    out to ``pool`` with at most ``max_in_flight`` pending so results stream back
+    without holding the whole batch in memory; with no pool they run inline.
+    An item that is an exception instead of a text (an unreadable input
+    line) gets an {"index", "error"} record in its place, so ``index``
+    keeps counting input items.
+    """
     
-    if request.method == "OPTIONS":
-        return make_response("", 204)
+    texts = iter(texts)
+    chunks = iter(lambda: list(itertools.islice(texts, chunk_size)), [])
     
-    data = request.get_json(silent=True)
+    def readable(chunk):
+        return [t for t in chunk if not isinstance(t, Exception)]
     
-    if not data:
-        return jsonify({"status": "error", "message": "Invalid JSON"}), 400
+    if pool is None:
+        results = ((chunk, analyze_chunk(readable(chunk))) for chunk in chunks)
+    else:
+        def fan_out():
+            in_flight = deque()
+            for chunk in chunks:
+                in_flight.append((chunk, pool.submit(analyze_chunk, readable(chunk))))
+                if len(in_flight) >= max_in_flight:
+                    chunk, future = in_flight.popleft()
+                    yield chunk, future.result()
+            while in_flight:
+                chunk, future = in_flight.popleft()
+                yield chunk, future.result()
+        results = fan_out()
+    
+    index = 0
+    for chunk, chunk_results in results:
+        chunk_results = iter(chunk_results)
+        for item in chunk:
+            if isinstance(item, Exception):
+                yield {"index": index, "error": str(item)}
+            else:
+                yield {"index": index, **next(chunk_results)}
+            index += 1
+
+
+# =====================================================
+# TURN HANDLING (shared by the Flask and asyncio servers)
+# =====================================================
+
+def parse_turn(data):
+    """(sessionId, message text, history) of a /honeypot body, None if incomplete"""
     
     sid = data.get("sessionId")
     text = data.get("message", {}).get("text", "").strip()
     history = data.get("conversationHistory", [])
     
     if not sid or not text:
-        return jsonify({"status": "error", "message": "Bad request"}), 400
+        return None
+    return sid, text, history
+
+
+def begin_turn(session, text, history):
+    """Everything before the LLM call; returns (message intel, history intels)"""
     
-    session = get_session(sid)
+    sid = session.id
     
     # ✅ FIX: Count total messages correctly
     # total_messages = scammer messages + honeypot messages
@@ -441,15 +1792,30 @@ def honeypot():
     # Store conversation for final extraction
     session.full_conversation += f"\nScammer: {text}"
     
-    # Extract intelligence from current message
-    regex_intel = Extractor.extract(text)
+    # Extract intelligence and score the current message; every stage
+    # below reads the same Document views
+    doc = Document(text)
+    engine = ENGINES[ENGINE]
+    regex_intel, (points, hits), timings = run_engine(engine, doc, history)
+    if regex_intel.get("truncated"):
+        logger.warning(f"Session {sid}: extraction budget hit, partial intelligence")
+    
+    # Sampled messages are re-analyzed by the shadow engine off this thread
+    if shadow_runner:
+        shadow_runner.record_primary(timings)
+        shadow_runner.observe(doc, history, regex_intel, points >= engine.threshold)
     
-    # Also extract from entire conversation history
-    history_text = " ".join([h["text"] for h in history])
-    history_intel = Extractor.extract(history_text)
+    # Also extract from entire conversation history (cached per message)
+    history_intels = extract_history(session, history)
     
-    # Detect scam
-    is_scam = Detector.detect(text, regex_intel)
+    # Turns that turn up new intelligence get their LLM reply first
+    session.new_intel = count_new(session.intelligence, regex_intel, *history_intels)
+    
+    session.risk.update(points, hits)
+    logger.info(f"[{engine.name}] message score={points}")
+    
+    # Decayed session risk: pressure from earlier turns still counts
+    is_scam = session.risk.level >= engine.threshold
     
     # Force engagement in early messages
     if session.scammer_messages <= 5:
@@ -458,22 +1824,86 @@ def honeypot():
     if is_scam:
         session.scam_detected = True
     
-    # Generate reply
-    reply, llm_intel = agent_reply(text, history, session)
+    ScamTypeClassifier.update(session, doc)
+    link_similar_sessions(session, doc)
+    
+    return regex_intel, history_intels
+
+
+def finish_turn(session, reply, llm_intel, regex_intel, history_intels):
+    """Everything after the LLM call; True if the session should end now"""
+    
+    sid = session.id
     
     # Add honeypot reply to conversation
     session.full_conversation += f"\nHoneypot: {reply}"
     session.total_messages += 1  # Now add the honeypot response
     
     # Merge all intelligence
-    session.intelligence = merge(session.intelligence, regex_intel, history_intel, llm_intel)
+    session.intelligence = merge(session.intelligence, regex_intel, *history_intels, llm_intel,
+                                 *take_late_intel(session))
+    
+    # Extract this turn's transcript lines (O(new text), not O(transcript));
+    # kept out of session.intelligence until the callback
+    scan_transcript(session)
     
     logger.info(f"Session {sid}: Message {session.scammer_messages}, Total: {session.total_messages}")
+    logger.info(f"History cache: {session.history_hits} hits, {session.history_misses} misses")
+    logger.info(f"Analysis cache: {analysis_cache.stats()}")
+    logger.info(f"Risk: level={session.risk.level:.1f}, escalation={session.risk.escalation}")
+    logger.info(f"Scam type: {session.scam_type} {session.scam_type_scores}")
+    if session.similar_sessions:
+        logger.info(f"Same template as {len(session.similar_sessions)} other session(s)")
     logger.info(f"Extracted: {asdict(session.intelligence)}")
     
     # Check if should end
     if should_end(session):
         logger.info(f"Ending session {sid}")
+        return True
+    return False
+
+
+# =====================================================
+# ROUTES
+# =====================================================
+
+@app.route("/health")
+def health():
+    return jsonify({
+        "status": "healthy",
+        "analysisCache": analysis_cache.stats(),
+        "llm": llm_budget.stats(),
+        "llmBreaker": llm_breaker.stats(),  # "open": replies are fallbacks
+        "llmScheduler": llm_scheduler.stats(),
+        "llmRateLimit": llm_limiter.stats(),  # shared by all workers
+    })
+
+
+@app.route("/honeypot", methods=["POST", "OPTIONS"])
+@require_api_key
+def honeypot():
+    """Main honeypot endpoint"""
+    
+    if request.method == "OPTIONS":
+        return make_response("", 204)
+    
+    data = request.get_json(silent=True)
+    
+    if not data:
+        return jsonify({"status": "error", "message": "Invalid JSON"}), 400
+    
+    turn = parse_turn(data)
+    if not turn:
+        return jsonify({"status": "error", "message": "Bad request"}), 400
+    
+    sid, text, history = turn
+    session = get_session(sid)
+    intel = begin_turn(session, text, history)
+    
+    # Generate reply
+    reply, llm_intel = agent_reply(text, history, session)
+    
+    if finish_turn(session, reply, llm_intel, *intel):
         send_callback(session)
     
     return jsonify({
@@ -482,5 +1912,67 @@ def honeypot():
     })
 
 
+@app.route("/similar", methods=["POST"])
+@require_api_key
+def similar():
+    """Sessions whose scammer messages near-duplicate a session's or a text"""
+    
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"status": "error", "message": "Invalid JSON"}), 400
+    
+    threshold = data.get("threshold", TEMPLATE_SIMILARITY)
+    valid = isinstance(threshold, (int, float)) and not isinstance(threshold, bool) and 0 <= threshold <= 1
+    if not valid:
+        return jsonify({"status": "error", "message": "threshold must be between 0 and 1"}), 400
+    
+    sid, text = data.get("sessionId"), data.get("text")
+    if isinstance(sid, str) and sid:
+        found = template_index.similar_sessions(sid, threshold)
+    elif isinstance(text, str) and text.strip():
+        found = template_index.query(Document(text).tokens, threshold)
+    else:
+        return jsonify({"status": "error", "message": "Expected \"sessionId\" or \"text\""}), 400
+    
+    return jsonify({
+        "status": "success",
+        "similar": [{"sessionId": other, "similarity": round(sim, 3)} for other, sim in found],
+    })
+
+
+@app.route("/engines/report")
+@require_api_key
+def engines_report():
+    """Shadow-mode latency and agreement between the primary and shadow engines"""
+    
+    return jsonify({
+        "status": "success",
+        "engine": ENGINE,
+        "engines": sorted(ENGINES),
+        "shadow": shadow_runner.report() if shadow_runner else None,
+    })
+
+
+@app.route("/extract/batch", methods=["POST"])
+@require_api_key
+def extract_batch():
+    """Bulk extraction + detection, streamed back as NDJSON"""
+    
+    data = request.get_json(silent=True)
+    texts = data.get("texts") if isinstance(data, dict) else None
+    
+    if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+        return jsonify({"status": "error", "message": "Expected {\"texts\": [string, ...]}"}), 400
+    
+    if len(texts) > BATCH_MAX_TEXTS:
+        return jsonify({"status": "error", "message": f"At most {BATCH_MAX_TEXTS} texts per batch"}), 413
+    
+    # Small batches are cheaper inline than shipped to another process
+    pool = get_batch_pool() if BATCH_WORKERS > 1 and len(texts) > BATCH_CHUNK_SIZE else None
+    
+    lines = (json.dumps(result) + "\n" for result in iter_batch(texts, pool))
+    return Response(lines, mimetype="application/x-ndjson")
+
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=PORT)
\ No newline at end of file
@@ -0,0 +1,293 @@
+"""
+LLM rate limiter shared by every worker process on the host.
+
+gunicorn runs several workers, each with its own in-process scheduler;
+the provider's rate limit applies to all of them together. The limiter's
+state lives in one small file, memory-mapped by every worker and updated
+under an exclusive flock:
+
+- a token bucket (``rate`` calls per second, ``burst`` deep) bounding the
+  request rate;
+- a table of in-flight leases bounding concurrency. A lease expires on
+  its own after ``lease`` seconds, so a worker that dies mid-call cannot
+  leak its slot;
+- an adaptive concurrency limit (AIMD): each fast success adds 1/limit
+  (about +1 per round of calls), a 429 halves it and empties the bucket,
+  a slow success trims it by 10%. Decreases are at most one per
+  ``decrease_interval``, so one burst of 429s counts once;
+- a blocked-until time from the provider's Retry-After header, during
+  which no call goes out from any worker.
+"""
+
+import asyncio
+import fcntl
+import mmap
+import os
+import struct
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from threading import Lock
+from typing import Mapping, Optional, Tuple
+
+MAGIC = b"AGRL"
+# magic, slots, tokens, refilled_at, limit, blocked_until, last_decrease,
+# admitted, throttled, timed_out
+HEADER = struct.Struct("<4sIdddddqqq")
+SLOT = struct.Struct("<d")  # lease expiry (0: free)
+
+
+class Throttled(Exception):
+    """No call slot within the wait allowed; the caller should fall back"""
+
+
+def retry_after_seconds(headers: Mapping[str, str], now: Optional[float] = None) -> Optional[float]:
+    """Seconds asked for by a Retry-After header (delta-seconds or HTTP date)"""
+    value = headers.get("retry-after") if headers else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when - (time.time() if now is None else now))
+
+
+class SharedRateLimiter:
+    """Cross-process token bucket + AIMD concurrency limit in a shared file"""
+
+    def __init__(
+        self,
+        path: str,
+        rate: float = 0.5,
+        burst: float = 5,
+        max_concurrency: int = 16,
+        min_concurrency: int = 1,
+        latency_target: float = 2.0,
+        lease: float = 30.0,
+        decrease_interval: float = 1.0,
+        poll: float = 0.02,
+    ):
+        self.path = path
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.latency_target = latency_target
+        self.lease = lease
+        self.decrease_interval = decrease_interval
+        self.poll = poll
+        self.slots = max_concurrency
+        self.size = HEADER.size + SLOT.size * self.slots
+        # flock is per open file: threads of one worker share the fd, so
+        # they also take an ordinary lock
+        self._lock = Lock()
+        self._pid = None
+        self._open()
+
+    def _open(self) -> None:
+        """(Re)open the state file; a forked worker needs its own open file"""
+        self._pid = os.getpid()
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            self._ensure_layout()
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    @contextmanager
+    def _locked(self):
+        with self._lock:
+            if os.getpid() != self._pid:
+                self._open()
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield self._map
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _ensure_layout(self) -> None:
+        """Create or reset the state file if it is missing or from another layout"""
+        valid = os.fstat(self._fd).st_size == self.size
+        if valid:
+            self._map = mmap.mmap(self._fd, self.size)
+            magic, slots = HEADER.unpack_from(self._map)[:2]
+            valid = magic == MAGIC and slots == self.slots
+            if valid:
+                return
+            self._map.close()
+        os.ftruncate(self._fd, self.size)
+        self._map = mmap.mmap(self._fd, self.size)
+        self._map[:] = bytes(self.size)
+        HEADER.pack_into(self._map, 0, MAGIC, self.slots, float(self.burst), time.time(),
+                         float(self.max_concurrency), 0.0, 0.0, 0, 0, 0)
+
+    def _read(self, m) -> list:
+        return list(HEADER.unpack_from(m))
+
+    def _write(self, m, state) -> None:
+        HEADER.pack_into(m, 0, *state)
+
+    def _leases(self, m):
+        return [SLOT.unpack_from(m, HEADER.size + i * SLOT.size)[0] for i in range(self.slots)]
+
+    def _set_lease(self, m, slot: int, expiry: float) -> None:
+        SLOT.pack_into(m, HEADER.size + slot * SLOT.size, expiry)
+
+    def _try_acquire(self) -> Tuple[Optional[int], float]:
+        """(slot, 0) if a call may go out now, else (None, seconds to wait)"""
+        with self._locked() as m:
+            state = self._read(m)
+            _, _, tokens, refilled_at, limit, blocked_until, _, _, _, _ = state
+            now = time.time()
+            tokens = min(self.burst, tokens + max(0.0, now - refilled_at) * self.rate)
+            state[2], state[3] = tokens, now
+
+            leases = self._leases(m)
+            active = sum(expiry > now for expiry in leases)
+            if now < blocked_until:
+                wait = blocked_until - now
+            elif active >= max(self.min_concurrency, int(limit)):
+                wait = self.poll
+            elif tokens < 1:
+                wait = (1 - tokens) / self.rate if self.rate > 0 else self.poll
+            else:
+                slot = next(i for i, expiry in enumerate(leases) if expiry <= now)
+                self._set_lease(m, slot, now + self.lease)
+                state[2] -= 1
+                state[7] += 1
+                self._write(m, state)
+                return slot, 0.0
+            self._write(m, state)
+            return None, wait
+
+    def _timed_out(self) -> None:
+        with self._locked() as m:
+            state = self._read(m)
+            state[9] += 1
+            self._write(m, state)
+
+    def try_acquire(self) -> Optional[int]:
+        """A call slot if one is free right now, else None. An optional
+        call (a hedge) that is skipped is not counted as timed out"""
+        return self._try_acquire()[0]
+
+    def acquire(self, timeout: float) -> Optional[int]:
+        """A call slot (blocking up to timeout seconds), None if none freed up"""
+        deadline = time.monotonic() + timeout
+        while True:
+            slot, wait = self._try_acquire()
+            if slot is not None:
+                return slot
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self._timed_out()
+                return None
+            time.sleep(min(wait, remaining, 0.25))
+
+    async def acquire_async(self, timeout: float) -> Optional[int]:
+        """acquire() for asyncio tasks (sleeps without blocking the loop)"""
+        deadline = time.monotonic() + timeout
+        while True:
+            slot, wait = self._try_acquire()
+            if slot is not None:
+                return slot
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self._timed_out()
+                return None
+            await asyncio.sleep(min(wait, remaining, 0.25))
+
+    def release(self, slot: int, latency: Optional[float] = None, throttled: bool = False,
+                retry_after: Optional[float] = None) -> None:
+        """Return a slot and feed the call's outcome to the AIMD limit.
+
+        latency is given for successful calls only; a failed call that
+        was not throttled leaves the limit alone.
+        """
+        with self._locked() as m:
+            state = self._read(m)
+            now = time.time()
+            self._set_lease(m, slot, 0.0)
+            limit, last_decrease = state[4], state[6]
+            can_decrease = now - last_decrease >= self.decrease_interval
+
+            if throttled:
+                state[8] += 1
+                state[2] = 0.0  # the provider's bucket is empty too
+                if retry_after:
+                    state[5] = max(state[5], now + retry_after)
+                if can_decrease:
+                    state[4], state[6] = max(self.min_concurrency, limit / 2), now
+            elif latency is not None:
+                if latency > self.latency_target:
+                    if can_decrease:
+                        state[4], state[6] = max(self.min_concurrency, limit * 0.9), now
+                else:
+                    state[4] = min(self.max_concurrency, limit + 1 / max(limit, 1.0))
+            self._write(m, state)
+
+    def stats(self) -> dict:
+        with self._locked() as m:
+            _, _, tokens, refilled_at, limit, blocked_until, _, admitted, throttled, timed_out = self._read(m)
+            now = time.time()
+            return {
+                "ratePerSec": self.rate,
+                "tokens": round(min(self.burst, tokens + max(0.0, now - refilled_at) * self.rate), 2),
+                "concurrencyLimit": round(limit, 2),
+                "inFlight": sum(expiry > now for expiry in self._leases(m)),
+                "blockedForS": round(max(0.0, blocked_until - now), 2),
+                "admitted": admitted,
+                "throttled": throttled,
+                "timedOut": timed_out,
+            }
+
+    def run(self, slot: int, fn, classify=None):
+        """fn() in an acquired slot, releasing it with the call's outcome.
+        classify(exc) -> (throttled, retry_after) tells a provider 429
+        apart from other errors."""
+        start = time.monotonic()
+        try:
+            result = fn()
+        except Exception as e:
+            throttled, retry_after = classify(e) if classify else (False, None)
+            self.release(slot, throttled=throttled, retry_after=retry_after)
+            raise
+        except BaseException:
+            self.release(slot)
+            raise
+        self.release(slot, latency=time.monotonic() - start)
+        return result
+
+    async def run_async(self, slot: int, make_call, classify=None):
+        """run() for a coroutine factory"""
+        start = time.monotonic()
+        try:
+            result = await make_call()
+        except Exception as e:
+            throttled, retry_after = classify(e) if classify else (False, None)
+            self.release(slot, throttled=throttled, retry_after=retry_after)
+            raise
+        except BaseException:  # cancelled (budget over, hedge lost)
+            self.release(slot)
+            raise
+        self.release(slot, latency=time.monotonic() - start)
+        return result
+
+    def call(self, fn, timeout: float, classify=None):
+        """acquire() then run(); raises Throttled if no slot frees up within timeout"""
+        slot = self.acquire(timeout)
+        if slot is None:
+            raise Throttled(f"no LLM call slot within {timeout:.2f}s")
+        return self.run(slot, fn, classify)
+
+    async def call_async(self, make_call, timeout: float, classify=None):
+        """call() for a coroutine factory"""
+        slot = await self.acquire_async(timeout)
+        if slot is None:
+            raise Throttled(f"no LLM call slot within {timeout:.2f}s")
+        return await self.run_async(slot, make_call, classify)
@@ -70,7 +70,7 @@ echo To start the server, run:
 echo   python main.py
 echo.
 echo Or using uvicorn:
-echo   uvicorn main:app --host 0.0.0.0 --port 8000 --reload
+echo   uvicorn asgi:app --host 0.0.0.0 --port 8000 --reload
 echo.
 echo Next steps:
 echo   1. Start the server
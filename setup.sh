@@ -157,7 +157,7 @@ else
     echo "  python3 main.py"
     echo ""
     echo "Or using uvicorn:"
-    echo "  uvicorn main:app --host 0.0.0.0 --port 8000 --reload"
+    echo "  uvicorn asgi:app --host 0.0.0.0 --port 8000 --reload"
     echo ""
     echo "Next steps:"
     echo "  1. Start the server"
@@ -0,0 +1,251 @@
+"""
+Near-duplicate index for scam templates (MinHash + LSH, NumPy-backed).
+
+Campaigns send one template with a different name, amount or link per
+target, so exact hashing never matches two of them. Messages are reduced
+to word-shingle MinHash signatures instead, and signatures are bucketed
+by LSH bands: two messages whose shingle sets overlap enough share a
+band with high probability, so a query only compares against the few
+signatures in its buckets. Word pairs are short enough that one changed
+name or amount only breaks two shingles, and 32 bands of 2 rows make a
+pair of messages at Jaccard 0.5 collide in some band almost surely; the
+candidates are then filtered on their full signature similarity.
+
+Signatures live in a fixed-size ring buffer (one uint32 row each); the
+oldest message is evicted when the ring wraps. The LSH buckets are NumPy
+arrays sized by capacity as well: per band, a hash table of chain heads
+plus doubly linked next / prev slot links, so indexing or evicting a
+message is a few vectorized writes across all bands and memory does not
+grow with the number of distinct band keys. Computing a signature is a
+handful of array operations over the message's shingle hashes: no
+per-permutation Python loop. Only the first ``max_tokens`` words are
+shingled, which bounds that work (num_perm x max_tokens uint64) however
+long the message; a message with fewer than ``min_shingles`` distinct
+shingles ("Hello sir", "ok") is too short to name a template and is
+neither indexed nor queried.
+"""
+
+import zlib
+from threading import Lock
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+_MASK32 = np.uint64(0xFFFFFFFF)
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)  # multiplicative hashing of band keys to table cells
+
+
+def shingle_hashes(tokens: Sequence[str], k: int = 2) -> np.ndarray:
+    """uint64 hashes of the message's k-word shingles (fewer words: one shingle)"""
+    if not tokens:
+        return np.zeros(0, dtype=np.uint64)
+    words = np.fromiter((zlib.crc32(t.encode()) for t in tokens), dtype=np.uint64, count=len(tokens))
+    k = min(k, len(words))
+    # Polynomial combine of k consecutive word hashes, in uint64 (wraps)
+    h = np.zeros(len(words) - k + 1, dtype=np.uint64)
+    for i in range(k):
+        h = h * np.uint64(1000003) + words[i:len(words) - k + 1 + i]
+    return np.unique(h)
+
+
+class MinHashIndex:
+    """Session-tagged MinHash signatures with banded LSH lookup"""
+
+    def __init__(
+        self,
+        capacity: int = 50000,
+        num_perm: int = 64,
+        bands: int = 32,
+        shingle_size: int = 2,
+        bucket_size: int = 64,
+        min_shingles: int = 5,
+        max_tokens: int = 4096,
+        seed: int = 1,
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.capacity = capacity
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.bucket_size = bucket_size
+        self.min_shingles = min_shingles
+        self.max_tokens = max_tokens
+        # A query stops gathering candidates from further bands past this
+        self.max_candidates = 4 * bucket_size
+
+        # Multiply-shift hash family: h_i(x) = high 32 bits of (a_i * x + b_i)
+        rng = np.random.default_rng(seed)
+        self._a = (rng.integers(1, 2 ** 63, num_perm, dtype=np.uint64) | np.uint64(1))[:, None]
+        self._b = rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64)[:, None]
+
+        self.signatures = np.zeros((capacity, num_perm), dtype=np.uint32)
+        # Sessions are interned to int codes so results group in NumPy
+        self.slot_codes = np.full(capacity, -1, dtype=np.int64)
+        self.slot_keys = np.zeros((capacity, bands), dtype=np.uint64)
+        self._codes: Dict[str, int] = {}
+        self._names: Dict[int, str] = {}
+        self._next_code = 0
+
+        # LSH buckets: slots whose band key hashes to a cell are chained from
+        # _heads[band, cell], newest first; keys sharing a cell are told apart
+        # through slot_keys when the chain is read
+        self._cell_bits = max(1, int(capacity - 1).bit_length())
+        self._band_index = np.arange(bands)
+        self._heads = np.full((bands, 1 << self._cell_bits), -1, dtype=np.int32)
+        self._next_slot = np.full((capacity, bands), -1, dtype=np.int32)
+        self._prev_slot = np.full((capacity, bands), -1, dtype=np.int32)
+        self._slots: Dict[str, List[int]] = {}  # session id -> its ring slots
+        self._next = 0
+        self._size = 0
+        self._lock = Lock()
+
+    def signature(self, tokens: Sequence[str]) -> Optional[np.ndarray]:
+        """MinHash signature (uint32[num_perm]) of a tokenized message's first
+        ``max_tokens`` words, or None under ``min_shingles`` distinct shingles"""
+        shingles = shingle_hashes(tokens[:self.max_tokens], self.shingle_size)
+        if len(shingles) < max(self.min_shingles, 1):
+            return None
+        with np.errstate(over="ignore"):
+            hashed = (self._a * shingles[None, :] + self._b) >> np.uint64(32)
+        return (hashed.min(axis=1) & _MASK32).astype(np.uint32)
+
+    def _band_keys(self, sig: np.ndarray) -> np.ndarray:
+        """One 64-bit key per band (a rare key collision only adds a candidate)"""
+        rows = sig.reshape(self.bands, self.rows).astype(np.uint64)
+        keys = rows[:, 0].copy()
+        for r in range(1, self.rows):
+            keys = (keys << np.uint64(32)) ^ (keys >> np.uint64(32)) ^ rows[:, r]
+        return keys
+
+    def _cells(self, keys: np.ndarray) -> np.ndarray:
+        with np.errstate(over="ignore"):
+            return ((keys * _GOLDEN) >> np.uint64(64 - self._cell_bits)).astype(np.intp)
+
+    def _bucket(self, band: int, cell: int, key: int) -> List[int]:
+        """Newest bucket_size slots holding this band key"""
+        slots = []
+        slot = int(self._heads[band, cell])
+        while slot >= 0 and len(slots) < self.bucket_size:
+            if self.slot_keys[slot, band] == key:
+                slots.append(slot)
+            slot = int(self._next_slot[slot, band])
+        return slots
+
+    def _query(self, sig: np.ndarray, keys: np.ndarray, threshold: float, exclude: Optional[str],
+               limit: int) -> List[Tuple[str, float]]:
+        candidates = set()
+        for band, (cell, key) in enumerate(zip(self._cells(keys).tolist(), keys.tolist())):
+            candidates.update(self._bucket(band, cell, key))
+            if len(candidates) >= self.max_candidates:
+                break
+        if not candidates:
+            return []
+        slots = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        similarity = np.count_nonzero(self.signatures[slots] == sig, axis=1) / self.num_perm
+        codes = self.slot_codes[slots]
+
+        keep = similarity >= threshold
+        if exclude in self._codes:
+            keep &= codes != self._codes[exclude]
+        codes, similarity = codes[keep], similarity[keep]
+
+        # Best message per session, most similar sessions first
+        order = np.argsort(-similarity, kind="stable")
+        _, first = np.unique(codes[order], return_index=True)
+        best = order[np.sort(first)][:limit]
+        return [(self._names[c], s) for c, s in zip(codes[best].tolist(), similarity[best].tolist())]
+
+    def query(self, tokens: Sequence[str], threshold: float = 0.5, exclude: Optional[str] = None,
+              limit: int = 20) -> List[Tuple[str, float]]:
+        """Up to ``limit`` (session id, estimated Jaccard similarity) pairs for
+        indexed messages like this one, most similar first"""
+        sig = self.signature(tokens)
+        if sig is None:
+            return []
+        with self._lock:
+            return self._query(sig, self._band_keys(sig), threshold, exclude, limit)
+
+    def add(self, session_id: str, tokens: Sequence[str], threshold: float = 0.5,
+            limit: int = 20) -> List[Tuple[str, float]]:
+        """Index one message for a session; returns the other sessions it resembles"""
+        sig = self.signature(tokens)
+        if sig is None:
+            return []
+        keys = self._band_keys(sig)
+
+        with self._lock:
+            similar = self._query(sig, keys, threshold, session_id, limit)
+
+            slot = self._next
+            if self.slot_codes[slot] >= 0:
+                self._evict(slot)
+            code = self._codes.get(session_id)
+            if code is None:
+                code = self._codes[session_id] = self._next_code
+                self._names[code] = session_id
+                self._next_code += 1
+            self.signatures[slot] = sig
+            self.slot_keys[slot] = keys
+            self.slot_codes[slot] = code
+            self._slots.setdefault(session_id, []).append(slot)
+            self._link(slot, self._cells(keys))
+            self._next = (slot + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+
+        return similar
+
+    def _link(self, slot: int, cells: np.ndarray) -> None:
+        """Push a slot on the front of its chain in every band"""
+        bands = self._band_index
+        head = self._heads[bands, cells]
+        self._next_slot[slot] = head
+        self._prev_slot[slot] = -1
+        linked = head >= 0
+        self._prev_slot[head[linked], bands[linked]] = slot
+        self._heads[bands, cells] = slot
+
+    def _unlink(self, slot: int, cells: np.ndarray) -> None:
+        """Take a slot out of its chain in every band"""
+        bands = self._band_index
+        nxt, prev = self._next_slot[slot], self._prev_slot[slot]
+        first = prev < 0
+        self._heads[bands[first], cells[first]] = nxt[first]
+        self._next_slot[prev[~first], bands[~first]] = nxt[~first]
+        linked = nxt >= 0
+        self._prev_slot[nxt[linked], bands[linked]] = prev[linked]
+
+    def _evict(self, slot: int) -> None:
+        self._unlink(slot, self._cells(self.slot_keys[slot]))
+        code = int(self.slot_codes[slot])
+        sid = self._names[code]
+        slots = self._slots[sid]
+        slots.remove(slot)
+        if not slots:
+            del self._slots[sid], self._codes[sid], self._names[code]
+        self.slot_codes[slot] = -1
+
+    def session_signatures(self, session_id: str) -> np.ndarray:
+        """All indexed signatures of one session"""
+        with self._lock:
+            return self.signatures[self._slots.get(session_id, [])].copy()
+
+    def similar_sessions(self, session_id: str, threshold: float = 0.5, limit: int = 20) -> List[Tuple[str, float]]:
+        """Other sessions sharing a near-duplicate message with this one"""
+        best: Dict[str, float] = {}
+        for sig in self.session_signatures(session_id):
+            with self._lock:
+                found = self._query(sig, self._band_keys(sig), threshold, session_id, limit)
+            for sid, sim in found:
+                best[sid] = max(sim, best.get(sid, 0.0))
+        return sorted(best.items(), key=lambda item: -item[1])[:limit]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "messages": self._size,
+                "sessions": len(self._slots),
+                "capacity": self.capacity,
+                "buckets": int(np.count_nonzero(self._heads >= 0)),  # occupied table cells
+            }
@@ -0,0 +1,53 @@
+"""Local test: content-addressed per-message analysis cache (no server)."""
+import os
+import sys
+sys.path.insert(0, ".")
+os.environ.setdefault("API_KEY", "local-test-key")
+
+import main
+from analysis_cache import AnalysisCache
+from main import Detector, Extractor, analyze_message
+from test_fused_extractor import CORPUS
+
+TEMPLATE = "Your SBI account will be blocked today. Verify immediately at scammer@ybl or call 9876543210"
+
+
+def test_lru_byte_budget_and_stats():
+    cache = AnalysisCache(max_bytes=3 * (AnalysisCache.ENTRY_OVERHEAD + 10), sizeof=lambda v: 10)
+    keys = [cache.key(f"message {i}") for i in range(4)]
+    for k in keys[:3]:
+        cache.put(k, "x")
+    assert cache.get(keys[0]) == "x"      # keys[0] becomes most recent
+    cache.put(keys[3], "x")               # evicts keys[1], the least recent
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[2]) == cache.get(keys[3]) == "x"
+    stats = cache.stats()
+    assert stats["entries"] == 3 and stats["evictions"] == 1
+    assert stats["bytes"] <= stats["maxBytes"]
+    assert (stats["hits"], stats["misses"]) == (3, 1)
+
+    assert cache.key("  same text\n") == cache.key("same text") != cache.key("Same text")
+    assert cache.key("same text", 1) != cache.key("same text", 2)
+
+
+def test_hits_return_uncached_results(monkeypatch):
+    main.analysis_cache.clear()
+    for text in CORPUS + [TEMPLATE]:
+        intel = Extractor.extract_bounded(text)
+        expected = (intel, *Detector.assess(text, intel))
+        assert analyze_message(text) == expected
+        assert analyze_message(text) == expected
+
+    # A hit skips all extraction work
+    monkeypatch.setattr(Extractor, "extract_bounded", lambda *a: (_ for _ in ()).throw(AssertionError("re-extracted")))
+    analyze_message(TEMPLATE)
+    assert main.analysis_cache.stats()["hits"] >= len(CORPUS) + 2
+
+
+def test_registry_reload_invalidates(monkeypatch):
+    main.analysis_cache.clear()
+    analyze_message(TEMPLATE)
+    monkeypatch.setattr(main.upi_registry, "version", main.upi_registry.version + 1)
+    misses = main.analysis_cache.misses
+    analyze_message(TEMPLATE)
+    assert main.analysis_cache.misses == misses + 1
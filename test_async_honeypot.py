@@ -0,0 +1,114 @@
+"""Local test: asyncio /honeypot server (ASGI, driven in-process, no server)."""
+import asyncio
+import json
+import os
+import sys
+import time
+from types import SimpleNamespace
+sys.path.insert(0, ".")
+os.environ.setdefault("API_KEY", "local-test-key")
+
+import asgi
+import main
+from llm import LLMScheduler
+from main import API_KEY, app
+from ratelimit import SharedRateLimiter
+
+SCAM = "Your SBI account is blocked. Share OTP now and pay to fraud.pay@ybl"
+
+
+async def request(method, path, body=None, api_key=API_KEY, content_type="application/json"):
+    """(status, headers, body bytes) of one request through asgi.app"""
+    headers = [(b"content-type", content_type.encode())]
+    if api_key:
+        headers.append((b"x-api-key", api_key.encode()))
+    scope = {"type": "http", "method": method, "path": path, "query_string": b"",
+             "headers": headers, "http_version": "1.1", "scheme": "http"}
+    payload = json.dumps(body).encode() if body is not None else b""
+    messages = [{"type": "http.request", "body": payload, "more_body": False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    await asgi.app(scope, receive, send)
+    start = sent[0]
+    return start["status"], dict(start["headers"]), b"".join(m.get("body", b"") for m in sent[1:])
+
+
+def turn(sid, text=SCAM):
+    return {"sessionId": sid, "message": {"sender": "scammer", "text": text}, "conversationHistory": []}
+
+
+class SlowCompletions:
+    """Stands in for AsyncGroq: every call waits on the 'network'"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.in_flight = self.peak = 0
+
+    async def create(self, **kwargs):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+        content = json.dumps({"reply": "Which branch are you calling from?", "intelligence": {"upiIds": ["x@ybl"]}})
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def test_contract_matches_flask(monkeypatch):
+    monkeypatch.setattr(main, "should_end", lambda session: False)
+    client = app.test_client()
+    cases = [
+        ("POST", turn("t-async-a"), API_KEY, "application/json"),
+        ("POST", {"sessionId": "t-async-b"}, API_KEY, "application/json"),
+        ("POST", turn("t-async-c"), "wrong-key", "application/json"),
+        ("POST", turn("t-async-d"), API_KEY, "text/plain"),
+        ("OPTIONS", None, API_KEY, "application/json"),
+    ]
+    for method, body, key, content_type in cases:
+        expected = client.open("/honeypot", method=method, headers={"x-api-key": key, "content-type": content_type},
+                               data=json.dumps(body) if body is not None else b"")
+        status, headers, raw = asyncio.run(request(method, "/honeypot", body, key, content_type))
+        assert status == expected.status_code, (method, body)
+        if expected.status_code != 204:
+            got, want = json.loads(raw), expected.get_json()
+            assert got.keys() == want.keys()
+            if want["status"] == "error":
+                assert got == want
+
+
+def test_conversations_wait_on_llm_concurrently(tmp_path, monkeypatch):
+    completions = SlowCompletions(delay=0.2)
+    monkeypatch.setattr(main, "async_groq", SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+    monkeypatch.setattr(main, "llm_limiter", SharedRateLimiter(str(tmp_path / "rate.bin"), rate=1000, burst=1000, max_concurrency=64))
+    monkeypatch.setattr(main, "llm_scheduler", LLMScheduler(max_in_flight=50))
+    monkeypatch.setattr(main, "should_end", lambda session: False)
+
+    async def run():
+        return await asyncio.gather(*(request("POST", "/honeypot", turn(f"t-async-many-{i}")) for i in range(50)))
+
+    start = time.perf_counter()
+    results = asyncio.run(run())
+    elapsed = time.perf_counter() - start
+
+    assert all(status == 200 for status, _, _ in results)
+    assert json.loads(results[0][2])["reply"] == "Which branch are you calling from?"
+    assert completions.peak == 50
+    assert elapsed < 2.0  # 50 x 0.2s one after another would take 10s
+    assert "x@ybl" in main.session_store["t-async-many-0"].intelligence.upiIds
+
+
+def test_other_routes_served_by_flask():
+    status, headers, raw = asyncio.run(request("GET", "/health"))
+    assert status == 200 and json.loads(raw)["status"] == "healthy"
+
+    status, headers, raw = asyncio.run(request("POST", "/extract/batch", {"texts": [SCAM, "hello"]}))
+    assert status == 200 and headers[b"content-type"] == b"application/x-ndjson"
+    assert len(raw.decode().splitlines()) == 2
+
+    status, _, _ = asyncio.run(request("GET", "/honeypot"))
+    assert status == 405
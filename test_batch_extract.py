@@ -0,0 +1,87 @@
+"""Local test: stateless batch extraction endpoint + process pool (no server)."""
+import io
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+sys.path.insert(0, ".")
+os.environ.setdefault("API_KEY", "local-test-key")
+
+from batch_extract import read_texts
+from main import API_KEY, Detector, Extractor, app, iter_batch, session_store
+
+TEXTS = [
+    "Your account is blocked. Call +91-9876543210 immediately.",
+    "Pay the fine to scammer@ybl or visit http://fake-bank.com",
+    "Hi, are we still meeting for lunch?",
+    "Share the OTP sent to you, employee ID is EMP4521",
+] * 5
+
+
+def expected(texts):
+    out = []
+    for i, text in enumerate(texts):
+        intel = Extractor.extract_bounded(text)
+        truncated = intel.pop("truncated")
+        out.append({"index": i, "scamDetected": Detector.detect(text, intel),
+                    "extractedIntelligence": intel, "truncated": truncated})
+    return out
+
+
+def test_inline_and_pool_agree():
+    assert list(iter_batch(TEXTS, chunk_size=3)) == expected(TEXTS)
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        assert list(iter_batch(iter(TEXTS), pool, chunk_size=3, max_in_flight=2)) == expected(TEXTS)
+
+
+def test_endpoint_streams_ndjson():
+    client = app.test_client()
+    before = dict(session_store)
+    resp = client.post("/extract/batch", headers={"x-api-key": API_KEY}, json={"texts": TEXTS})
+    assert resp.status_code == 200
+    assert resp.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in resp.get_data(as_text=True).splitlines()]
+    assert lines == expected(TEXTS)
+    assert session_store == before
+
+
+def test_endpoint_validation():
+    client = app.test_client()
+    assert client.post("/extract/batch", json={"texts": ["x"]}).status_code == 401
+    headers = {"x-api-key": API_KEY}
+    assert client.post("/extract/batch", headers=headers, json={"texts": "x"}).status_code == 400
+    assert client.post("/extract/batch", headers=headers, json={"texts": [1, 2]}).status_code == 400
+
+
+def test_endpoint_bounds_each_text():
+    client = app.test_client()
+    huge = "call 9876543210 " + "x" * 100000 + " pay to late@ybl"
+    resp = client.post("/extract/batch", headers={"x-api-key": API_KEY}, json={"texts": [huge, TEXTS[0]]})
+    first, second = [json.loads(line) for line in resp.get_data(as_text=True).splitlines()]
+    assert first["truncated"] and first["extractedIntelligence"]["upiIds"] == []
+    assert not second["truncated"]
+
+
+def test_cli_keeps_line_numbers_for_bad_jsonl_lines():
+    lines = ['{"text": "pay to abc@ybl"}', "not json", "[1, 2]", '{"text": 42}', "", '{"text": "call 9876543210"}']
+    errors = io.StringIO()
+    results = list(iter_batch(read_texts(io.StringIO("\n".join(lines)), jsonl=True, errors=errors), chunk_size=2))
+    assert [r["index"] for r in results] == list(range(len(lines)))
+    assert [r["index"] for r in results if "error" in r] == [1, 2, 3, 4]
+    assert results[0]["extractedIntelligence"]["upiIds"] == ["abc@ybl"]
+    assert results[5]["extractedIntelligence"]["phoneNumbers"] == ["+919876543210"]
+    assert [line.split(":")[0] for line in errors.getvalue().splitlines()] == ["line 2", "line 3", "line 4", "line 5"]
+
+
+if __name__ == "__main__":
+    test_inline_and_pool_agree()
+    print("1. Inline and process-pool results agree: OK")
+    test_endpoint_streams_ndjson()
+    print("2. /extract/batch streams NDJSON without sessions: OK")
+    test_endpoint_validation()
+    print("3. Auth + body validation: OK")
+    test_endpoint_bounds_each_text()
+    print("4. Each text extracted under the budget: OK")
+    test_cli_keeps_line_numbers_for_bad_jsonl_lines()
+    print("5. CLI reports bad JSON lines in place, keeping line numbers: OK")
+    print("All local tests passed.")
@@ -0,0 +1,77 @@
+"""Local test: linear-time scanner + budgeted extraction mode (no server)."""
+import os
+import sys
+import time
+sys.path.insert(0, ".")
+os.environ.setdefault("API_KEY", "local-test-key")
+
+from main import Extractor, ExtractionBudget
+from test_fused_extractor import CORPUS
+
+# Inputs that made the old patterns backtrack super-linearly
+HOSTILE = {
+    "id + whitespace": lambda n: "id" + " " * n + "!",
+    "dotted word": lambda n: "a." * (n // 2),
+    "hyphenated word": lambda n: "-a" * (n // 2) + "@",
+    "digit groups": lambda n: "1-" * (n // 2) + "x",
+    "endless link": lambda n: "http://" + "a" * n,
+    "repeated ids": lambda n: "id " * (n // 3),
+}
+
+
+def best_time(fn, arg, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(arg)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def test_hostile_inputs_scale_linearly():
+    for name, make in HOSTILE.items():
+        small = best_time(Extractor.extract, make(10000))
+        large = best_time(Extractor.extract, make(80000))
+        # 8x the input: linear is ~8x, the old quadratic patterns were ~64x+
+        assert large < 25 * max(small, 1e-4), (name, small, large)
+        assert large < 1.0, (name, large)
+
+
+def test_bounded_matches_full_when_within_budget():
+    for text in CORPUS:
+        intel = Extractor.extract_bounded(text)
+        assert intel.pop("truncated") is False
+        assert intel == Extractor.extract(text)
+
+
+def test_input_length_cap():
+    text = "call 9876543210 " + "filler " * 1000 + "a/c 50100234567891"
+    intel = Extractor.extract_bounded(text, budget=ExtractionBudget(max_chars=200))
+    assert intel["truncated"] is True
+    assert intel["phoneNumbers"] == ["+919876543210"] and intel["bankAccounts"] == []
+
+
+def test_per_field_cap():
+    text = " ".join(f"98765432{i:02d}" for i in range(40))
+    intel = Extractor.extract_bounded(text, budget=ExtractionBudget(max_items=5))
+    assert intel["truncated"] is True and len(intel["phoneNumbers"]) == 5
+
+
+def test_time_budget():
+    text = "call 9876543210 now " * 5000
+    intel = Extractor.extract_bounded(text, budget=ExtractionBudget(max_chars=10 ** 6, max_seconds=0))
+    assert intel["truncated"] is True
+
+
+if __name__ == "__main__":
+    test_hostile_inputs_scale_linearly()
+    print("1. Hostile inputs scale linearly: OK")
+    test_bounded_matches_full_when_within_budget()
+    print("2. Bounded mode matches full mode within budget: OK")
+    test_input_length_cap()
+    print("3. Input length cap flags truncation: OK")
+    test_per_field_cap()
+    print("4. Per-field cap flags truncation: OK")
+    test_time_budget()
+    print("5. Time budget flags truncation: OK")
+    print("All local tests passed.")
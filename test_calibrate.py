@@ -0,0 +1,120 @@
+"""Local test: detector threshold calibration (no server)."""
+import json
+import os
+import sys
+sys.path.insert(0, ".")
+os.environ.setdefault("API_KEY", "local-test-key")
+
+import numpy as np
+
+import calibrate
+import main
+from calibrate import choose, sweep
+from test_scam_classifier import corpus
+
+
+def brute_force(scores, labels, threshold):
+    flagged = scores >= threshold
+    tp = int((flagged & labels).sum())
+    fp = int((flagged & ~labels).sum())
+    return tp, fp
+
+
+def test_sweep_matches_brute_force():
+    rng = np.random.default_rng(1)
+    scores = rng.integers(0, 120, 5000).astype(float)
+    labels = rng.random(5000) < scores / 150
+    table = sweep(scores, labels)
+    assert table["threshold"].tolist() == sorted(set(scores.tolist()), reverse=True)
+    for i, t in enumerate(table["threshold"]):
+        assert (table["tp"][i], table["fp"][i]) == brute_force(scores, labels, t)
+    assert table["tpr"][-1] == table["fpr"][-1] == 1.0
+
+    best = choose(table)
+    assert table["f1"][best] == table["f1"][table["threshold"] > 0].max()
+    strict = choose(table, min_precision=0.7)
+    assert table["precision"][strict] >= 0.7
+
+
+def test_choice_stays_in_loadable_range():
+    # Flagging everything (threshold 0) has the best F1 here
+    scores = np.array([0, 0, 0, 0, 5, 150, 150], dtype=float)
+    labels = np.array([1, 1, 1, 1, 0, 1, 0], dtype=bool)
+    table = sweep(scores, labels)
+    assert table["threshold"][np.argmax(table["f1"])] == 0
+    for metric in ("f1", "youden"):
+        assert 0 < table["threshold"][choose(table, metric, max_score=100)] <= 100
+    assert table["threshold"][choose(table, min_precision=0.1, max_score=100)] == 5
+
+
+def test_scores_once_and_writes_config(tmp_path, monkeypatch):
+    texts, labels = corpus(300)
+    data = tmp_path / "corpus.jsonl"
+    data.write_text("\n".join(json.dumps({"text": t, "label": l}) for t, l in zip(texts, labels)))
+    config = tmp_path / "detector_config.json"
+    config.write_text(json.dumps({"multisignal": {"threshold": 55}}))
+
+    calls = []
+    real = calibrate.score_corpus
+    monkeypatch.setattr(calibrate, "score_corpus", lambda *a, **k: calls.append(1) or real(*a, **k))
+    args = [str(data), "--config", str(config), "--workers", "1"]
+    calibrate.main(args)
+    calibrate.main(args + ["--metric", "youden"])
+    assert len(calls) == 1
+
+    written = json.loads(config.read_text())
+    assert written["multisignal"] == {"threshold": 55}
+    threshold = written["simple"]["threshold"]
+    assert isinstance(threshold, int)
+
+    old = main.Detector.THRESHOLD
+    try:
+        main.load_detector_config(str(config))
+        assert main.Detector.THRESHOLD == threshold
+    finally:
+        main.Detector.THRESHOLD = old
+
+
+def test_conversations_replayed_through_risk_state():
+    low = "Your bank account has an issue"
+    lines = [
+        {"text": low, "label": 0, "conversation": "a"},
+        {"text": "Share the OTP now or your account is blocked", "label": 1, "conversation": "b"},
+        {"text": low, "label": 0, "conversation": "a"},
+        {"text": "Hello, lunch tomorrow?", "label": 0},
+        {"text": low, "label": 0, "conversation": "a"},
+    ]
+    conversations, labels = calibrate.read_conversations(json.dumps(l) for l in lines)
+    assert conversations == [[low, low, low], [lines[1]["text"]], [lines[3]["text"]]]
+    assert labels == [0, 0, 0, 1, 0]
+
+    for name, detector in main.DETECTORS.items():
+        levels = calibrate.score_corpus(name, conversations, chunk_size=2)
+        expected = []
+        for conversation in conversations:
+            risk, history = main.RiskState(), []
+            for text in conversation:
+                risk.update(*detector.assess(text, main.Extractor.extract(text), history))
+                expected.append(risk.level)
+                history.append({"sender": "scammer", "text": text})
+        assert levels.tolist() == expected, name
+    # A repeated low-risk message keeps its own score as the session level
+    assert levels[0] == levels[1] == levels[2]
+
+
+def test_config_thresholds_are_validated(tmp_path):
+    config = tmp_path / "detector_config.json"
+    old = {name: d.THRESHOLD for name, d in main.DETECTORS.items()}
+    try:
+        for bad in ("40", True, -5, 0, float("nan"), 101, None):
+            config.write_text(json.dumps({"multisignal": {"threshold": bad}, "simple": "x"}))
+            main.load_detector_config(str(config))
+            assert main.MultiSignalDetector.THRESHOLD == old["multisignal"], bad
+        config.write_text("[1, 2]")
+        main.load_detector_config(str(config))
+        config.write_text(json.dumps({"multisignal": {"threshold": 60.5}, "simple": {"threshold": 250}}))
+        main.load_detector_config(str(config))
+        assert (main.MultiSignalDetector.THRESHOLD, main.Detector.THRESHOLD) == (60.5, 250)
+    finally:
+        for name, threshold in old.items():
+            main.DETECTORS[name].THRESHOLD = threshold
@@ -0,0 +1,81 @@
+"""Local test: circuit breaker around the LLM call (no network)."""
+import os
+import sys
+import time
+from types import SimpleNamespace
+sys.path.insert(0, ".")
+os.environ.setdefault("API_KEY", "local-test-key")
+
+import main
+from llm import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, LLMBudget
+from main import API_KEY, FALLBACK_POOL, app
+from ratelimit import SharedRateLimiter
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_opens_on_failure_rate_and_recovers():
+    clock = Clock()
+    breaker = CircuitBreaker(window=10, min_calls=4, failure_rate=0.5, cooldown=30, clock=clock)
+    for ok in (True, False, True):
+        assert breaker.allow()
+        breaker.record_success() if ok else breaker.record_failure()
+    assert breaker.state == CLOSED  # 1/3 failed, and under min_calls
+
+    breaker.allow()
+    breaker.record_failure("timeout")
+    assert breaker.state == OPEN  # 2/4 failed
+    assert not breaker.allow() and breaker.stats()["rejected"] == 1
+
+    clock.now = 30
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    assert not breaker.allow()  # one probe at a time
+    breaker.record_failure("RateLimitError")
+    assert breaker.state == OPEN
+
+    clock.now = 60
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert [t["to"] for t in breaker.stats()["transitions"]] == [OPEN, HALF_OPEN, OPEN, HALF_OPEN, CLOSED]
+
+
+def test_outage_degrades_to_instant_fallbacks(tmp_path, monkeypatch):
+    calls = []
+
+    def down(**kwargs):
+        calls.append(1)
+        time.sleep(0.05)
+        raise ConnectionError("groq unreachable")
+
+    monkeypatch.setattr(main, "groq", SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=down))))
+    monkeypatch.setattr(main, "llm_limiter", SharedRateLimiter(str(tmp_path / "rate.bin"), rate=1000, burst=1000, max_concurrency=64))
+    monkeypatch.setattr(main, "llm_budget", LLMBudget(budget=1.0))
+    monkeypatch.setattr(main, "llm_breaker", CircuitBreaker(window=5, min_calls=3, cooldown=60))
+    monkeypatch.setattr(main, "should_end", lambda session: False)
+    client = app.test_client()
+
+    replies = []
+    for i in range(10):
+        resp = client.post("/honeypot", headers={"x-api-key": API_KEY}, json={
+            "sessionId": "t-breaker",
+            "message": {"sender": "scammer", "text": f"Pay the fine now, attempt {i}"},
+            "conversationHistory": [],
+        })
+        replies.append(resp.get_json()["reply"])
+        assert replies[-1] in FALLBACK_POOL
+
+    # The rest never touched the network (nor waited on it): counted, not timed
+    assert len(calls) == 3
+    # Error and breaker fallbacks alike do not repeat until the pool runs out
+    assert len(set(replies[:len(FALLBACK_POOL)])) == len(FALLBACK_POOL)
+
+    health = client.get("/health").get_json()["llmBreaker"]
+    assert health["state"] == OPEN and health["rejected"] == 7
+    assert health["transitions"][-1]["reason"].endswith("(last: ConnectionError)")
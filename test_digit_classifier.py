@@ -0,0 +1,98 @@
+"""Local test: digit-run classification (no server)."""
+import os
+import sys
+sys.path.insert(0, ".")
+os.environ.setdefault("API_KEY", "local-test-key")
+
+from main import Extractor, classify_digits, classify_run, luhn_valid, verhoeff_valid, VERHOEFF_D, VERHOEFF_P
+
+INV = (0, 4, 3, 2, 1, 5, 6, 7, 8, 9)
+
+
+def with_verhoeff_digit(body):
+    c = 0
+    for i, ch in enumerate(reversed(body)):
+        c = VERHOEFF_D[c][VERHOEFF_P[(i + 1) % 8][int(ch)]]
+    return body + str(INV[c])
+
+
+def test_checksums():
+    assert luhn_valid("4111111111111111")
+    assert not luhn_valid("4111111111111112")
+    aadhaar = with_verhoeff_digit("23412341234")
+    assert verhoeff_valid(aadhaar)
+    assert not verhoeff_valid(aadhaar[:-1] + str((int(aadhaar[-1]) + 1) % 10))
+
+
+def test_classes():
+    aadhaar = with_verhoeff_digit("23412341234")
+    assert classify_digits("9876543210") == ("phone", "9876543210")
+    assert classify_digits("09876543210") == ("phone", "9876543210")
+    assert classify_digits("919876543210") == ("phone", "9876543210")
+    assert classify_digits(aadhaar) == ("aadhaar", aadhaar)
+    assert classify_digits("4111111111111111") == ("card", "4111111111111111")
+    assert classify_digits("1234567890123456") == ("bank", "1234567890123456")
+    assert classify_digits("482913") == ("otp", "482913")
+    assert classify_digits("12")[0] is None
+
+
+def test_groupings():
+    assert classify_run("+91 98765-43210") == [("phone", "9876543210")]
+    assert classify_run("98765 43210") == [("phone", "9876543210")]
+    assert classify_run("4111 1111 1111 1111") == [("card", "4111111111111111")]
+    # Unknown grouping: each group on its own
+    assert classify_run("9876543210 2") == [("phone", "9876543210"), (None, "2")]
+
+
+def test_each_run_reported_once():
+    aadhaar = with_verhoeff_digit("23412341234")
+    intel = Extractor.extract(
+        f"Call 98765 43210 or 9876543210. Card 4111 1111 1111 1111, Aadhaar {aadhaar}, "
+        "OTP 482913, a/c 50100234567891, employee ID: 8765432109"
+    )
+    assert intel["phoneNumbers"] == ["+919876543210"]
+    assert intel["bankAccounts"] == ["50100234567891"]
+    assert intel["employeeIds"] == ["8765432109"]
+
+
+def test_no_fake_employee_ids():
+    intel = Extractor.extract("I paid 50000 yesterday, valid 1234 only")
+    assert intel["employeeIds"] == []
+
+
+def test_checksum_valid_accounts_stay_accounts():
+    account = "5100234567891232"
+    assert luhn_valid(account)
+    aadhaar_like = with_verhoeff_digit("50100234567")
+    intel = Extractor.extract(f"Transfer to a/c {account} or a/c no {aadhaar_like} today")
+    assert intel["bankAccounts"] == [account, aadhaar_like]
+    assert classify_run(account) == [("bank", account)]
+    # A card / Aadhaar grouping or wording still marks them
+    intel = Extractor.extract(f"Share card number {account} and Aadhaar {aadhaar_like}")
+    assert intel["bankAccounts"] == []
+    assert classify_run("5100 2345 6789 1232") == [("card", account)]
+
+
+def test_upi_id_is_no_employee_id():
+    intel = Extractor.extract("My id 9876543210@ybl, send now")
+    assert intel["upiIds"] == ["9876543210@ybl"]
+    assert intel["employeeIds"] == [] and intel["phoneNumbers"] == []
+    assert Extractor.extract("id AB12CD@ybl")["employeeIds"] == []
+
+
+if __name__ == "__main__":
+    test_checksums()
+    print("1. Luhn / Verhoeff checksums: OK")
+    test_classes()
+    print("2. Phone / Aadhaar / card / bank / OTP classes: OK")
+    test_groupings()
+    print("3. Space / hyphen groupings: OK")
+    test_each_run_reported_once()
+    print("4. Each digit run reported once: OK")
+    test_no_fake_employee_ids()
+    print("5. No employee IDs from words ending in 'id': OK")
+    test_checksum_valid_accounts_stay_accounts()
+    print("6. Checksum-valid account numbers stay bank accounts: OK")
+    test_upi_id_is_no_employee_id()
+    print("7. A UPI ID after 'id' is no employee ID: OK")
+    print("All local tests passed.")
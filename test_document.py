@@ -0,0 +1,67 @@
+"""Local test: shared per-message Document views (no server)."""
+import os
+import sys
+sys.path.insert(0, ".")
+os.environ.setdefault("API_KEY", "local-test-key")
+
+import main
+from main import Detector, Document, Extractor, MultiSignalDetector
+from test_fused_extractor import CORPUS
+
+
+def test_stages_agree_on_text_and_document():
+    for text in CORPUS + ["", "   ", "ID: 12345 call 98765 43210 https://x.in/a"]:
+        doc = Document(text)
+        intel = Extractor.extract_bounded(text)
+        assert Extractor.extract_bounded(doc) == intel
+        assert Extractor.extract(doc) == Extractor.extract(text)
+        assert Extractor.extract(doc, 5) == Extractor.extract(text, 5)
+        assert Detector.assess(doc, intel) == Detector.assess(text, intel)
+        assert MultiSignalDetector.assess(doc) == MultiSignalDetector.assess(text)
+
+
+def test_views_computed_once(monkeypatch):
+    scans = []
+    real_scan = main.KEYWORD_MATCHER.scan
+    monkeypatch.setattr(main.KEYWORD_MATCHER, "scan", lambda t: scans.append(t) or real_scan(t))
+
+    doc = Document("URGENT: your bank account is blocked, share OTP with 9876543210")
+    intel = Extractor.extract_bounded(doc)
+    Detector.assess(doc, intel)
+    Detector.assess(doc, intel)
+    MultiSignalDetector.assess(doc)
+    assert len(scans) == 1
+    assert Document.of(doc) is doc
+
+
+def test_budgeted_scan_stops_early():
+    # The scan behind an expired budget stops; it is not run to the end first
+    text = " ".join(f"98765{i:05d}" for i in range(5000))
+    doc = Document(text)
+    intel = Extractor.extract_bounded(doc, budget=main.ExtractionBudget(max_chars=10**6, max_items=10**6, max_seconds=0))
+    assert intel["truncated"]
+    _, found = doc._scan
+    assert len(found) == 32
+
+    # The next whole-text reader resumes the same scan and sees every match
+    assert Extractor.extract(doc) == Extractor.extract(text)
+    assert len(found) == len(list(Extractor.SCAN.finditer(text))) > 32
+
+
+def test_word_views_share_the_extraction_bound(monkeypatch):
+    monkeypatch.setattr(main, "EXTRACTION_BUDGET", main.ExtractionBudget(max_chars=100))
+    text = "URGENT verify your account now " * 1000 + "lottery winner prize"
+    doc = Document(text)
+    assert len(doc.bounded) <= 100 and text.startswith(doc.bounded)
+    assert "prize" not in doc.tokens and len(doc.tokens) < 25
+    session = main.Session(id="t-bounded")
+    assert main.ScamTypeClassifier.update(session, doc) != "lottery_prize"
+
+    # extract_bounded reads the same prefix and reuses its keyword sweep
+    scans = []
+    real_scan = main.KEYWORD_MATCHER.scan
+    monkeypatch.setattr(main.KEYWORD_MATCHER, "scan", lambda t: scans.append(t) or real_scan(t))
+    intel = Extractor.extract_bounded(doc)
+    assert intel["truncated"] and sorted(intel["suspiciousKeywords"]) == ["account", "urgent", "verify"]
+    Detector.assess(doc, intel)
+    assert scans == [doc.lower]
@@ -0,0 +1,119 @@
+"""Local test: pluggable engines and shadow-mode comparison (no server)."""
+import os
+import sys
+import time
+sys.path.insert(0, ".")
+os.environ.setdefault("API_KEY", "local-test-key")
+
+import main
+from engines import BackupIntelligenceExtractor, ShadowRunner, run_engine
+from main import API_KEY, ENGINES, Document, app
+
+SCAM = ("URGENT: your SBI account is blocked. Share OTP and pay to fraud.pay@ybl "
+        "or call 9876543210, verify at http://sbi-kyc.in/verify")
+
+
+def test_backup_extractor_matches_main_backup():
+    intel = BackupIntelligenceExtractor(["urgent", "otp"]).extract(
+        "Pay ravi.kumar@ybl, mail help@sbi.co.in, call 9876543210. URGENT otp"
+    )
+    assert intel["upiIds"] == ["ravi.kumar@ybl"]
+    assert intel["emails"] == ["help@sbi.co.in"]
+    assert intel["phoneNumbers"] == ["9876543210"]
+    assert sorted(intel["suspiciousKeywords"]) == ["otp", "urgent"]
+
+
+def test_engines_share_interface():
+    doc = Document(SCAM)
+    for engine in ENGINES.values():
+        intel = engine.extract(doc)
+        points, hits = engine.assess(doc, intel, [])
+        assert "fraud.pay@ybl" in intel["upiIds"]
+        assert points >= engine.threshold, engine.name
+
+
+def test_main_engine_analyzes_once(monkeypatch):
+    # Truncated extractions are not content-cached; assess must still
+    # reuse the extraction instead of running it again
+    calls = []
+    real = main.Extractor.extract_bounded
+    monkeypatch.setattr(main.Extractor, "extract_bounded", lambda *a, **k: calls.append(1) or real(*a, **k))
+    monkeypatch.setattr(main, "EXTRACTION_BUDGET", main.ExtractionBudget(max_chars=40))
+    misses = main.analysis_cache.stats()["misses"]
+
+    intel, (points, _), _ = run_engine(ENGINES["main"], Document(SCAM + " unique tail 1"), [])
+    assert intel["truncated"] and points > 0
+    assert len(calls) == 1
+    assert main.analysis_cache.stats()["misses"] == misses + 1
+
+
+class SlowEngine:
+    name = "slow"
+    threshold = 50
+
+    def extract(self, doc):
+        time.sleep(0.05)
+        return {"upiIds": ["x@ybl"]}
+
+    def assess(self, doc, intel, history=None):
+        return 10, {}
+
+
+def test_shadow_runs_off_thread_and_reports():
+    runner = ShadowRunner(ENGINES["main"], SlowEngine(), sample_rate=1.0)
+    start = time.perf_counter()
+    for _ in range(3):
+        assert runner.observe(Document(SCAM), [], {"upiIds": ["x@ybl"]}, is_scam=True)
+    assert time.perf_counter() - start < 0.05  # never waits on the shadow
+    runner.drain()
+
+    report = runner.report()
+    assert report["compared"] == 3
+    assert report["detectionAgreement"] == 0.0
+    assert report["fieldAgreement"]["upiIds"] == 1.0
+    assert report["latency"]["slow"]["extract"]["samples"] == 3
+
+
+def test_shadow_sampling_and_backpressure():
+    assert not ShadowRunner(ENGINES["main"], SlowEngine(), sample_rate=0.0).observe(Document(SCAM), [], {}, True)
+    runner = ShadowRunner(ENGINES["main"], SlowEngine(), sample_rate=1.0, max_pending=1)
+    queued = [runner.observe(Document(SCAM), [], {}, True) for _ in range(3)]
+    assert queued == [True, False, False]
+    runner.drain()
+    assert runner.report()["dropped"] == 2
+
+
+def test_field_agreement_compares_normal_forms():
+    # The backup engine reports "09876543210", "A/c 1234..." and the raw
+    # link; main stores +91 phones, bare accounts and canonical links
+    text = "Call 09876543210, A/c 123456789012, visit http://WWW.Fake-bank.com/login?utm_source=x. pay fraud.pay@ybl"
+    doc = Document(text)
+    intel = ENGINES["main"].extract(doc)
+    for normalize, agreed in ((None, 0.0), (main.normalize_intel, 1.0)):
+        runner = ShadowRunner(ENGINES["main"], ENGINES["backup"], sample_rate=1.0, normalize=normalize)
+        runner.observe(doc, [], intel, is_scam=True)
+        runner.drain()
+        agreement = runner.report()["fieldAgreement"]
+        for field in ("phoneNumbers", "bankAccounts", "phishingLinks"):
+            assert agreement[field] == agreed, (normalize, field)
+        assert agreement["upiIds"] == 1.0
+
+
+def test_handler_feeds_shadow_report(monkeypatch):
+    runner = ShadowRunner(ENGINES["main"], ENGINES["backup"], sample_rate=1.0)
+    monkeypatch.setattr(main, "shadow_runner", runner)
+    monkeypatch.setattr(main, "should_end", lambda session: False)
+    client = app.test_client()
+    resp = client.post("/honeypot", headers={"x-api-key": API_KEY}, json={
+        "sessionId": "t-shadow",
+        "message": {"sender": "scammer", "text": SCAM},
+        "conversationHistory": [],
+    })
+    assert resp.status_code == 200
+    runner.drain()
+
+    report = client.get("/engines/report", headers={"x-api-key": API_KEY}).get_json()
+    assert report["engine"] == "main"
+    assert report["shadow"]["compared"] == 1
+    assert set(report["shadow"]["latency"]) == {"main", "backup"}
+    assert client.get("/engines/report").status_code == 401
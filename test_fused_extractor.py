@@ -0,0 +1,119 @@
+"""Local test: single-pass Extractor matches the old multi-regex extractor (no server)."""
+import os
+import re
+import sys
+sys.path.insert(0, ".")
+os.environ.setdefault("API_KEY", "local-test-key")
+
+from main import Extractor, link_canonicalizer
+
+# The seven-regex extractor that Extractor.extract replaced (UPI group fixed:
+# findall() yields whole strings, the old code kept only their first char).
+BANK = re.compile(r'\b\d{10,18}\b')
+EMPLOYEE = re.compile(
+    r'(?:employee\s*(?:id|ID|Id)|ID|id)\s*(?:is|:)?\s*([A-Z0-9]{4,10})\b',
+    re.I
+)
+PHONE_PATTERNS = [
+    re.compile(r'\+91[-\s]?(\d{10})'),
+    re.compile(r'\b91[-\s]?(\d{10})'),
+    re.compile(r'\b([6-9]\d{9})\b'),
+]
+UPI = re.compile(
+    r'\b([\w.-]{3,}@(?:upi|ybl|okaxis|oksbi|paytm|ibl|axl|okicici|okhdfcbank|phonepe|googlepay|airtel))\b',
+    re.I
+)
+URL = re.compile(r'https?://[^\s<>"\']+|www\.[^\s<>"\']+')
+
+
+def legacy_extract(text):
+    employee_ids = []
+    for match in EMPLOYEE.finditer(text):
+        emp_id = match.group(1).upper()
+        if emp_id not in employee_ids:
+            employee_ids.append(emp_id)
+    phones = set()
+    for pattern in PHONE_PATTERNS:
+        for match in pattern.finditer(text):
+            digits = ''.join(filter(str.isdigit, match.group(0)))[-10:]
+            if len(digits) == 10 and digits[0] in '6789':
+                phones.add(f"+91{digits}")
+    text_lower = text.lower()
+    return {
+        "bankAccounts": list(set(BANK.findall(text))),
+        "employeeIds": employee_ids,
+        "phoneNumbers": list(phones),
+        "upiIds": list({u.lower() for u in UPI.findall(text)}),
+        "phishingLinks": list(set(URL.findall(text))),
+        "suspiciousKeywords": [k for k in Extractor.KEYWORDS if k in text_lower],
+    }
+
+
+def without_phone_accounts(intel):
+    """Old output minus bank accounts that are really the reported phones."""
+    phones = set(intel["phoneNumbers"])
+    intel["bankAccounts"] = [
+        b for b in intel["bankAccounts"]
+        if not ((len(b) == 10 or (len(b) == 12 and b.startswith("91")))
+                and f"+91{b[-10:]}" in phones)
+    ]
+    return intel
+
+
+def with_canonical_links(intel):
+    """Links are now stored canonicalized (see links.py)"""
+    intel["phishingLinks"] = list({link_canonicalizer.canonicalize(u).url for u in intel["phishingLinks"]})
+    return intel
+
+
+def normalized(intel):
+    return {k: sorted(v) for k, v in intel.items()}
+
+
+CORPUS = [
+    "Your bank account will be blocked today. Verify immediately.",
+    "Your SBI account 1234567890123456 is blocked! Contact +91-9876543210. UPI: scammer@ybl. Visit http://fake-bank.com",
+    "Transfer to A/c 50100234567891 IFSC HDFC0001234, call 919812345678 or 91 7012345678",
+    "Share OTP now. Employee ID is EMP4521, my id: 77889 and officer ID 4567AB",
+    "Pay via rahul.kumar@okaxis or refund.desk@PAYTM, link www.secure-kyc.in/verify?u=1",
+    "URGENT alert: account locked, click https://bit.ly/3xYz now, call 8123456789",
+    "Security confirm: 1234567890 is your reference, 6123456789 is our helpline",
+    "Hello sir, how are you? Nothing suspicious here.",
+    "",
+    "Numbers 12345678901234567890 and 123456789 are not accounts",
+]
+
+
+def test_equivalence_with_legacy():
+    for text in CORPUS:
+        expected = normalized(with_canonical_links(without_phone_accounts(legacy_extract(text))))
+        assert normalized(Extractor.extract(text)) == expected, text
+
+
+def test_phone_not_reported_as_bank():
+    intel = Extractor.extract("Call 9876543210 or +91 8765432109, a/c 123456789012")
+    assert sorted(intel["phoneNumbers"]) == ["+918765432109", "+919876543210"]
+    assert intel["bankAccounts"] == ["123456789012"]
+
+
+def test_link_owns_its_digits():
+    intel = Extractor.extract("Open http://kyc-update.in/9876543210/12345678901 now")
+    assert intel["phishingLinks"] == ["http://kyc-update.in/9876543210/12345678901"]
+    assert intel["phoneNumbers"] == [] and intel["bankAccounts"] == []
+
+
+def test_upi_ids_are_whole():
+    intel = Extractor.extract("UPI: Scammer.Fraud@YBL")
+    assert intel["upiIds"] == ["scammer.fraud@ybl"]
+
+
+if __name__ == "__main__":
+    test_equivalence_with_legacy()
+    print("1. Equivalence with multi-regex extractor: OK")
+    test_phone_not_reported_as_bank()
+    print("2. Phone numbers not duplicated as bank accounts: OK")
+    test_link_owns_its_digits()
+    print("3. Digits inside links stay in the link: OK")
+    test_upi_ids_are_whole()
+    print("4. UPI IDs returned whole: OK")
+    print("All local tests passed.")
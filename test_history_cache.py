@@ -0,0 +1,52 @@
+"""Local test: per-message conversationHistory extraction cache (no server)."""
+import os
+import sys
+sys.path.insert(0, ".")
+os.environ.setdefault("API_KEY", "local-test-key")
+
+from main import API_KEY, Extractor, Session, app, extract_history, session_store
+
+HISTORY = [
+    {"sender": "scammer", "text": "Call +91-9876543210 now"},
+    {"sender": "user", "text": "Why sir?"},
+    {"sender": "scammer", "text": "Pay to scammer@ybl"},
+]
+
+
+def test_each_message_extracted_once():
+    session = Session(id="t-history")
+    first = extract_history(session, HISTORY[:2])
+    assert (session.history_hits, session.history_misses) == (0, 2)
+
+    second = extract_history(session, HISTORY)
+    assert (session.history_hits, session.history_misses) == (2, 3)
+    assert second[:2] == first
+    assert second == [Extractor.extract_bounded(h["text"]) for h in HISTORY]
+
+
+def test_handler_reuses_cache_across_turns():
+    client = app.test_client()
+    history = []
+    for i, text in enumerate(["Hello sir", "Are you there?", "Please reply"]):
+        resp = client.post("/honeypot", headers={"x-api-key": API_KEY}, json={
+            "sessionId": "t-history-handler",
+            "message": {"sender": "scammer", "text": text},
+            "conversationHistory": history,
+        })
+        assert resp.status_code == 200
+        history = history + [
+            {"sender": "scammer", "text": text},
+            {"sender": "user", "text": resp.get_json()["reply"]},
+        ]
+    session = session_store["t-history-handler"]
+    # Turn 2 sees 2 new messages, turn 3 sees 2 cached + 2 new
+    assert (session.history_hits, session.history_misses) == (2, 4)
+    assert len(session.history_cache) == 4
+
+
+if __name__ == "__main__":
+    test_each_message_extracted_once()
+    print("1. Each history message extracted once: OK")
+    test_handler_reuses_cache_across_turns()
+    print("2. Handler reuses cached history across turns: OK")
+    print("All local tests passed.")
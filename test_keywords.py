@@ -0,0 +1,63 @@
+"""Local test: shared keyword automaton (no server)."""
+import os
+import random
+import sys
+sys.path.insert(0, ".")
+os.environ.setdefault("API_KEY", "local-test-key")
+
+from keywords import KeywordMatcher, TokenPhraseMatcher
+from main import Extractor, Detector, KEYWORD_MATCHER
+
+
+def test_matches_substring_semantics():
+    words = sorted(Extractor.KEYWORDS | Detector.HIGH | Detector.MED | Detector.CTX)
+    rng = random.Random(7)
+    for _ in range(300):
+        text = " ".join(rng.choice(words + ["sir", "blockedaccount", "upin", "x"]) for _ in range(12))
+        expected = {w for w in words if w in text}
+        assert KEYWORD_MATCHER.matches(text) == expected, text
+
+
+def test_overlapping_and_prefix_keywords():
+    matcher = KeywordMatcher({"a": ["blocked", "locked", "pin", "pin code"]})
+    assert matcher.matches("account blocked, share pin code") == {"blocked", "locked", "pin", "pin code"}
+
+
+def test_category_counts():
+    matcher = KeywordMatcher({"threat": ["blocked", "suspended"], "ask": ["otp", "upi"], "money": ["upi"]})
+    assert matcher.counts("share upi and otp or get blocked") == {"threat": 1, "ask": 2, "money": 1}
+    assert matcher.scan("nothing here") == {"threat": [], "ask": [], "money": []}
+
+
+def test_word_boundary_mode():
+    matcher = KeywordMatcher({"k": ["pin", "card number", "card"]}, word_boundary=True)
+    assert matcher.matches("pinned spinach") == set()
+    assert matcher.matches("send card numbers and pin.") == {"card", "pin"}
+    assert matcher.matches("card number") == {"card", "card number"}
+
+
+def test_empty_matcher():
+    assert KeywordMatcher({"none": []}).matches("anything") == set()
+
+
+def test_token_phrase_matcher():
+    matcher = TokenPhraseMatcher({"a": ["pin", "card number", "pin code"], "b": ["pin"]})
+    assert matcher.counts("your pin code and card number".split()) == {"a": 3, "b": 1}
+    assert matcher.counts("spinning card numbers card".split()) == {"a": 0, "b": 0}
+    assert matcher.counts([]) == {"a": 0, "b": 0}
+
+
+if __name__ == "__main__":
+    test_matches_substring_semantics()
+    print("1. Same hits as per-keyword substring checks: OK")
+    test_overlapping_and_prefix_keywords()
+    print("2. Overlapping / prefix keywords: OK")
+    test_category_counts()
+    print("3. Per-category counts: OK")
+    test_word_boundary_mode()
+    print("4. Word-boundary mode: OK")
+    test_empty_matcher()
+    print("5. Empty keyword lists: OK")
+    test_token_phrase_matcher()
+    print("6. Token phrase matcher: OK")
+    print("All local tests passed.")
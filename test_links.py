@@ -0,0 +1,171 @@
+"""Local test: phishing link canonicalization + shortener expansion (stub HTTP server)."""
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+sys.path.insert(0, ".")
+os.environ.setdefault("API_KEY", "local-test-key")
+
+import main
+from links import LinkCanonicalizer, http_resolver, registered_domain
+from main import API_KEY, Extractor, Session, app, session_store
+
+
+class StubShortener(BaseHTTPRequestHandler):
+    hits = 0
+
+    def do_HEAD(self):
+        if self.path.startswith("/final"):
+            self.send_response(200)
+        else:
+            StubShortener.hits += 1
+            port = self.server.server_address[1]
+            self.send_response(301)
+            self.send_header("Location", f"http://localhost:{port}/final?utm_source=sms")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def test_variants_collapse_to_one_link():
+    canon = LinkCanonicalizer()
+    variants = [
+        "http://WWW.Fake-Bank.com/login?utm_source=sms&fbclid=abc",
+        "http://fake-bank.com/login.",
+        "www.fake-bank.com/./login",
+        "http://fake-bank.com:80//login),",
+    ]
+    assert {canon.canonicalize(v).url for v in variants} == {"http://fake-bank.com/login"}
+
+
+def test_registered_domain():
+    assert registered_domain("a.b.sbi-kyc.co.in") == "sbi-kyc.co.in"
+    assert registered_domain("secure.fake-bank.com") == "fake-bank.com"
+    assert registered_domain("10.0.0.1") == "10.0.0.1"
+    assert LinkCanonicalizer().canonicalize("https://login.kyc-update.in/x").registered_domain == "kyc-update.in"
+
+
+def test_extractor_stores_canonical_links():
+    intel = Extractor.extract("Visit www.Fake-Bank.com/verify?utm_campaign=x. Or http://fake-bank.com/verify!")
+    assert intel["phishingLinks"] == ["http://fake-bank.com/verify"]
+
+
+def test_shortener_expansion_is_cached():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubShortener)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        canon = LinkCanonicalizer(resolver=http_resolver, shorteners={"127.0.0.1"})
+        assert canon.canonicalize(f"{base}/abc123").url == f"{base}/abc123"  # no lookup while extracting
+        assert StubShortener.hits == 0
+        for _ in range(50):
+            links = canon.expand_all([f"{base}/abc123", "http://other.in/"], timeout=5)
+        assert links == [f"{base}/abc123", f"http://localhost:{server.server_address[1]}/final", "http://other.in/"]
+        assert canon.expand(f"{base}/abc123").expanded_from == f"{base}/abc123"
+        assert StubShortener.hits == 1
+        assert canon.stats()["expanded"] == 1
+    finally:
+        server.shutdown()
+
+
+def test_unreachable_shortener_keeps_link():
+    canon = LinkCanonicalizer(resolver=lambda url: http_resolver(url, timeout=0.5), shorteners={"127.0.0.1"})
+    assert canon.expand_all(["http://127.0.0.1:9/x"], timeout=5) == ["http://127.0.0.1:9/x"]
+
+
+def test_failed_expansion_is_retried_after_ttl():
+    now, calls = [0.0], []
+    targets = {"http://bit.ly/x": None}
+    canon = LinkCanonicalizer(resolver=lambda url: calls.append(url) or targets[url],
+                              failure_ttl=60, clock=lambda: now[0])
+    assert canon.expand("http://bit.ly/x") is None
+    assert canon.expand("http://bit.ly/x") is None and len(calls) == 1  # remembered for the TTL
+    targets["http://bit.ly/x"] = "https://sbi-kyc.in/pay"
+    now[0] = 61.0
+    assert canon.expand("http://bit.ly/x").url == "https://sbi-kyc.in/pay" and len(calls) == 2
+    assert canon.stats()["expandFailed"] == 0
+
+
+def test_expansion_waits_one_deadline():
+    release = threading.Event()
+    canon = LinkCanonicalizer(resolver=lambda url: release.wait(10) and "https://sbi-kyc.in/pay")
+    links = ["http://bit.ly/a", "http://tinyurl.com/b"]
+    try:
+        assert canon.expand_all(links, timeout=0.05) == links  # still resolving: sent as typed
+    finally:
+        release.set()
+    for _ in range(100):
+        if canon.stats()["expanded"] == 2:
+            break
+        time.sleep(0.05)
+    assert canon.expand_all(links, timeout=5) == links[:1] + ["https://sbi-kyc.in/pay"] + links[1:]
+
+
+def test_bare_shortener_links_are_extracted():
+    intel = Extractor.extract("Pay at bit.ly/kyc-sbi or TINYURL.com/x9 now. me@bit.ly/no orbit.ly/no")
+    assert intel["phishingLinks"] == ["http://bit.ly/kyc-sbi", "http://tinyurl.com/x9"]
+
+
+def test_callback_reports_shortener_and_target():
+    saved = main.link_canonicalizer
+    main.link_canonicalizer = LinkCanonicalizer(resolver={"http://bit.ly/kyc": "https://sbi-kyc.in/pay"}.get)
+    try:
+        session = Session(id="t-short-link")
+        session.intelligence.phishingLinks = Extractor.extract("open bit.ly/kyc today")["phishingLinks"]
+        main.final_extraction(session)
+        assert session.intelligence.phishingLinks == ["http://bit.ly/kyc", "https://sbi-kyc.in/pay"]
+    finally:
+        main.link_canonicalizer = saved
+
+
+def test_malformed_hosts_are_kept_as_typed():
+    assert Extractor.extract("pay at http://[abc now")["phishingLinks"] == ["http://[abc"]
+    assert Extractor.extract("go http://[::1 ok")["phishingLinks"] == ["http://[::1"]
+    assert Extractor.extract("www.[x].com")["phishingLinks"] == ["www.[x].com"]
+
+
+def test_malformed_link_in_handler_and_history():
+    client = app.test_client()
+    history = []
+    for text in ["pay at http://[abc now", "still waiting sir"]:
+        resp = client.post("/honeypot", headers={"x-api-key": API_KEY}, json={
+            "sessionId": "t-bad-link",
+            "message": {"sender": "scammer", "text": text},
+            "conversationHistory": history,
+        })
+        assert resp.status_code == 200
+        history = history + [
+            {"sender": "scammer", "text": text},
+            {"sender": "user", "text": resp.get_json()["reply"]},
+        ]
+    assert "http://[abc" in session_store["t-bad-link"].intelligence.phishingLinks
+    resp = client.post("/extract/batch", headers={"x-api-key": API_KEY}, json={"texts": ["www.[x].com"]})
+    assert resp.status_code == 200 and b"www.[x].com" in resp.data
+
+
+if __name__ == "__main__":
+    test_variants_collapse_to_one_link()
+    print("1. Link variants collapse to one canonical link: OK")
+    test_registered_domain()
+    print("2. Registered domain: OK")
+    test_extractor_stores_canonical_links()
+    print("3. Extractor stores canonical links: OK")
+    test_shortener_expansion_is_cached()
+    print("4. Shortener expansion via stub server, cached: OK")
+    test_unreachable_shortener_keeps_link()
+    print("5. Unreachable shortener keeps the short link: OK")
+    test_failed_expansion_is_retried_after_ttl()
+    print("6. Failed expansion retried after its TTL: OK")
+    test_expansion_waits_one_deadline()
+    print("7. Expansion waits one overall deadline: OK")
+    test_bare_shortener_links_are_extracted()
+    print("8. Bare shortener links are extracted: OK")
+    test_callback_reports_shortener_and_target()
+    print("9. Callback reports shortener and target: OK")
+    test_malformed_hosts_are_kept_as_typed()
+    print("10. Malformed hosts are kept as typed: OK")
+    test_malformed_link_in_handler_and_history()
+    print("11. Malformed links in /honeypot and history: OK")
+    print("All local tests passed.")
@@ -0,0 +1,143 @@
+"""Local test: LLM latency budget, hedging and late completions (no network)."""
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace
+sys.path.insert(0, ".")
+os.environ.setdefault("API_KEY", "local-test-key")
+
+import pytest
+
+import main
+from llm import LatencyWindow, LLMBudget
+from main import API_KEY, FALLBACK_POOL, app
+from ratelimit import SharedRateLimiter
+
+
+def completion(reply="Which branch is this?", intel=None):
+    content = json.dumps({"reply": reply, "intelligence": intel or {}})
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+# Slow calls block on an Event the test sets, not on a sleep racing the
+# budget, and elapsed times are only checked against those blocked seconds:
+# a loaded machine slows everything down but cannot flip an assert
+
+
+def test_sync_deadline_and_late_result():
+    budget = LLMBudget(budget=0.1)
+    assert budget.call(lambda: "fast") == "fast"
+
+    release, landed = threading.Event(), threading.Event()
+    late = []
+    start = time.monotonic()
+    with pytest.raises(TimeoutError):
+        budget.call(lambda: release.wait(10) and "slow", on_late=lambda r: late.append(r) or landed.set())
+    assert time.monotonic() - start < 5  # did not wait for the call
+    release.set()
+    assert landed.wait(5) and late == ["slow"]
+    assert budget.stats()["timeouts"] == 1 and budget.stats()["late"] == 1
+
+
+def test_sync_hedge_wins_over_slow_first_call():
+    calls = []
+    release = threading.Event()
+
+    def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            release.wait(10)  # stuck until the hedge has answered
+        return len(calls)
+
+    budget = LLMBudget(budget=5.0, hedge=0.05)
+    try:
+        assert budget.call(flaky) == 2
+    finally:
+        release.set()
+    assert budget.counts["hedged"] == 1 and budget.counts["hedgeWins"] == 1
+
+
+def test_p95_hedge_waits_for_samples():
+    window = LatencyWindow(min_samples=5)
+    budget = LLMBudget(budget=1.0, hedge="p95", window=window)
+    assert budget.hedge_after() is None
+    for ms in (10, 20, 30, 40, 50):
+        window.add(ms / 1000)
+    assert budget.hedge_after() == 0.05
+    window.add(5.0)  # a p95 past the budget never hedges
+    assert LLMBudget(budget=1.0, hedge="p95", window=LatencyWindow(min_samples=1)).hedge_after() is None
+
+
+def test_async_deadline_cancels_or_keeps():
+    async def run(keep_late):
+        release = asyncio.Event()
+
+        async def slow():
+            await release.wait()
+            return "slow"
+
+        budget = LLMBudget(budget=0.05, keep_late=keep_late)
+        late = []
+        with pytest.raises(TimeoutError):
+            await budget.call_async(slow, on_late=late.append)
+        release.set()
+        for _ in range(50):  # a kept call finishes within a few loop turns
+            if late:
+                break
+            await asyncio.sleep(0.01)
+        return late
+
+    assert asyncio.run(run(True)) == ["slow"]
+    assert asyncio.run(run(False)) == []
+
+
+def test_async_hedge():
+    calls = []
+
+    async def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            await asyncio.sleep(10)  # cancelled once the hedge has answered
+        return len(calls)
+
+    budget = LLMBudget(budget=5.0, hedge=0.05, keep_late=False)
+    assert asyncio.run(budget.call_async(flaky)) == 2
+    assert budget.counts["hedgeWins"] == 1
+
+
+def test_handler_answers_within_budget(tmp_path, monkeypatch):
+    release = threading.Event()
+
+    def slow_create(**kwargs):
+        release.wait(10)
+        return completion(intel={"upiIds": ["late.scammer@ybl"]})
+
+    monkeypatch.setattr(main, "groq", SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=slow_create))))
+    monkeypatch.setattr(main, "llm_limiter", SharedRateLimiter(str(tmp_path / "rate.bin"), rate=1000, burst=1000, max_concurrency=64))
+    monkeypatch.setattr(main, "llm_budget", LLMBudget(budget=0.1))
+    monkeypatch.setattr(main, "should_end", lambda session: False)
+    client = app.test_client()
+
+    def post(text):
+        start = time.monotonic()
+        resp = client.post("/honeypot", headers={"x-api-key": API_KEY}, json={
+            "sessionId": "t-budget",
+            "message": {"sender": "scammer", "text": text},
+            "conversationHistory": [],
+        })
+        return resp.get_json()["reply"], time.monotonic() - start
+
+    reply, elapsed = post("Your account is blocked, pay now")
+    assert reply in FALLBACK_POOL
+    assert elapsed < 5  # did not wait for the call
+
+    release.set()  # the kept completion lands; its intel joins the next turn
+    for _ in range(500):
+        if main.session_store["t-budget"].late_llm_intel:
+            break
+        time.sleep(0.01)
+    post("Why are you not paying?")
+    assert "late.scammer@ybl" in main.session_store["t-budget"].intelligence.upiIds
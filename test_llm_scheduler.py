@@ -0,0 +1,172 @@
+"""Local test: priority LLM scheduler with bounded concurrency (no network)."""
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace
+sys.path.insert(0, ".")
+os.environ.setdefault("API_KEY", "local-test-key")
+
+import main
+from llm import LLMScheduler
+from main import FALLBACK_POOL, Session
+from ratelimit import SharedRateLimiter
+from test_async_honeypot import request, turn
+
+
+def wait_for_queue(scheduler, depth):
+    while scheduler.stats()["queueDepth"] < depth:
+        time.sleep(0.001)
+
+
+def test_bounded_in_flight():
+    scheduler = LLMScheduler(max_in_flight=2, queue_timeout=5)
+    running, peak, lock = [0], [0], threading.Lock()
+
+    def work():
+        assert scheduler.acquire()
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.02)
+        with lock:
+            running[0] -= 1
+        scheduler.release()
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert peak[0] == 2
+    assert scheduler.stats()["inFlight"] == 0 and scheduler.stats()["admitted"] == 8
+
+
+def test_freed_slot_goes_to_highest_priority():
+    scheduler = LLMScheduler(max_in_flight=1, queue_timeout=5)
+    assert scheduler.acquire()
+    order = []
+
+    def wait(priority):
+        scheduler.acquire(priority)
+        order.append(priority)
+        scheduler.release()
+
+    threads = []
+    for depth, priority in enumerate((0.1, 2.0, 1.0, 1.0), 1):
+        threads.append(threading.Thread(target=wait, args=(priority,)))
+        threads[-1].start()
+        wait_for_queue(scheduler, depth)
+    scheduler.release()
+    for t in threads:
+        t.join()
+    assert order == [2.0, 1.0, 1.0, 0.1]
+    assert scheduler.stats()["peakQueueDepth"] == 4
+
+
+def test_queue_deadline_and_overflow():
+    scheduler = LLMScheduler(max_in_flight=1, queue_timeout=0.05, max_queue=1)
+    assert scheduler.acquire()
+    start = time.monotonic()
+    assert not scheduler.acquire()
+    assert time.monotonic() - start < 0.5
+
+    blocker = threading.Thread(target=scheduler.acquire)
+    blocker.start()
+    wait_for_queue(scheduler, 1)
+    assert not scheduler.acquire()  # queue full: turned away at once
+    blocker.join()
+    stats = scheduler.stats()
+    assert stats["timedOut"] == 2 and stats["rejectedFull"] == 1 and stats["queueDepth"] == 0
+
+    scheduler.release()  # skips the timed-out waiters, frees the slot
+    assert scheduler.acquire() and scheduler.stats()["inFlight"] == 1
+
+
+def test_async_waiters():
+    async def run():
+        scheduler = LLMScheduler(max_in_flight=3, queue_timeout=5)
+        running, peak = [0], [0]
+
+        async def work():
+            assert await scheduler.acquire_async()
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+            await asyncio.sleep(0.01)
+            running[0] -= 1
+            scheduler.release()
+
+        await asyncio.gather(*(work() for _ in range(20)))
+        return peak[0], scheduler.stats()
+
+    peak, stats = asyncio.run(run())
+    assert peak == 3 and stats["admitted"] == 20 and stats["waitP95Ms"] is not None
+
+
+def test_priority_tracks_progress_and_new_intel():
+    fresh = Session(id="fresh", scammer_messages=1)
+    late = Session(id="late", scammer_messages=10)
+    productive = Session(id="productive", scammer_messages=1, new_intel=2)
+    assert main.llm_priority(fresh) < main.llm_priority(late) < main.llm_priority(productive)
+
+
+def test_burst_serves_productive_sessions_first(tmp_path, monkeypatch):
+    served = []
+
+    class Completions:
+        async def create(self, messages, **kwargs):
+            served.append(messages[-1]["content"])
+            await asyncio.sleep(0.1)
+            content = json.dumps({"reply": "Okay, tell me more.", "intelligence": {}})
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+    monkeypatch.setattr(main, "async_groq", SimpleNamespace(chat=SimpleNamespace(completions=Completions())))
+    monkeypatch.setattr(main, "llm_limiter", SharedRateLimiter(str(tmp_path / "rate.bin"), rate=1000, burst=1000, max_concurrency=64))
+    monkeypatch.setattr(main, "llm_scheduler", LLMScheduler(max_in_flight=1, queue_timeout=0.5))
+    monkeypatch.setattr(main, "should_end", lambda session: False)
+
+    async def run():
+        first = asyncio.ensure_future(request("POST", "/honeypot", turn("t-sched-a", "Hello sir")))
+        await asyncio.sleep(0.02)
+        fresh = asyncio.ensure_future(request("POST", "/honeypot", turn("t-sched-b", "Good morning")))
+        await asyncio.sleep(0.02)
+        productive = asyncio.ensure_future(request("POST", "/honeypot", turn("t-sched-c", "Pay to refund.desk@ybl")))
+        return await asyncio.gather(first, fresh, productive)
+
+    results = asyncio.run(run())
+    assert all(status == 200 for status, _, _ in results)
+    assert served == ["Hello sir", "Pay to refund.desk@ybl", "Good morning"]
+    assert main.llm_scheduler.stats()["peakQueueDepth"] == 2
+
+    # A slot that never frees in time turns the waiter away with a canned reply
+    monkeypatch.setattr(main, "llm_scheduler", LLMScheduler(max_in_flight=0, queue_timeout=0.05))
+    status, _, raw = asyncio.run(request("POST", "/honeypot", turn("t-sched-d", "Hello again")))
+    assert json.loads(raw)["reply"] in FALLBACK_POOL
+    assert main.llm_scheduler.stats()["timedOut"] == 1
+
+
+def test_cancelled_async_waiter_gives_back_its_place():
+    async def run():
+        scheduler = LLMScheduler(max_in_flight=1, queue_timeout=5)
+        assert await scheduler.acquire_async()
+
+        # Cancelled while still queued
+        queued = asyncio.ensure_future(scheduler.acquire_async())
+        await asyncio.sleep(0.01)
+        queued.cancel()
+        await asyncio.gather(queued, return_exceptions=True)
+        assert scheduler.stats()["queueDepth"] == 0
+
+        # Cancelled after release() granted it the slot, before it resumed
+        granted = asyncio.ensure_future(scheduler.acquire_async())
+        await asyncio.sleep(0.01)
+        scheduler.release()
+        granted.cancel()
+        await asyncio.gather(granted, return_exceptions=True)
+        return scheduler.stats()
+
+    stats = asyncio.run(run())
+    assert stats["inFlight"] == 0 and stats["queueDepth"] == 0
+    assert stats["cancelled"] == 1 and stats["timedOut"] == 0
@@ -0,0 +1,85 @@
+"""Local test: MultiSignalDetector matches main_backup's ScamDetector (no server)."""
+import os
+import random
+import re
+import sys
+sys.path.insert(0, ".")
+os.environ.setdefault("API_KEY", "local-test-key")
+
+from main import DETECTORS, MultiSignalDetector
+from test_fused_extractor import CORPUS
+
+D = MultiSignalDetector
+
+
+# main_backup's scoring, kept verbatim as an oracle except for the URL check,
+# which runs on the raw message (on normalized text it can never match)
+def legacy_normalize(text):
+    text = text.lower()
+    text = re.sub(r'[^\w\s]', ' ', text)
+    text = re.sub(r'\s+', ' ', text)
+    return text.strip()
+
+
+def legacy_count(text, keywords):
+    return sum(1 for k in keywords if f" {k} " in f" {text} ")
+
+
+def legacy_score(message, history):
+    score = 0
+    msg = legacy_normalize(message)
+    urgency = legacy_count(msg, D.URGENT_KEYWORDS)
+    score += min(urgency * 8, 20)
+    threat = legacy_count(msg, D.THREAT_KEYWORDS)
+    score += min(threat * 8, 20)
+    sensitive = legacy_count(msg, D.SENSITIVE_REQUESTS)
+    score += min(sensitive * 10, 30)
+    authority = legacy_count(msg, D.AUTHORITY_IMPERSONATION)
+    score += min(authority * 8, 20)
+    financial = legacy_count(msg, D.FINANCIAL_KEYWORDS)
+    score += min(financial * 5, 15)
+    if D.URL_PATTERN.search(message):
+        score += 15
+    if not history and score >= 30:
+        score += 10
+    if history:
+        previous_text = " ".join(legacy_normalize(m["text"]) for m in history[-2:])
+        if urgency > legacy_count(previous_text, D.URGENT_KEYWORDS):
+            score += 10
+    if urgency and sensitive:
+        score += 10
+    if authority and sensitive:
+        score += 10
+    return min(score, 100)
+
+
+def random_messages(count, seed=13):
+    rng = random.Random(seed)
+    words = (D.URGENT_KEYWORDS + D.THREAT_KEYWORDS + D.FINANCIAL_KEYWORDS +
+             D.SENSITIVE_REQUESTS + D.AUTHORITY_IMPERSONATION + [
+                 "sir", "URGENT!!", "pin-code", "Bank,", "otp:", "upi_id", "bit.ly/x",
+                 "https://sbi-kyc.in", "rbi's", "  \n", "bankaccount", "t.co",
+             ])
+    return [" ".join(rng.choice(words) for _ in range(rng.randint(0, 14))) for _ in range(count)]
+
+
+def test_matches_legacy_scores():
+    texts = CORPUS + random_messages(3000)
+    for i, text in enumerate(texts):
+        history = [{"text": t} for t in texts[max(0, i - 3):i]]
+        assert D.score(text, history=history) == legacy_score(text, history), text
+        assert D.score(text) == legacy_score(text, [])
+
+
+def test_token_boundaries_and_links():
+    assert D.assess("please update your pin")[1]["sensitive"] == 2
+    assert D.assess("spinning updates")[1]["sensitive"] == 0
+    assert D.assess("your bank-account is blocked")[1]["financial"] == 1
+    assert D.score("see https://x.in") == 15
+
+
+def test_selectable():
+    assert DETECTORS["multisignal"] is MultiSignalDetector
+    text = "URGENT: RBI official here, share your OTP and UPI ID immediately or account blocked"
+    assert MultiSignalDetector.detect(text)
+    assert not MultiSignalDetector.detect("hello, how are you?")
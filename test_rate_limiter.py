@@ -0,0 +1,249 @@
+"""Local test: cross-worker LLM rate limiter against a stub LLM server that injects 429s."""
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+sys.path.insert(0, ".")
+os.environ.setdefault("API_KEY", "local-test-key")
+
+import pytest
+from groq import AsyncGroq, Groq
+
+import main
+from llm import CLOSED, LLMBudget, LLMScheduler, CircuitBreaker
+from main import API_KEY, FALLBACK_POOL, app
+from ratelimit import SharedRateLimiter, Throttled, retry_after_seconds
+
+
+class StubLLM(ThreadingHTTPServer):
+    """OpenAI-style chat completions; answers 429 while ``throttle`` > 0"""
+
+    daemon_threads = True
+
+    def __init__(self, delay=0.0, retry_after="0.3"):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.delay = delay
+        self.retry_after = retry_after
+        self.throttle = 0
+        self.requests = self.rejected = self.active = self.peak = 0
+        self.lock = threading.Lock()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        self.rfile.read(int(self.headers.get("content-length", 0)))
+        with server.lock:
+            server.requests += 1
+            throttled = server.throttle > 0
+            if throttled:
+                server.throttle -= 1
+                server.rejected += 1
+            server.active += 1
+            server.peak = max(server.peak, server.active)
+        if throttled:
+            body = json.dumps({"error": {"message": "Rate limit reached", "type": "tokens"}}).encode()
+            self.send_response(429)
+            self.send_header("retry-after", server.retry_after)
+        else:
+            time.sleep(server.delay)
+            content = json.dumps({"reply": "Sir which branch are you from?", "intelligence": {}})
+            body = json.dumps({
+                "id": "stub", "object": "chat.completion", "created": 0, "model": "stub",
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": content}}],
+            }).encode()
+            self.send_response(200)
+        with server.lock:
+            server.active -= 1  # before the client can see the reply and send again
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def stub():
+    server = StubLLM()
+    yield server
+    server.shutdown()
+
+
+def limiter(tmp_path, **kwargs):
+    return SharedRateLimiter(str(tmp_path / "llm-rate.bin"), **kwargs)
+
+
+def test_retry_after_parsing():
+    assert retry_after_seconds({"retry-after": "2.5"}) == 2.5
+    assert retry_after_seconds({"retry-after": "Thu, 01 Jan 1970 00:00:10 GMT"}, now=4.0) == 6.0
+    assert retry_after_seconds({"retry-after": "soon"}) is None
+    assert retry_after_seconds({}) is None
+
+
+def test_token_bucket_paces_calls(tmp_path):
+    rl = limiter(tmp_path, rate=20, burst=2)
+    start = time.monotonic()
+    for _ in range(6):
+        rl.release(rl.acquire(timeout=2))
+    assert time.monotonic() - start >= 0.18  # 2 from the burst, 4 more at 20/s
+    assert rl.stats()["admitted"] == 6
+
+
+def test_expired_lease_frees_the_slot(tmp_path):
+    rl = limiter(tmp_path, rate=100, burst=10, max_concurrency=1, lease=0.1)
+    assert rl.acquire(timeout=0) is not None  # never released (worker died)
+    assert rl.acquire(timeout=0) is None
+    time.sleep(0.12)
+    assert rl.acquire(timeout=0) is not None
+    assert rl.stats()["timedOut"] == 1
+
+
+def test_try_acquire_is_not_a_timeout(tmp_path):
+    rl = limiter(tmp_path, rate=0.001, burst=1)
+    slot = rl.try_acquire()
+    assert slot is not None and rl.try_acquire() is None
+    rl.release(slot)
+    assert rl.stats()["timedOut"] == 0 and rl.stats()["admitted"] == 1
+
+
+def test_aimd_on_429_latency_and_success(tmp_path):
+    rl = limiter(tmp_path, rate=100, burst=100, max_concurrency=8, latency_target=0.5, decrease_interval=0)
+    rl.release(rl.acquire(1), throttled=True, retry_after=0.2)
+    stats = rl.stats()
+    assert stats["concurrencyLimit"] == 4 and stats["blockedForS"] > 0.1 and stats["throttled"] == 1
+
+    start = time.monotonic()
+    slot = rl.acquire(1)  # waits out Retry-After
+    assert time.monotonic() - start >= 0.15
+    rl.release(slot, latency=1.0)  # slow: trimmed
+    assert rl.stats()["concurrencyLimit"] == 3.6
+
+    for _ in range(10):
+        rl.release(rl.acquire(1), latency=0.01)  # fast: grows ~1 per round of calls
+    assert 5 < rl.stats()["concurrencyLimit"] < 7
+
+
+def hammer(path, url, calls, results):
+    """One 'worker process': calls the stub through the shared limiter"""
+    rl = SharedRateLimiter(path, rate=1000, burst=1000, max_concurrency=3)
+    client = Groq(api_key="stub", base_url=url, max_retries=0)
+    ok = 0
+    for _ in range(calls):
+        try:
+            rl.call(lambda: client.chat.completions.create(model="stub", messages=[{"role": "user", "content": "hi"}]),
+                    timeout=5, classify=main.rate_limit_outcome)
+            ok += 1
+        except Exception:
+            pass
+    results.put(ok)
+
+
+def test_workers_share_concurrency_and_back_off(tmp_path, stub):
+    stub.delay = 0.03
+    stub.throttle = 2
+    path = str(tmp_path / "shared.bin")
+    SharedRateLimiter(path, rate=1000, burst=1000, max_concurrency=3)
+
+    ctx = multiprocessing.get_context("fork")
+    results = ctx.Queue()
+    workers = [ctx.Process(target=hammer, args=(path, stub.url, 8, results)) for _ in range(4)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join(20)
+
+    assert sum(results.get(timeout=1) for _ in workers) == 30  # all but the two 429s
+    assert stub.peak <= 3  # four processes, never more than the shared limit at once
+    stats = SharedRateLimiter(path, rate=1000, burst=1000, max_concurrency=3).stats()
+    assert stats["throttled"] == 2 and stats["admitted"] == 32
+    assert stats["concurrencyLimit"] == 3  # halved on the 429s, regrown by the successes since
+
+
+def test_handler_backs_off_after_429(tmp_path, stub, monkeypatch):
+    stub.throttle = 1
+    monkeypatch.setattr(main, "groq", Groq(api_key="stub", base_url=stub.url, max_retries=0))
+    monkeypatch.setattr(main, "llm_limiter", limiter(tmp_path, rate=100, burst=10))
+    monkeypatch.setattr(main, "llm_budget", LLMBudget(budget=2.0))
+    monkeypatch.setattr(main, "llm_breaker", CircuitBreaker())
+    monkeypatch.setattr(main, "llm_scheduler", LLMScheduler())
+    monkeypatch.setattr(main, "should_end", lambda session: False)
+    client = app.test_client()
+
+    def post(text):
+        start = time.monotonic()
+        resp = client.post("/honeypot", headers={"x-api-key": API_KEY}, json={
+            "sessionId": "t-ratelimit",
+            "message": {"sender": "scammer", "text": text},
+            "conversationHistory": [],
+        })
+        return resp.get_json()["reply"], time.monotonic() - start
+
+    reply, _ = post("Send the OTP now")
+    assert reply in FALLBACK_POOL  # 429: canned reply, no SDK retry storm
+    reply, elapsed = post("Why are you late?")
+    assert reply == "Sir which branch are you from?"
+    assert elapsed >= 0.2  # held back until Retry-After passed
+    assert stub.requests == 2
+
+    health = client.get("/health").get_json()["llmRateLimit"]
+    assert health["throttled"] == 1 and health["admitted"] == 2
+
+    monkeypatch.setattr(main, "llm_limiter", limiter(tmp_path, rate=0.001, burst=0))
+    monkeypatch.setattr(main, "llm_budget", LLMBudget(budget=0.1))
+    reply, elapsed = post("Hello?")
+    assert reply in FALLBACK_POOL and elapsed < 0.5
+    assert stub.requests == 2
+
+
+def test_throttling_alone_never_opens_breaker(tmp_path, stub, monkeypatch):
+    # The LLM always answers at once; only the local token bucket is slow
+    monkeypatch.setattr(main, "groq", Groq(api_key="stub", base_url=stub.url, max_retries=0))
+    monkeypatch.setattr(main, "async_groq", AsyncGroq(api_key="stub", base_url=stub.url, max_retries=0))
+    monkeypatch.setattr(main, "llm_limiter", limiter(tmp_path, rate=2, burst=1))
+    monkeypatch.setattr(main, "llm_budget", LLMBudget(budget=0.2))
+    monkeypatch.setattr(main, "llm_breaker", CircuitBreaker(window=5, min_calls=3))
+    session = main.Session(id="t-throttled")
+
+    replies = [main.llm_reply("Hello?", [], session)[0] for _ in range(8)]
+
+    async def burst():
+        return await asyncio.gather(*(main.llm_reply_async("Hello?", [], session) for _ in range(8)))
+    replies += [reply for reply, _ in asyncio.run(burst())]
+
+    assert "Sir which branch are you from?" in replies
+    assert sum(reply in FALLBACK_POOL for reply in replies) >= 8
+    assert main.llm_breaker.state == CLOSED and main.llm_breaker.stats()["rejected"] == 0
+    stats = main.llm_budget.stats()
+    assert stats["timeouts"] == 0 and stats["errors"] == 0
+    assert main.llm_limiter.stats()["timedOut"] >= 8
+
+
+def test_skipped_hedge_is_not_a_timeout(tmp_path, stub, monkeypatch):
+    stub.delay = 0.2
+    monkeypatch.setattr(main, "groq", Groq(api_key="stub", base_url=stub.url, max_retries=0))
+    monkeypatch.setattr(main, "llm_limiter", limiter(tmp_path, rate=100, burst=10, max_concurrency=1))
+    monkeypatch.setattr(main, "llm_budget", LLMBudget(budget=2.0, hedge=0.05))
+    monkeypatch.setattr(main, "llm_breaker", CircuitBreaker())
+
+    reply, _ = main.llm_reply("Hello?", [], main.Session(id="t-hedge-skip"))
+    assert reply == "Sir which branch are you from?"
+    assert stub.requests == 1  # the one slot was busy: no hedge went out
+    assert main.llm_limiter.stats()["timedOut"] == 0
+
+
+def test_call_raises_throttled_without_a_slot(tmp_path):
+    rl = limiter(tmp_path, rate=0.001, burst=0)
+    with pytest.raises(Throttled):
+        rl.call(lambda: None, timeout=0.01)
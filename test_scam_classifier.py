@@ -0,0 +1,83 @@
+"""Local test: hashed n-gram scam classifier (no server)."""
+import json
+import os
+import random
+import sys
+sys.path.insert(0, ".")
+os.environ.setdefault("API_KEY", "local-test-key")
+
+import numpy as np
+
+import classifier
+import main
+from classifier import ScamClassifier, train
+from main import Detector, Extractor
+
+SCAM = [
+    "Your {bank} account will be blocked today, share the OTP to verify",
+    "URGENT: KYC pending, update now or your {bank} card is suspended",
+    "Congratulations! You won a lottery of Rs {amount}, pay processing fee to claim",
+    "This is {bank} customer care, send your card number and CVV for the refund",
+    "Police cyber cell: a case is filed on your Aadhaar, pay Rs {amount} immediately",
+]
+BENIGN = [
+    "Hi, are we still meeting for lunch {day}?",
+    "Your {bank} statement for {day} is ready in the app",
+    "Thanks for the photos, the kids loved the trip",
+    "Can you pick up milk and bread on the way back {day}?",
+    "The meeting has moved to {day} afternoon, see you there",
+]
+
+
+def corpus(count, seed=3):
+    rng = random.Random(seed)
+    fill = dict(bank=["SBI", "HDFC", "ICICI"], amount=["5000", "25,000", "1 lakh"], day=["monday", "friday", "tomorrow"])
+    texts, labels = [], []
+    for _ in range(count):
+        label = rng.random() < 0.5
+        template = rng.choice(SCAM if label else BENIGN)
+        texts.append(template.format(**{k: rng.choice(v) for k, v in fill.items()}))
+        labels.append(int(label))
+    return texts, labels
+
+
+def test_learns_and_generalizes():
+    texts, labels = corpus(400)
+    model = train(texts[:300], labels[:300], buckets=1 << 14, epochs=100)
+    predicted = model.predict_proba_batch(texts[300:]) >= 0.5
+    assert (predicted == np.array(labels[300:], dtype=bool)).mean() >= 0.95
+
+
+def test_mmap_round_trip_and_batch_consistency(tmp_path):
+    texts, labels = corpus(200)
+    model = train(texts, labels, buckets=1 << 12, epochs=50)
+    path = str(tmp_path / "model.npy")
+    model.save(path)
+
+    loaded = ScamClassifier.load(path)
+    assert isinstance(loaded.weights, np.memmap) and loaded.buckets == 1 << 12
+    batch = loaded.predict_proba_batch(texts + ["", "!!!"])
+    assert batch.tolist() == [loaded.predict_proba(t) for t in texts + ["", "!!!"]]
+    assert np.allclose(batch[:-2], model.predict_proba_batch(texts))
+
+
+def test_detector_blends_model_points(monkeypatch):
+    texts, labels = corpus(200)
+    model = train(texts, labels, buckets=1 << 12, epochs=50)
+    intels = [Extractor.extract(t) for t in texts]
+    base = Detector.score_batch(texts, intels)
+
+    monkeypatch.setattr(main, "scam_classifier", model)
+    blended = Detector.score_batch(texts, intels)
+    expected = np.rint(main.CLASSIFIER_POINTS * model.predict_proba_batch(texts)).astype(np.int64)
+    assert (blended - base).tolist() == expected.tolist()
+    assert blended.tolist() == [Detector.score(t, i) for t, i in zip(texts, intels)]
+
+
+def test_cli_trains_from_jsonl(tmp_path):
+    texts, labels = corpus(100)
+    data = tmp_path / "corpus.jsonl"
+    data.write_text("\n".join(json.dumps({"text": t, "label": "scam" if l else "benign"}) for t, l in zip(texts, labels)))
+    out = str(tmp_path / "m.npy")
+    classifier.main([str(data), "-o", out, "--buckets", "1024", "--epochs", "20"])
+    assert ScamClassifier.load(out).buckets == 1024
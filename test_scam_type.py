@@ -0,0 +1,54 @@
+"""Local test: incremental scam-type classification (no server)."""
+import os
+import sys
+sys.path.insert(0, ".")
+os.environ.setdefault("API_KEY", "local-test-key")
+
+import main
+from main import ScamTypeClassifier, Session, send_callback
+
+CASES = {
+    "kyc_bank_block": "Dear customer your bank account will be blocked today, KYC is pending",
+    "otp_theft": "Please share the OTP sent to your phone, it is a verification code",
+    "lottery_prize": "Congratulations! You won the KBC lucky draw prize of 25 lakh",
+    "refund": "Rs 5000 was wrongly credited, return the amount for your refund",
+    "job": "Work from home part time job, daily income 3000, pay registration fee",
+    "authority_impersonation": "This is Mumbai police cyber cell, a warrant for your arrest is issued",
+}
+
+
+def test_each_type():
+    for expected, text in CASES.items():
+        session = Session(id=f"t-type-{expected}")
+        assert ScamTypeClassifier.update(session, text) == expected
+
+
+def test_incremental_and_unknown():
+    session = Session(id="t-type-incremental")
+    assert ScamTypeClassifier.update(session, "Hello sir, good morning") == "unknown"
+    assert ScamTypeClassifier.update(session, "Your account is blocked, update your KYC") == "kyc_bank_block"
+    ScamTypeClassifier.update(session, "Send the OTP now")
+    ScamTypeClassifier.update(session, "The OTP, the 6 digit code sent to you, and the CVV")
+    assert session.scam_type == "otp_theft"
+    assert session.scam_type_scores["kyc_bank_block"] == 3
+
+
+def test_refusals_are_not_prizes():
+    session = Session(id="t-type-refusal")
+    for text in ["I won't pay", "No, I won't share it", "You won't get anything from me"]:
+        assert ScamTypeClassifier.update(session, text) == "unknown"
+    assert "lottery_prize" not in session.scam_type_scores
+    assert ScamTypeClassifier.update(Session(id="t-type-won"), "You have won Rs 50000") == "lottery_prize"
+
+
+def test_callback_notes_include_type(monkeypatch):
+    sent = []
+
+    class Response:
+        status_code = 200
+
+    monkeypatch.setattr(main.requests, "post", lambda url, json, timeout: sent.append(json) or Response())
+    session = Session(id="t-type-callback", scammer_messages=3)
+    ScamTypeClassifier.update(session, CASES["lottery_prize"])
+    send_callback(session)
+    assert sent[0]["agentNotes"].endswith("Scam type: Lottery / prize.")
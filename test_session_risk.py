@@ -0,0 +1,64 @@
+"""Local test: incremental per-session risk state (no server)."""
+import os
+import sys
+sys.path.insert(0, ".")
+os.environ.setdefault("API_KEY", "local-test-key")
+
+from main import Detector, Extractor, Intelligence, RiskState, Session, should_end
+
+
+def test_decayed_score_and_escalation():
+    risk = RiskState()
+    risk.update(20, {"high": 0, "med": 1, "ctx": 1}, decay=0.5)
+    assert (risk.score, risk.level, risk.escalation) == (20, 20, 0)
+    risk.update(60, {"high": 1, "med": 2, "ctx": 0}, decay=0.5)
+    assert (risk.score, risk.escalation) == (70, 40)
+    assert round(risk.level, 2) == 46.67  # (60 + 0.5 * 20) / 1.5
+    risk.update(0, {"high": 0, "med": 0, "ctx": 0}, decay=0.5)
+    assert (risk.score, risk.escalation) == (35, -60)
+    assert risk.counts == {"high": 1, "med": 3, "ctx": 1}
+
+
+def test_low_risk_messages_never_add_up():
+    # The decayed sum of a repeated message tends to 2x its points at
+    # decay 0.5; the level thresholded by detection stays at its points
+    text = "Your bank account has an issue"
+    points, hits = Detector.assess(text, Extractor.extract(text))
+    assert 0 < points < Detector.THRESHOLD <= 2 * points
+    risk = RiskState()
+    for _ in range(20):
+        risk.update(points, hits, decay=0.5)
+    assert risk.score >= Detector.THRESHOLD
+    assert risk.level < Detector.THRESHOLD
+
+
+def test_pressure_carries_into_quieter_turns():
+    risk = RiskState()
+    risk.update(80, {}, decay=0.5)
+    risk.update(20, {}, decay=0.5)  # below the threshold alone
+    assert risk.level >= Detector.THRESHOLD
+
+
+def test_should_end_waits_while_escalating():
+    session = Session(id="t-risk")
+    session.intelligence = Intelligence(
+        phoneNumbers=["+919876543210"], upiIds=["a@ybl"], suspiciousKeywords=["otp", "bank", "verify"]
+    )
+    session.scammer_messages = 3
+    session.risk.update(10, {})
+    session.risk.update(60, {})
+    assert not should_end(session)
+    session.risk.update(30, {})
+    assert should_end(session)
+
+
+if __name__ == "__main__":
+    test_decayed_score_and_escalation()
+    print("1. Decayed score / escalation delta: OK")
+    test_low_risk_messages_never_add_up()
+    print("2. Repeated low-risk messages stay below the threshold: OK")
+    test_pressure_carries_into_quieter_turns()
+    print("3. Earlier pressure carries into quieter turns: OK")
+    test_should_end_waits_while_escalating()
+    print("4. should_end waits while escalating: OK")
+    print("All local tests passed.")
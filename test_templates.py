@@ -0,0 +1,155 @@
+"""Local test: MinHash/LSH near-duplicate template index (no server)."""
+import os
+import sys
+import tracemalloc
+sys.path.insert(0, ".")
+os.environ.setdefault("API_KEY", "local-test-key")
+
+import numpy as np
+
+import main
+from main import API_KEY, Document, app
+from templates import MinHashIndex
+
+TEMPLATE = ("Dear {name}, your SBI account will be blocked today due to pending KYC. "
+            "Pay Rs {amount} verification charge at {link} or call our officer immediately to avoid suspension")
+
+
+def tokens(text):
+    return Document(text).tokens
+
+
+def variant(i):
+    return TEMPLATE.format(name=["Ravi", "Priya", "Amit", "Sunita"][i % 4], amount=10 * (i + 1), link=f"http://sbi-kyc{i}.in")
+
+
+def test_links_variants_not_unrelated():
+    index = MinHashIndex(capacity=100)
+    assert index.add("s0", tokens(variant(0))) == []
+    found = index.add("s1", tokens(variant(1)))
+    assert [sid for sid, _ in found] == ["s0"] and found[0][1] >= 0.5
+    assert index.add("s2", tokens("Hi, are we still meeting for lunch on friday at the usual place?")) == []
+    assert {sid for sid, _ in index.query(tokens(variant(2)))} == {"s0", "s1"}
+    assert [sid for sid, _ in index.similar_sessions("s1")] == ["s0"]
+    assert index.add("s3", []) == []
+
+
+def test_signature_estimates_jaccard():
+    index = MinHashIndex(capacity=10, num_perm=256, bands=32)
+    a, b = tokens(variant(0)), tokens(variant(1))
+    sa, sb = set(zip(a, a[1:])), set(zip(b, b[1:]))
+    jaccard = len(sa & sb) / len(sa | sb)
+    estimate = (index.signature(a) == index.signature(b)).mean()
+    assert abs(estimate - jaccard) < 0.15
+
+
+def test_ring_buffer_bounds_memory():
+    index = MinHashIndex(capacity=8)
+    for i in range(40):
+        index.add(f"s{i}", tokens(variant(i) + f" ref {i}"))
+    stats = index.stats()
+    assert stats["messages"] == 8 and stats["sessions"] == 8
+    assert index.session_signatures("s0").shape == (0, index.num_perm)
+    assert {sid for sid, _ in index.query(tokens(variant(5)), threshold=0.0)} <= {f"s{i}" for i in range(32, 40)}
+    assert chained(index) == 8 * index.bands
+
+
+def test_short_messages_not_indexed():
+    index = MinHashIndex(capacity=10)
+    for text in ("Hello sir", "Hello sir", "ok", "OK!", "yes sir please tell me"):
+        assert index.add("s-short", tokens(text)) == []
+        assert index.query(tokens(text), threshold=0.0) == []
+    assert index.stats()["messages"] == 0
+
+
+def test_long_message_signature_is_bounded():
+    index = MinHashIndex(capacity=10)
+    words = [f"w{i}" for i in range(200000)]
+    tracemalloc.start()
+    try:
+        sig = index.signature(words)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert (sig == index.signature(words[:index.max_tokens])).all()
+    assert peak < 16 * 2 ** 20  # num_perm x max_tokens uint64 is 2 MB
+
+
+def chained(index):
+    """Slots reachable through the bucket chains, over all bands"""
+    count = 0
+    for band, head in zip(*np.nonzero(index._heads >= 0)):
+        slot = index._heads[band, head]
+        while slot >= 0:
+            count += 1
+            slot = index._next_slot[slot, band]
+    return count
+
+
+def test_buckets_match_brute_force():
+    # Few distinct words: band keys repeat, chains share cells, slots get evicted
+    rng = np.random.default_rng(4)
+    words = [f"w{i}" for i in range(12)]
+    index = MinHashIndex(capacity=50, num_perm=16, bands=8, bucket_size=3, min_shingles=1)
+    for i in range(400):
+        index.add(f"s{i % 70}", [words[j] for j in rng.integers(0, 12, 4)])
+    order = [(index._next - 1 - k) % index.capacity for k in range(index.capacity)]  # newest first
+    for band in range(index.bands):
+        for key in set(index.slot_keys[:, band].tolist()):
+            cell = int(index._cells(np.array([key], dtype=np.uint64))[0])
+            expected = [slot for slot in order if index.slot_keys[slot, band] == key][:3]
+            assert index._bucket(band, cell, key) == expected
+    assert chained(index) == index.capacity * index.bands
+
+
+def test_memory_bounded_at_capacity():
+    capacity = 3000
+    tracemalloc.start()
+    try:
+        index = MinHashIndex(capacity=capacity)
+        for i in range(capacity + 1000):
+            index.add(f"s{i}", [f"msg{i}", "pay", f"amount{i}", "now", f"ref{i % 97}", "sir"])
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert index.stats()["messages"] == capacity
+    # Arrays are ~1 KB per slot; per-session dicts add a few hundred bytes
+    assert current < 2048 * capacity
+
+
+def test_handler_links_sessions_and_endpoint(monkeypatch):
+    monkeypatch.setattr(main, "template_index", MinHashIndex(capacity=100))
+    monkeypatch.setattr(main, "should_end", lambda session: False)
+    client = app.test_client()
+    for i in range(3):
+        resp = client.post("/honeypot", headers={"x-api-key": API_KEY}, json={
+            "sessionId": f"t-campaign-{i}",
+            "message": {"sender": "scammer", "text": variant(i)},
+            "conversationHistory": [],
+        })
+        assert resp.status_code == 200
+    assert set(main.session_store["t-campaign-2"].similar_sessions) == {"t-campaign-0", "t-campaign-1"}
+
+    resp = client.post("/similar", headers={"x-api-key": API_KEY}, json={"sessionId": "t-campaign-0"})
+    assert {s["sessionId"] for s in resp.get_json()["similar"]} == {"t-campaign-1", "t-campaign-2"}
+    resp = client.post("/similar", headers={"x-api-key": API_KEY}, json={"text": variant(7)})
+    assert len(resp.get_json()["similar"]) == 3
+    assert client.post("/similar", headers={"x-api-key": API_KEY}, json={}).status_code == 400
+    resp = client.post("/similar", headers={"x-api-key": API_KEY}, json={"sessionId": "t-campaign-0", "threshold": True})
+    assert resp.status_code == 400
+
+
+def test_greeting_sessions_not_linked(monkeypatch):
+    monkeypatch.setattr(main, "template_index", MinHashIndex(capacity=100))
+    monkeypatch.setattr(main, "should_end", lambda session: False)
+    client = app.test_client()
+    for i in range(2):
+        resp = client.post("/honeypot", headers={"x-api-key": API_KEY}, json={
+            "sessionId": f"t-greeting-{i}",
+            "message": {"sender": "scammer", "text": "Hello sir"},
+            "conversationHistory": [],
+        })
+        assert resp.status_code == 200
+    assert main.session_store["t-greeting-1"].similar_sessions == {}
+    resp = client.post("/similar", headers={"x-api-key": API_KEY}, json={"sessionId": "t-greeting-0"})
+    assert resp.get_json()["similar"] == []
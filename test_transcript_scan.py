@@ -0,0 +1,75 @@
+"""Local test: incremental transcript extraction (no server)."""
+import os
+import sys
+sys.path.insert(0, ".")
+os.environ.setdefault("API_KEY", "local-test-key")
+
+from dataclasses import asdict
+
+from main import Extractor, Session, scan_transcript, final_extraction
+
+TURNS = [
+    ("Scammer", "Your SBI account is blocked. Call +91-9876543210 immediately."),
+    ("Honeypot", "Oh no, which number should I call?"),
+    ("Scammer", "Transfer to A/c 50100234567891 or pay scammer@ybl, employee ID is EMP4521"),
+    ("Honeypot", "Is 9876543210 the right number?"),
+    ("Scammer", "Verify here https://secure-kyc.in/login and share OTP"),
+]
+
+
+def normalized(intel):
+    return {k: sorted(v) for k, v in intel.items()}
+
+
+def test_incremental_matches_full_scan():
+    session = Session(id="t-incremental")
+    for speaker, text in TURNS:
+        session.full_conversation += f"\n{speaker}: {text}"
+        scan_transcript(session)
+    final_extraction(session)
+
+    expected = normalized(Extractor.extract(session.full_conversation))
+    assert normalized(asdict(session.intelligence)) == expected
+    assert session.scanned_upto == len(session.full_conversation)
+
+
+def test_final_extraction_only_scans_tail():
+    session = Session(id="t-tail")
+    session.full_conversation = "\nScammer: call 9876543210" + " filler text" * 10000
+    scan_transcript(session)
+    session.full_conversation += "\nScammer: new a/c 123456789012"
+    session.transcript_intel.phoneNumbers = []  # anything re-found must come from the tail
+    final_extraction(session)
+    assert session.intelligence.bankAccounts == ["123456789012"]
+    assert session.intelligence.phoneNumbers == []
+
+
+def test_turn_scans_wait_for_finalization():
+    # The honeypot's own replies are in the transcript; until the callback
+    # they must not count toward should_end's intelligence
+    session = Session(id="t-deferred")
+    session.full_conversation = "\nScammer: hello\nHoneypot: Should I verify with my bank first?"
+    scan_transcript(session)
+    assert asdict(session.intelligence) == asdict(Session(id="empty").intelligence)
+    assert session.transcript_intel.suspiciousKeywords
+
+    final_extraction(session)
+    assert sorted(session.intelligence.suspiciousKeywords) == sorted(session.transcript_intel.suspiciousKeywords)
+
+
+def test_cut_token_is_not_reported():
+    # Starting mid digit-run must not produce a shorter fake account
+    intel = Extractor.extract("a/c 98765123456789012", start=8)
+    assert intel["bankAccounts"] == []
+
+
+if __name__ == "__main__":
+    test_incremental_matches_full_scan()
+    print("1. Incremental scans match a full transcript scan: OK")
+    test_final_extraction_only_scans_tail()
+    print("2. Finalization only scans the new tail: OK")
+    test_turn_scans_wait_for_finalization()
+    print("3. Turn scans are merged only at finalization: OK")
+    test_cut_token_is_not_reported()
+    print("4. Tokens cut at the scan offset are ignored: OK")
+    print("All local tests passed.")
@@ -0,0 +1,63 @@
+"""Local test: UPI handle registry (no server)."""
+import os
+import sys
+import tempfile
+sys.path.insert(0, ".")
+os.environ.setdefault("API_KEY", "local-test-key")
+
+import main
+from main import Extractor, HandleRegistry
+
+
+def test_registry_handles_are_recognized():
+    intel = Extractor.extract("UPI: scammer@yesbank or refund.desk@AxisBank, mail scammer.fraud@fakebank")
+    assert sorted(intel["upiIds"]) == ["refund.desk@axisbank", "scammer@yesbank"]
+
+
+def test_emails_are_not_upi():
+    intel = Extractor.extract("Write to support@paytm.com or help@gmail.com")
+    assert intel["upiIds"] == []
+
+
+def test_unknown_handle_keeps_the_number():
+    intel = Extractor.extract("Pay 9876543210@notapsp")
+    assert intel["upiIds"] == [] and intel["phoneNumbers"] == ["+919876543210"]
+
+
+def test_reload_without_restart():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "handles.txt")
+        with open(path, "w") as f:
+            f.write("# test registry\nybl\n")
+        registry = HandleRegistry(path, check_interval=0)
+        assert "ybl" in registry and "newpsp" not in registry
+
+        with open(path, "w") as f:
+            f.write("ybl\nNewPSP\n")
+        os.utime(path, (0, 12345))  # make sure the mtime moves
+        assert "newpsp" in registry
+
+        old, main.upi_registry = main.upi_registry, registry
+        try:
+            assert Extractor.extract("pay fraud@newpsp")["upiIds"] == ["fraud@newpsp"]
+        finally:
+            main.upi_registry = old
+
+
+def test_missing_file_falls_back_to_defaults():
+    registry = HandleRegistry("/nonexistent/handles.txt")
+    assert "ybl" in registry and "yesbank" not in registry
+
+
+if __name__ == "__main__":
+    test_registry_handles_are_recognized()
+    print("1. Registry handles recognized: OK")
+    test_emails_are_not_upi()
+    print("2. Emails not reported as UPI: OK")
+    test_unknown_handle_keeps_the_number()
+    print("3. Unknown handle keeps the phone number: OK")
+    test_reload_without_restart()
+    print("4. Registry reloads without restart: OK")
+    test_missing_file_falls_back_to_defaults()
+    print("5. Missing registry falls back to defaults: OK")
+    print("All local tests passed.")